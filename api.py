@@ -0,0 +1,102 @@
+# Standard imports
+import json
+import urllib.parse
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator
+
+# Third-party imports
+from fastapi import FastAPI, Request
+
+# Local imports
+from config import (
+    GITHUB_WEBHOOK_SECRET,
+    PRODUCT_NAME,
+    UTF8,
+    WEBHOOK_MAX_ATTEMPTS,
+    WEBHOOK_QUEUE_BACKEND,
+    WEBHOOK_QUEUE_PATH,
+    WEBHOOK_VISIBILITY_TIMEOUT_IN_SECONDS,
+    WEBHOOK_WORKERS,
+)
+from services.github.github_manager import verify_webhook_signature
+from services.webhook_handler import handle_queued_event, handle_webhook_event
+from utils.job_queue import JobQueue, LambdaJobQueue, WorkerPool, create_job_queue
+
+# Webhooks are acknowledged as soon as they are queued, well within GitHub's 10 second timeout, and handled by a worker pool or, on Lambda, by another invocation. None handles them inline.
+webhook_queue: JobQueue | None = create_job_queue(
+    backend=WEBHOOK_QUEUE_BACKEND,
+    path=WEBHOOK_QUEUE_PATH,
+    visibility_timeout_in_seconds=WEBHOOK_VISIBILITY_TIMEOUT_IN_SECONDS,
+    max_attempts=WEBHOOK_MAX_ATTEMPTS,
+)
+# Lambda invokes main.handler with each queued event, so only the other backends need workers
+worker_pool: WorkerPool | None = (
+    None
+    if webhook_queue is None or isinstance(webhook_queue, LambdaJobQueue)
+    else WorkerPool(
+        queue=webhook_queue, handler=handle_queued_event, concurrency=WEBHOOK_WORKERS
+    )
+)
+
+
+@asynccontextmanager
+async def lifespan(_app: FastAPI) -> AsyncIterator[None]:
+    if worker_pool is not None:
+        worker_pool.start()
+    yield
+    if worker_pool is not None:
+        await worker_pool.stop()
+        print(f"Webhook workers stopped: {worker_pool.get_stats()}")
+
+
+# Create FastAPI instance. It's wrapped with Mangum in main.py to run on AWS Lambda.
+app = FastAPI(lifespan=lifespan)
+
+
+@app.post(path="/webhook")
+async def handle_webhook(request: Request) -> dict[str, str]:
+    content_type: str = request.headers.get(
+        "Content-Type", "Content-Type not specified"
+    )
+    event_name: str = request.headers.get("X-GitHub-Event", "Event not specified")
+    print("\n" * 3 + "-" * 70)
+    print(f"Received event: {event_name} with content type: {content_type}")
+
+    # Validate if the webhook signature comes from GitHub
+    await verify_webhook_signature(request=request, secret=GITHUB_WEBHOOK_SECRET)
+
+    # Process the webhook event but never raise an exception as some event_name like "marketplace_purchase" doesn't have a payload
+    try:
+        request_body: bytes = await request.body()
+    except Exception as e:  # pylint: disable=broad-except
+        print(f"Error in reading request body: {e}")
+        request_body = b""
+
+    payload: Any = {}
+    try:
+        # First try to parse the body as JSON
+        payload = json.loads(s=request_body.decode(encoding=UTF8))
+    except json.JSONDecodeError:
+        # If JSON parsing fails, treat the body as URL-encoded
+        decoded_body: dict[str, list[str]] = urllib.parse.parse_qs(
+            qs=request_body.decode(encoding=UTF8)
+        )
+        if "payload" in decoded_body:
+            payload = json.loads(s=decoded_body["payload"][0])
+    except Exception as e:  # pylint: disable=broad-except
+        print(f"Error in parsing JSON payload: {e}")
+
+    await handle_webhook_event(
+        event_name=event_name,
+        payload=payload,
+        delivery_id=request.headers.get("X-GitHub-Delivery"),
+        queue=webhook_queue,
+    )
+    if worker_pool is not None:
+        worker_pool.notify()
+    return {"message": "Webhook processed successfully"}
+
+
+@app.get(path="/")
+async def root() -> dict[str, str]:
+    return {"message": PRODUCT_NAME}
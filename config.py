@@ -19,25 +19,56 @@ def get_env_var(name: str) -> str:
 # GitHub Credentials from environment variables
 GITHUB_API_URL: str = "https://api.github.com"
 GITHUB_API_VERSION: str = "2022-11-28"
+GITHUB_JSON_MEDIA_TYPE = "application/vnd.github.v3+json"
+GITHUB_RAW_MEDIA_TYPE = "application/vnd.github.raw+json"  # Raw bytes, no base64 nor JSON
 GITHUB_APP_ID = int(get_env_var(name="GH_APP_ID"))
 GITHUB_APP_IDS: list[int] = list({GITHUB_APP_ID,  # Production or your local development
     844909,  # Production
     901480})
 GITHUB_APP_USER_ID: int = int(get_env_var(name="GH_APP_USER_ID"))
 GITHUB_APP_USER_NAME: str = get_env_var(name="GH_APP_USER_NAME")
+GITHUB_CONNECT_TIMEOUT_IN_SECONDS = 5
+GITHUB_MAX_FILE_SIZE_IN_BYTES = 512 * 1024  # Tool outputs must be less than 512KB in total
+GITHUB_MAX_RATE_LIMIT_RETRIES = 3
+GITHUB_MAX_RATE_LIMIT_WAIT_IN_SECONDS = 60  # Longer waits are deferred instead of keeping a Lambda asleep
+GITHUB_MAX_WORKERS = 8  # Concurrent requests per fan-out, well under the secondary rate limit of 100
+GITHUB_MUTATIVE_BURST = 5  # Mutative requests sent without pacing before falling back to the rate below
+GITHUB_MUTATIVE_REQUESTS_PER_SECOND = 1.0  # Per installation. https://docs.github.com/en/rest/using-the-rest-api/best-practices-for-using-the-rest-api?apiVersion=2022-11-28#pause-between-mutative-requests
+GITHUB_PER_PAGE = 100  # Max page size of list endpoints
+GITHUB_POOL_MAXSIZE = 10  # Max keep-alive connections kept open per host
+GITHUB_PROGRESS_DEBOUNCE_IN_SECONDS = 1.0  # Progress comment updates within this window are sent as one
+GITHUB_RATE_LIMIT_MAX_SCOPES = 1000  # Installations kept in memory by the rate limiter, least recently used ones are dropped
+GITHUB_READ_TIMEOUT_IN_SECONDS = 120
+GITHUB_RESPONSE_CACHE_MAX_BYTES = 64 * 1024 * 1024  # ETag cache for GET responses
+GITHUB_SCHEDULER_MIN_REMAINING_RATIO = 0.2  # The scheduler leaves this share of the rate limit to webhooks
+GITHUB_TOKEN_REFRESH_MARGIN_IN_SECONDS = 300  # Refresh installation tokens 5 minutes before they expire
 GITHUB_PRIVATE_KEY_ENCODED: str = get_env_var(name="GH_PRIVATE_KEY")
 GITHUB_PRIVATE_KEY: bytes = base64.b64decode(s=GITHUB_PRIVATE_KEY_ENCODED)
 GITHUB_WEBHOOK_SECRET: str = get_env_var(name="GH_WEBHOOK_SECRET")
 
 # OpenAI Credentials from environment variables
 OPENAI_API_KEY: str = get_env_var(name="OPENAI_API_KEY")
+OPENAI_CHAT_TIMEOUT_IN_SECONDS = 120  # Chat completions, which can generate up to OPENAI_MAX_TOKENS
+OPENAI_CONNECT_TIMEOUT_IN_SECONDS = 5
 OPENAI_FINAL_STATUSES: list[str] = ["cancelled", "completed", "expired", "failed"]
+OPENAI_KEEPALIVE_EXPIRY_IN_SECONDS = 60  # Idle connections are kept this long, across warm invocations
+OPENAI_MAX_IMAGE_SIZE_IN_BYTES = 20 * 1024 * 1024
 OPENAI_MAX_TOKENS = 4096
 OPENAI_MODEL_ID = "gpt-4o"
 OPENAI_ORG_ID: str = get_env_var(name="OPENAI_ORG_ID")
+OPENAI_POLL_MAX_INTERVAL_IN_SECONDS = 2.0  # Polls back off up to this while the run's status stays the same
+OPENAI_POLL_MIN_INTERVAL_IN_SECONDS = 0.2  # First poll after the run's status changes
+OPENAI_POLL_TIMEOUT_IN_SECONDS = 10  # Run status checks and message lists return at once, so a stuck one is retried instead of waited on
+OPENAI_POOL_MAXSIZE = 10  # Max connections to the API, shared by every thread
+# Follow runs by their event stream. Set to "false" to poll them instead, which is also the fallback when a stream fails.
+OPENAI_STREAM_RUNS: bool = os.environ.get("OPENAI_STREAM_RUNS", "true") == "true"
 OPENAI_TEMPERATURE = 0.0
+OPENAI_TOOL_JOIN_TIMEOUT_IN_SECONDS = 10  # A finished run waits this long for its timed-out tool calls before releasing what they use
+OPENAI_TOOL_STEP_TIMEOUT_IN_SECONDS = 150  # Tool calls of one step still running after this are reported to the assistant as timed out
 
 # Supabase Credentials from environment variables
+SUPABASE_KEEPALIVE_EXPIRY_IN_SECONDS = 60  # Idle connections are kept this long, across warm invocations
+SUPABASE_POOL_MAXSIZE = 10  # Max connections to the REST endpoint, shared by every thread
 SUPABASE_SERVICE_ROLE_KEY: str = get_env_var(name="SUPABASE_SERVICE_ROLE_KEY")
 SUPABASE_URL: str = get_env_var(name="SUPABASE_URL")
 
@@ -46,18 +77,36 @@ STRIPE_API_KEY: str = get_env_var(name="STRIPE_API_KEY")
 STRIPE_FREE_TIER_PRICE_ID: str = get_env_var(name="STRIPE_FREE_TIER_PRICE_ID")
 
 # General
+BLOB_CACHE_DIR = "/tmp/blobs"
+BLOB_CACHE_DISK_MAX_BYTES = 256 * 1024 * 1024  # Lambda /tmp is 512MB by default
+BLOB_CACHE_MEMORY_MAX_BYTES = 32 * 1024 * 1024
+CHECKPOINT_MAX_AGE_IN_SECONDS = 24 * 60 * 60  # Older unfinished runs of an issue start over instead of resuming
 DEFAULT_TIME = datetime.datetime(year=1, month=1, day=1, hour=0, minute=0, second=0)
 EMAIL_LINK = "[info@gitauto.ai](mailto:info@gitauto.ai)"
 ENV: str = get_env_var(name="ENV")
 # Update here too: https://dashboard.stripe.com/test/products/prod_PokLGIxiVUwCi6
 FREE_TIER_REQUEST_AMOUNT = 5
+ISSUE_LOCK_TTL_IN_SECONDS = 15 * 60  # Max Lambda timeout, so the lock of a crashed run expires
 ISSUE_NUMBER_FORMAT = "/issue-#"
+LAMBDA_DEADLINE_MARGIN_IN_SECONDS = 30  # Stop and keep the checkpoints when less time than this is left
 PR_BODY_STARTS_WITH = "Original issue: [#"
 PRODUCT_ID: str = get_env_var(name="PRODUCT_ID")
 PRODUCT_NAME = "GitAuto"
 PRODUCT_URL = "https://gitauto.ai"
+REPO_SNAPSHOT_DIR = "/tmp/snapshots"
+REPO_SNAPSHOT_MAX_SIZE_IN_KB = 100 * 1024  # Larger repositories read files one by one. 0 disables snapshots.
+STAGE_RETRY_DELAY_IN_SECONDS = 1.0  # Multiplied by the attempt number before a failed stage is retried
 TIMEOUT_IN_SECONDS = 120
 UTF8 = "utf-8"
+WEBHOOK_DELIVERY_TTL_IN_SECONDS = 3 * 24 * 60 * 60  # GitHub keeps deliveries for redelivery for 3 days
+WEBHOOK_MAX_ATTEMPTS = 3  # Queued events that fail this many times are dead-lettered
+# "lambda" queues events as asynchronous invocations of this function, "sqlite" in a local file.
+# "inline" handles them before responding, as Lambda doesn't run anything after the response, e.g. in tests.
+WEBHOOK_QUEUE_BACKEND: str = os.environ.get("WEBHOOK_QUEUE_BACKEND", "sqlite" if ENV == "local" else "lambda" if "AWS_LAMBDA_FUNCTION_NAME" in os.environ else "inline")
+WEBHOOK_QUEUE_EVENT_SOURCE = "gitauto.webhook_queue"  # "source" of the queued invocations, like "aws.events" for the scheduler
+WEBHOOK_QUEUE_PATH = "/tmp/webhook_queue.sqlite3"
+WEBHOOK_VISIBILITY_TIMEOUT_IN_SECONDS = 15 * 60  # A queued event comes back if its worker dies
+WEBHOOK_WORKERS = 4
 
 # Testing
 INSTALLATION_ID = -1
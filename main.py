@@ -1,113 +1,71 @@
 # Standard imports
-import sys
-import time
-import jwt
-import json
-import urllib.parse
+import asyncio
 from typing import Any
 
-# Get PEM file path
-if len(sys.argv) > 1:
-    pem = sys.argv[1]
-else:
-    pem = input("Enter path of private PEM file: ")
-
-# Get the Client ID
-if len(sys.argv) > 2:
-    client_id = sys.argv[2]
-else:
-    client_id = input("Enter your Client ID: ")
-
-# Open PEM
-with open(pem, 'rb') as pem_file:
-    signing_key = pem_file.read()
-
-payload = {
-    # Issued at time
-    'iat': int(time.time()),
-    # JWT expiration time (10 minutes maximum)
-    'exp': int(time.time()) + 600,
-    
-    # GitHub App's client ID
-    'iss': client_id
-}
-
-# Create JWT
-encoded_jwt = jwt.encode(payload, signing_key, algorithm='RS256')
-
-print(f"JWT: {encoded_jwt}")
-
 # Third-party imports
 import sentry_sdk
-from fastapi import FastAPI, Request
-from mangum import Mangum
 from sentry_sdk.integrations.aws_lambda import AwsLambdaIntegration
 
 # Local imports
-from config import GITHUB_WEBHOOK_SECRET, ENV, PRODUCT_NAME, UTF8
-from scheduler import schedule_handler
-from services.github.github_manager import verify_webhook_signature
-from services.webhook_handler import handle_webhook_event
+from config import ENV, WEBHOOK_QUEUE_EVENT_SOURCE
+from utils.deadline import set_deadline
 
+# Integrations that Sentry would enable for installed packages import them, e.g. FastAPI and OpenAI, on every cold start.
+# Errors still reach Sentry through the Lambda integration and the default logging integration, as handle_exceptions logs them.
 if ENV != "local":
     sentry_sdk.init(
         dsn="https://b7ca4effebf7d7825b6464eade11734f@o4506827828101120.ingest.us.sentry.io/4506865231200256",  # noqa
         environment=ENV,
         integrations=[AwsLambdaIntegration()],
+        auto_enabling_integrations=False,
         traces_sample_rate=1.0,
     )
 
-# Create FastAPI instance and Mangum handler. Mangum is a library that allows you to use FastAPI with AWS Lambda.
-app = FastAPI()
-mangum_handler = Mangum(app=app)
+# The web app and the scheduler are imported on first use, so a cold start only loads the SDKs of the path it takes. See tests/test_import_time.py.
+_mangum_handler: Any = None
+
+
+def get_mangum_handler() -> Any:
+    """Mangum is a library that allows you to use FastAPI with AWS Lambda."""
+    global _mangum_handler  # pylint: disable=global-statement
+    if _mangum_handler is None:
+        # pylint: disable=import-outside-toplevel
+        from mangum import Mangum
+        from api import app
 
+        _mangum_handler = Mangum(app=app)
+    return _mangum_handler
 
-# Here is an entry point for the AWS Lambda function. Mangum is a library that allows you to use FastAPI with AWS Lambda.
+
+# Here is an entry point for the AWS Lambda function.
 def handler(event, context):
     if "source" in event and event["source"] == "aws.events":
+        from scheduler import (  # pylint: disable=import-outside-toplevel
+            schedule_handler,
+        )
+
         schedule_handler(_event=event, _context=context)
         return {"statusCode": 200}
 
-    return mangum_handler(event=event, context=context)
+    # Lets a long run stop with its checkpoints saved before Lambda kills it
+    if hasattr(context, "get_remaining_time_in_millis"):
+        set_deadline(remaining_in_seconds=context.get_remaining_time_in_millis() / 1000)
 
+    # A webhook queued by LambdaJobQueue. Raising makes Lambda retry it.
+    if event.get("source") == WEBHOOK_QUEUE_EVENT_SOURCE:
+        # pylint: disable=import-outside-toplevel
+        from services.webhook_handler import handle_queued_event
+        from utils.job_queue import get_lambda_job
 
-@app.post(path="/webhook")
-async def handle_webhook(request: Request) -> dict[str, str]:
-    content_type: str = request.headers.get(
-        "Content-Type", "Content-Type not specified"
-    )
-    event_name: str = request.headers.get("X-GitHub-Event", "Event not specified")
-    print("\n" * 3 + "-" * 70)
-    print(f"Received event: {event_name} with content type: {content_type}")
-
-    # Validate if the webhook signature comes from GitHub
-    await verify_webhook_signature(request=request, secret=GITHUB_WEBHOOK_SECRET)
-
-    # Process the webhook event but never raise an exception as some event_name like "marketplace_purchase" doesn't have a payload
-    try:
-        request_body: bytes = await request.body()
-    except Exception as e:  # pylint: disable=broad-except
-        print(f"Error in reading request body: {e}")
-        request_body = b""
-
-    payload: Any = {}
-    try:
-        # First try to parse the body as JSON
-        payload = json.loads(s=request_body.decode(encoding=UTF8))
-    except json.JSONDecodeError:
-        # If JSON parsing fails, treat the body as URL-encoded
-        decoded_body: dict[str, list[str]] = urllib.parse.parse_qs(
-            qs=request_body.decode(encoding=UTF8)
-        )
-        if "payload" in decoded_body:
-            payload = json.loads(s=decoded_body["payload"][0])
-    except Exception as e:  # pylint: disable=broad-except
-        print(f"Error in parsing JSON payload: {e}")
+        asyncio.run(handle_queued_event(job=get_lambda_job(event=event)))
+        return {"statusCode": 200}
+    return get_mangum_handler()(event=event, context=context)
 
-    await handle_webhook_event(event_name=event_name, payload=payload)
-    return {"message": "Webhook processed successfully"}
 
+def __getattr__(name: str) -> Any:
+    """Keeps `uvicorn main:app` working for local runs"""
+    if name == "app":
+        from api import app  # pylint: disable=import-outside-toplevel
 
-@app.get(path="/")
-async def root() -> dict[str, str]:
-    return {"message": PRODUCT_NAME}
+        return app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,8 +1,12 @@
 """This is scheduled to run by AWS Lambda"""
 
 import logging
-import time
-from config import GITHUB_APP_USER_ID, GITHUB_APP_USER_NAME, PRODUCT_ID, SUPABASE_SERVICE_ROLE_KEY, SUPABASE_URL
+from config import (
+    GITHUB_APP_USER_ID,
+    GITHUB_APP_USER_NAME,
+    GITHUB_SCHEDULER_MIN_REMAINING_RATIO,
+    PRODUCT_ID,
+)
 from services.github.github_manager import (
     add_label_to_issue,
     get_installation_access_token,
@@ -10,22 +14,23 @@ from services.github.github_manager import (
     get_oldest_unassigned_open_issue,
 )
 from services.github.github_types import IssueInfo
-from services.supabase import SupabaseManager
-
-supabase_manager = SupabaseManager(url=SUPABASE_URL, key=SUPABASE_SERVICE_ROLE_KEY)
+from services.github.rate_limiter import RateLimitBudget, rate_limiter
+from services.github.response_cache import response_cache
+from services.github.token_cache import get_token_scope
+from services.supabase import get_supabase_manager
 
 
 def schedule_handler(_event, _context) -> dict[str, int]:
     print("\n" * 3 + "-" * 70)
+    supabase_manager = get_supabase_manager()
+    deleted_locks: int = supabase_manager.delete_expired_locks()
+    logging.info("Deleted %d expired locks", deleted_locks)
 
     # Get all active installation IDs from Supabase including free customers.
     installation_ids: list[int] = supabase_manager.get_installation_ids()
 
     # Get all owners and repositories from GitHub.
     for installation_id in installation_ids:
-        # Pause for 1+ second to avoid secondary rate limits. https://docs.github.com/en/rest/using-the-rest-api/best-practices-for-using-the-rest-api?apiVersion=2022-11-28#pause-between-mutative-requests
-        time.sleep(1)
-
         # Get the installation access token for each installation ID.
         token = get_installation_access_token(installation_id=installation_id)
         if token is None:
@@ -38,6 +43,18 @@ def schedule_handler(_event, _context) -> dict[str, int]:
 
         # Process each owner and repository.
         for owner_repo in owners_repos:
+            # Leave the rest of the rate limit to webhooks and defer to the next scheduled run
+            budget: RateLimitBudget | None = rate_limiter.get_budget(
+                scope=get_token_scope(token=token)
+            )
+            if (
+                budget is not None
+                and budget.get_remaining_ratio() < GITHUB_SCHEDULER_MIN_REMAINING_RATIO
+            ):
+                msg = f"Rate limit budget is low for installation_id: {installation_id} ({budget.remaining}/{budget.limit} until {budget.reset}), so deferring"
+                logging.info(msg)
+                break
+
             owner_id: int = owner_repo["owner_id"]
             owner: str = owner_repo["owner"]
             repo: str = owner_repo["repo"]
@@ -75,8 +92,7 @@ def schedule_handler(_event, _context) -> dict[str, int]:
                 logging.info(msg)
                 continue
 
-            # Label the issue with the product ID to trigger GitAuto.
-            time.sleep(1)
+            # Label the issue with the product ID to trigger GitAuto. Mutative requests are paced by the rate limiter.
             add_label_to_issue(
                 owner=owner,
                 repo=repo,
@@ -84,3 +100,5 @@ def schedule_handler(_event, _context) -> dict[str, int]:
                 label=PRODUCT_ID,
                 token=token,
             )
+
+    logging.info("GitHub response cache: %s", response_cache.get_stats())
@@ -1,46 +1,72 @@
 # Standard imports
+import asyncio
 import json
 import logging
+import threading
 import time
+from typing import Any
 from uuid import uuid4
 
+# Third-party imports
+from openai.types.beta import Assistant, Thread
+
 # Local imports
 from config import (
     GITHUB_APP_USER_ID,
     ISSUE_NUMBER_FORMAT,
     PR_BODY_STARTS_WITH,
     PRODUCT_ID,
-    SUPABASE_SERVICE_ROLE_KEY,
-    SUPABASE_URL,
+    STAGE_RETRY_DELAY_IN_SECONDS,
 )
+from utils.spans import Spans, current_spans
+from utils.stage_executor import Stage, StageExecutor, StopPipeline
 from utils.text_copy import (
     UPDATE_COMMENT_FOR_RAISED_ERRORS_BODY,
     pull_request_completed,
     request_limit_reached,
 )
 
-from services.github.github_manager import (
+from services.github.async_github_manager import (
     add_reaction_to_issue,
     create_comment,
     create_pull_request,
-    create_remote_branch,
     get_installation_access_token,
     get_issue_comments,
+    get_issue_context,
     get_latest_remote_commit_sha,
     get_remote_file_tree,
-    update_comment,
 )
-from services.github.github_types import GitHubLabeledPayload, IssueInfo, RepositoryInfo
-from services.openai.agent import run_assistant
+from services.github.blob_cache import blob_cache
+from services.github.github_client import async_github_client, github_client
+from services.github.github_manager import download_repo_snapshot
+from services.github.progress_reporter import ProgressReporter
+from services.github.github_types import (
+    GitHubLabeledPayload,
+    IssueContext,
+    IssueInfo,
+    RepositoryInfo,
+)
+from services.github.repo_snapshot import (
+    RepoSnapshot,
+    acquire_snapshot,
+    register_snapshot,
+    release_snapshot,
+    should_use_snapshot,
+)
+from services.openai.agent import (
+    create_assistant_and_thread,
+    join_tool_calls,
+    run_assistant,
+)
 from services.openai.chat import write_pr_body
-from services.supabase import SupabaseManager
-
-supabase_manager = SupabaseManager(url=SUPABASE_URL, key=SUPABASE_SERVICE_ROLE_KEY)
+from services.openai.init import get_openai_transport
+from services.supabase import get_supabase_manager
 
 
 async def handle_gitauto(payload: GitHubLabeledPayload, trigger_type: str) -> None:
     """Core functionality to create comments on issue, create PRs, and update progress."""
     current_time: float = time.time()
+    supabase_manager = get_supabase_manager()
 
     # Extract label and validate it
     if trigger_type == "label" and payload["label"]["name"] != PRODUCT_ID:
@@ -57,171 +83,470 @@ async def handle_gitauto(payload: GitHubLabeledPayload, trigger_type: str) -> No
     owner: str = repo["owner"]["login"]
     owner_id: int = repo["owner"]["id"]
     repo_name: str = repo["name"]
-    base_branch: str = repo["default_branch"]
     sender_id: int = payload["sender"]["id"]
     is_automation: bool = sender_id == GITHUB_APP_USER_ID
     sender_name: str = payload["sender"]["login"]
     issuer_name: str = issue["user"]["login"]
-    token: str = get_installation_access_token(installation_id=installation_id)
+    unique_issue_id = f"{owner_type}/{owner}/{repo_name}#{issue_number}"
+    # Results of checkpoint stages and steps of the agent, saved on the usage record
+    checkpoint: dict[str, Any] = {}
+    checkpoint_lock = threading.Lock()
+
+    def save_checkpoint(name: str, value: Any) -> None:
+        """Saved once the usage record exists. Until then, checkpoints are kept to be saved with it."""
+        with checkpoint_lock:
+            checkpoint[name] = value
+            if "usage_record_id" not in checkpoint:
+                return
+            if not supabase_manager.save_checkpoint(
+                usage_record_id=checkpoint["usage_record_id"],
+                checkpoint=dict(checkpoint),
+            ):
+                # A retry would then redo this step instead of resuming after it
+                logging.error(
+                    "Checkpoint %s of %s couldn't be saved", name, unique_issue_id
+                )
+
+    async def get_token() -> str:
+        return await get_installation_access_token(installation_id=installation_id)
+
+    async def wait_for_token() -> str:
+        return await token_task
+
+    async def get_context(token: str) -> IssueContext | None:
+        return await get_issue_context(
+            owner=owner, repo=repo_name, issue_number=issue_number, token=token
+        )
 
-    requests_left, request_count, end_date = (
-        supabase_manager.get_how_many_requests_left_and_cycle(
+    async def check_request_limit(token: str) -> None:
+        requests_left, request_count, end_date = await asyncio.to_thread(
+            supabase_manager.get_how_many_requests_left_and_cycle,
             user_id=sender_id,
             installation_id=installation_id,
             user_name=sender_name,
             owner_id=owner_id,
             owner_name=owner,
         )
-    )
-    if requests_left <= 0:
-        logging.info("\nRequest limit reached for user %s.", sender_name)
-        create_comment(
+        if requests_left <= 0:
+            logging.info("\nRequest limit reached for user %s.", sender_name)
+            await create_comment(
+                owner=owner,
+                repo=repo_name,
+                issue_number=issue_number,
+                body=request_limit_reached(
+                    user_name=sender_name,
+                    request_count=request_count,
+                    end_date=end_date,
+                ),
+                token=token,
+            )
+            raise StopPipeline("Request limit reached")
+
+    def create_usage_record(limit: None) -> int:
+        return supabase_manager.create_user_request(
+            user_id=sender_id,
+            installation_id=installation_id,
+            unique_issue_id=unique_issue_id,
+        )
+
+    def create_branch_name() -> str:
+        uuid: str = str(object=uuid4())
+        return f"{PRODUCT_ID}{ISSUE_NUMBER_FORMAT}{issue['number']}-{uuid}"
+
+    async def add_reaction(token: str, limit: None) -> None:
+        await add_reaction_to_issue(
             owner=owner,
             repo=repo_name,
             issue_number=issue_number,
-            body=request_limit_reached(
-                user_name=sender_name,
-                request_count=request_count,
-                end_date=end_date,
-            ),
+            content="eyes",
             token=token,
         )
-        return
-    unique_issue_id = f"{owner_type}/{owner}/{repo_name}#{issue_number}"
-    usage_record_id = supabase_manager.create_user_request(
-        user_id=sender_id,
-        installation_id=installation_id,
-        unique_issue_id=unique_issue_id,
-    )
-    add_reaction_to_issue(
-        owner=owner,
-        repo=repo_name,
-        issue_number=issue_number,
-        content="eyes",
-        token=token,
-    )
 
-    comment_url = create_comment(
-        owner=owner,
-        repo=repo_name,
-        issue_number=issue_number,
-        body="![X](https://progress-bar.dev/0/?title=Progress&width=800)\nGitAuto just started crafting a pull request.",
-        token=token,
-    )
-    # Prepare contents for Agent
-    file_paths: list[str] = get_remote_file_tree(
-        owner=owner,
-        repo=repo_name,
-        ref=base_branch,
-        comment_url=comment_url,
-        token=token,
-    )
-    issue_comments: list[str] = get_issue_comments(
-        owner=owner, repo=repo_name, issue_number=issue_number, token=token
-    )
+    async def create_progress_comment(token: str, limit: None) -> str:
+        return await create_comment(
+            owner=owner,
+            repo=repo_name,
+            issue_number=issue_number,
+            body="![X](https://progress-bar.dev/0/?title=Progress&width=800)\nGitAuto just started crafting a pull request.",
+            token=token,
+        )
 
-    pr_body: str = write_pr_body(
-        input_message=json.dumps(
-            obj={
-                "issue_title": issue_title,
-                "issue_body": issue_body,
-                "issue_comments": issue_comments,
-                "file_paths": file_paths,
+    async def get_repo_state(
+        token: str, context: IssueContext | None, comment_url: str
+    ) -> dict[str, Any]:
+        """The repository part of the agent's input, small enough to be checkpointed"""
+        if context is not None:
+            return {
+                "base_branch": context["default_branch"],
+                "issue_comments": context["comments"],
+                "latest_commit_sha": context["head_sha"],
+                "tree_sha": context["tree_sha"],
             }
+        base_branch: str = repo["default_branch"]
+        issue_comments, latest_commit_sha = await asyncio.gather(
+            get_issue_comments(
+                owner=owner, repo=repo_name, issue_number=issue_number, token=token
+            ),
+            get_latest_remote_commit_sha(
+                owner=owner,
+                repo=repo_name,
+                branch=base_branch,
+                comment_url=comment_url,
+                unique_issue_id=unique_issue_id,
+                clone_url=repo["clone_url"],
+                token=token,
+            ),
         )
-    )
+        return {
+            "base_branch": base_branch,
+            "issue_comments": issue_comments,
+            "latest_commit_sha": latest_commit_sha,
+            "tree_sha": None,
+        }
 
-    print(
-        f"{time.strftime('%H:%M:%S', time.localtime())} Installation token received.\n"
-    )
+    async def get_file_paths(
+        token: str, repo_state: dict[str, Any], comment_url: str
+    ) -> list[str]:
+        """Not checkpointed, as it can be megabytes on a monorepo. A resumed run lists it again at the same commit."""
+        return await get_remote_file_tree(
+            owner=owner,
+            repo=repo_name,
+            ref=repo_state["base_branch"],
+            comment_url=comment_url,
+            token=token,
+            tree_sha=repo_state.get("tree_sha") or repo_state["latest_commit_sha"],
+        )
 
-    update_comment(
-        comment_url=comment_url,
-        token=token,
-        body="![X](https://progress-bar.dev/20/?title=Progress&width=800)\nJust getting started!",
-    )
+    def write_body(repo_state: dict[str, Any], file_paths: list[str]) -> str:
+        print(
+            f"{time.strftime('%H:%M:%S', time.localtime())} Time to first LLM call: {time.time() - current_time:.2f}s.\n"
+        )
+        return write_pr_body(
+            input_message=json.dumps(
+                obj={
+                    "issue_title": issue_title,
+                    "issue_body": issue_body,
+                    "issue_comments": repo_state["issue_comments"],
+                    "file_paths": file_paths,
+                }
+            )
+        )
 
-    # Create a remote branch
-    uuid: str = str(object=uuid4())
-    new_branch: str = f"{PRODUCT_ID}{ISSUE_NUMBER_FORMAT}{issue['number']}-{uuid}"
-    latest_commit_sha: str = get_latest_remote_commit_sha(
-        owner=owner,
-        repo=repo_name,
-        branch=base_branch,
-        comment_url=comment_url,
-        unique_issue_id=unique_issue_id,
-        clone_url=repo["clone_url"],
-        token=token,
-    )
-    create_remote_branch(
-        branch_name=new_branch,
-        owner=owner,
-        repo=repo_name,
-        sha=latest_commit_sha,
-        comment_url=comment_url,
-        token=token,
-    )
-    print(
-        f"{time.strftime('%H:%M:%S', time.localtime())} Remote branch created: {new_branch}.\n"
-    )
+    def create_progress_reporter(token: str, comment_url: str) -> ProgressReporter:
+        return ProgressReporter(comment_url=comment_url, token=token)
 
-    token_input, token_output = run_assistant(
-        file_paths=file_paths,
-        issue_title=issue_title,
-        issue_body=issue_body,
-        issue_comments=issue_comments,
-        owner=owner,
-        pr_body=pr_body,
-        ref=base_branch,
-        repo=repo_name,
-        comment_url=comment_url,
-        new_branch=new_branch,
-        token=token,
-    )
+    def report_getting_started(progress: ProgressReporter) -> None:
+        progress.update_progress(percent=20, message="Just getting started!")
 
-    update_comment(
-        comment_url=comment_url,
-        token=token,
-        body="![X](https://progress-bar.dev/90/?title=Progress&width=800)\nAlmost there!",
-    )
+    def download_snapshot(
+        token: str, repo_state: dict[str, Any]
+    ) -> RepoSnapshot | None:
+        """Read files from one tarball instead of one request per file if the repository is small enough"""
+        if not should_use_snapshot(repo_size_in_kb=repo["size"]):
+            return None
+        # Shared with a concurrent run of the same commit, if any
+        snapshot: RepoSnapshot | None = acquire_snapshot(
+            owner=owner, repo=repo_name, ref=repo_state["latest_commit_sha"]
+        )
+        if snapshot is not None:
+            return snapshot
+        snapshot = download_repo_snapshot(
+            owner=owner,
+            repo=repo_name,
+            ref=repo_state["latest_commit_sha"],
+            token=token,
+        )
+        if snapshot is not None:
+            register_snapshot(
+                owner=owner,
+                repo=repo_name,
+                refs=[repo_state["base_branch"], repo_state["latest_commit_sha"]],
+                snapshot=snapshot,
+            )
+            print(
+                f"{time.strftime('%H:%M:%S', time.localtime())} Repository snapshot of {repo_state['latest_commit_sha']} downloaded.\n"
+            )
+        return snapshot
 
-    # Create a pull request to the base branch
-    issue_link: str = f"{PR_BODY_STARTS_WITH}{issue_number}]({issue['html_url']})\n\n"
-    git_commands = (
-        f"\n\n## Test these changes locally\n\n"
-        f"```\n"
-        f"git checkout -b {new_branch}\n"
-        f"git pull origin {new_branch}\n"
-        f"```"
-    )
-    pr_url: str | None = create_pull_request(
-        base=base_branch,
-        body=issue_link + pr_body + git_commands,
-        head=new_branch,
-        owner=owner,
-        repo=repo_name,
-        title=f"Fix {issue_title} with {PRODUCT_ID} model",
-        token=token,
-    )
-    print(f"{time.strftime('%H:%M:%S', time.localtime())} Pull request created.\n")
-
-    # Update the issue comment based on if the PR was created or not
-    if pr_url is not None:
-        body_after_pr = pull_request_completed(
-            issuer_name=issuer_name,
-            sender_name=sender_name,
-            pr_url=pr_url,
-            is_automation=is_automation,
-        )
-    else:
-        body_after_pr = UPDATE_COMMENT_FOR_RAISED_ERRORS_BODY
-    update_comment(comment_url=comment_url, token=token, body=body_after_pr)
-
-    end_time = time.time()
-    supabase_manager.complete_and_update_usage_record(
-        usage_record_id=usage_record_id,
-        token_input=token_input,
-        token_output=token_output,
-        total_seconds=int(end_time - current_time),
+    def run_agent(
+        token: str,
+        comment_url: str,
+        progress: ProgressReporter,
+        repo_state: dict[str, Any],
+        file_paths: list[str],
+        pr_body: str,
+        assistant_and_thread: tuple[Assistant, Thread, str],
+        snapshot: RepoSnapshot | None,
+        new_branch: str,
+    ) -> tuple[int, int]:
+        """Returns the input and output token counts"""
+        # The remote branch is created directly at the final commit when the changes are committed
+        print(
+            f"{time.strftime('%H:%M:%S', time.localtime())} Remote branch {new_branch} will be based on {repo_state['latest_commit_sha']}.\n"
+        )
+        assistant, thread, assistant_input_data = assistant_and_thread
+        return run_assistant(
+            file_paths=file_paths,
+            issue_title=issue_title,
+            issue_body=issue_body,
+            issue_comments=repo_state["issue_comments"],
+            owner=owner,
+            pr_body=pr_body,
+            ref=repo_state["base_branch"],
+            repo=repo_name,
+            comment_url=comment_url,
+            new_branch=new_branch,
+            base_sha=repo_state["latest_commit_sha"],
+            assistant=assistant,
+            thread=thread,
+            assistant_input_data=assistant_input_data,
+            progress=progress,
+            checkpoint=checkpoint,
+            save_checkpoint=save_checkpoint,
+            token=token,
+        )
+
+    def report_almost_there(
+        progress: ProgressReporter, tokens_used: tuple[int, int]
+    ) -> None:
+        progress.update_progress(percent=90, message="Almost there!")
+
+    async def open_pull_request(
+        token: str,
+        repo_state: dict[str, Any],
+        pr_body: str,
+        tokens_used: tuple[int, int],
+        new_branch: str,
+    ) -> str | None:
+        """Create a pull request to the base branch"""
+        issue_link: str = (
+            f"{PR_BODY_STARTS_WITH}{issue_number}]({issue['html_url']})\n\n"
+        )
+        git_commands = (
+            f"\n\n## Test these changes locally\n\n"
+            f"```\n"
+            f"git checkout -b {new_branch}\n"
+            f"git pull origin {new_branch}\n"
+            f"```"
+        )
+        pr_url: str | None = await create_pull_request(
+            base=repo_state["base_branch"],
+            body=issue_link + pr_body + git_commands,
+            head=new_branch,
+            owner=owner,
+            repo=repo_name,
+            title=f"Fix {issue_title} with {PRODUCT_ID} model",
+            token=token,
+        )
+        print(f"{time.strftime('%H:%M:%S', time.localtime())} Pull request created.\n")
+        return pr_url
+
+    def report_result(
+        progress: ProgressReporter, pr_url: str | None, almost_there: None
+    ) -> None:
+        """Update the issue comment based on if the PR was created or not"""
+        if pr_url is not None:
+            body_after_pr = pull_request_completed(
+                issuer_name=issuer_name,
+                sender_name=sender_name,
+                pr_url=pr_url,
+                is_automation=is_automation,
+            )
+        else:
+            body_after_pr = UPDATE_COMMENT_FOR_RAISED_ERRORS_BODY
+        progress.update(body=body_after_pr)
+
+    def complete_usage_record(
+        usage_record_id: int, tokens_used: tuple[int, int], result: None
+    ) -> None:
+        token_input, token_output = tokens_used
+        supabase_manager.complete_and_update_usage_record(
+            usage_record_id=usage_record_id,
+            token_input=token_input,
+            token_output=token_output,
+            total_seconds=int(time.time() - current_time),
+            spans=get_breakdown(),
+        )
+
+    def get_breakdown() -> dict[str, Any]:
+        """Seconds per finished stage, and per step within the stages such as assistant runs, tool calls and commits"""
+        return {
+            "stages": {
+                name: round(record.get_seconds() or 0.0, 3)
+                for name, record in executor.records.items()
+                if record.finished_at is not None
+            },
+            "steps": spans.get_breakdown(),
+        }
+
+    stages: list[Stage] = [
+        Stage(name="token", func=wait_for_token),
+        # Read-only, so it's fetched while the request limit is checked
+        Stage(name="context", func=get_context, inputs=("token",)),
+        Stage(
+            name="limit", func=check_request_limit, inputs=("token",), checkpoint=True
+        ),
+        Stage(
+            name="usage_record_id",
+            func=create_usage_record,
+            inputs=("limit",),
+            checkpoint=True,
+        ),
+        Stage(
+            name="reaction",
+            func=add_reaction,
+            inputs=("token", "limit"),
+            checkpoint=True,
+        ),
+        Stage(
+            name="comment_url",
+            func=create_progress_comment,
+            inputs=("token", "limit"),
+            checkpoint=True,
+        ),
+        Stage(
+            name="repo_state",
+            func=get_repo_state,
+            inputs=("token", "context", "comment_url"),
+            checkpoint=True,
+        ),
+        Stage(
+            name="file_paths",
+            func=get_file_paths,
+            inputs=("token", "repo_state", "comment_url"),
+        ),
+        Stage(name="new_branch", func=create_branch_name, checkpoint=True),
+        # Doesn't need the PR body, so it's created while the PR body is written
+        Stage(
+            name="assistant_and_thread",
+            func=create_assistant_and_thread,
+            inputs=("limit",),
+        ),
+        Stage(
+            name="pr_body",
+            func=write_body,
+            inputs=("repo_state", "file_paths"),
+            retries=1,
+            checkpoint=True,
+        ),
+        # Comment updates are sent in the background and never block a stage
+        Stage(
+            name="progress",
+            func=create_progress_reporter,
+            inputs=("token", "comment_url"),
+        ),
+        Stage(
+            name="getting_started",
+            func=report_getting_started,
+            inputs=("progress",),
+            checkpoint=True,
+        ),
+        Stage(
+            name="snapshot",
+            func=download_snapshot,
+            inputs=("token", "repo_state"),
+        ),
+        Stage(
+            name="tokens_used",
+            func=run_agent,
+            inputs=(
+                "token",
+                "comment_url",
+                "progress",
+                "repo_state",
+                "file_paths",
+                "pr_body",
+                "assistant_and_thread",
+                "snapshot",
+                "new_branch",
+            ),
+            checkpoint=True,
+        ),
+        Stage(
+            name="almost_there",
+            func=report_almost_there,
+            inputs=("progress", "tokens_used"),
+        ),
+        Stage(
+            name="pr_url",
+            func=open_pull_request,
+            inputs=("token", "repo_state", "pr_body", "tokens_used", "new_branch"),
+            checkpoint=True,
+        ),
+        Stage(
+            name="result",
+            func=report_result,
+            inputs=("progress", "pr_url", "almost_there"),
+            checkpoint=True,
+        ),
+        Stage(
+            name="usage_completed",
+            func=complete_usage_record,
+            inputs=("usage_record_id", "tokens_used", "result"),
+        ),
+    ]
+
+    # Resume the unfinished run of this issue, if any, e.g. after a Lambda timeout.
+    # The token request starts first so that the lookup overlaps it, and the token stage waits for it, so its span covers the wait the lookup didn't hide.
+    token_task: asyncio.Task[str] = asyncio.create_task(get_token())
+    try:
+        restored: tuple[int, dict[str, Any]] | None = await asyncio.to_thread(
+            supabase_manager.get_checkpoint, unique_issue_id=unique_issue_id
+        )
+    except BaseException:
+        token_task.cancel()
+        raise
+    results: dict[str, Any] = {}
+    if restored is not None:
+        usage_record_id, saved = restored
+        checkpoint.update(saved, usage_record_id=usage_record_id)
+        names: set[str] = {stage.name for stage in stages}
+        results.update({k: v for k, v in checkpoint.items() if k in names})
+        print(
+            f"{time.strftime('%H:%M:%S', time.localtime())} Resuming usage record {usage_record_id} from: {list(checkpoint)}.\n"
+        )
+    executor = StageExecutor(
+        stages=stages,
+        retry_delay_in_seconds=STAGE_RETRY_DELAY_IN_SECONDS,
+        results=results,
+        save_checkpoint=save_checkpoint,
     )
+    # Steps run inside the stages add themselves to these spans
+    spans = Spans()
+    spans_token = current_spans.set(spans)
+    try:
+        await executor.run()
+    except StopPipeline:
+        return
+    finally:
+        snapshot: RepoSnapshot | None = executor.results.get("snapshot")
+        if snapshot is not None:
+            running: int = await asyncio.to_thread(join_tool_calls)
+            if running:
+                logging.warning("%s timed-out tool calls are still running", running)
+            release_snapshot(snapshot=snapshot)
+        progress: ProgressReporter | None = executor.results.get("progress")
+        if progress is not None:
+            # Flush the latest update, e.g. the result, before the Lambda freezes
+            await asyncio.to_thread(progress.close)
+            print(
+                f"{time.strftime('%H:%M:%S', time.localtime())} Progress updates: {progress.get_stats()}.\n"
+            )
+        current_spans.reset(spans_token)
+        print(
+            f"{time.strftime('%H:%M:%S', time.localtime())} Stages: {executor.get_timings()}.\n"
+        )
+        print(
+            f"{time.strftime('%H:%M:%S', time.localtime())} Spans: {json.dumps(obj={'unique_issue_id': unique_issue_id, 'repo_size_in_kb': repo['size'], **get_breakdown()})}.\n"
+        )
+        print(
+            f"{time.strftime('%H:%M:%S', time.localtime())} Blob cache: {blob_cache.get_stats()}.\n"
+        )
+        # Process-wide, so connections opened stay flat across warm invocations while requests grow
+        print(
+            f"{time.strftime('%H:%M:%S', time.localtime())} GitHub connections: {{'sync': {github_client.get_stats()}, 'async': {async_github_client.get_stats()}}}.\n"
+        )
+        print(
+            f"{time.strftime('%H:%M:%S', time.localtime())} OpenAI connections: {get_openai_transport().get_stats()}.\n"
+        )
     return
@@ -0,0 +1,455 @@
+"""asyncio variants of the github_manager functions used by the webhook handlers"""
+
+# Standard imports
+import asyncio
+import datetime
+import json
+import logging
+from typing import Any
+
+# Third-party imports
+import httpx
+
+# Local imports
+from config import (
+    GITHUB_API_URL,
+    GITHUB_APP_IDS,
+    GITHUB_MAX_WORKERS,
+    PRODUCT_ID,
+)
+from utils.handle_exceptions import handle_exceptions
+from utils.text_copy import (
+    UPDATE_COMMENT_FOR_RAISED_ERRORS_BODY,
+    UPDATE_COMMENT_FOR_RAISED_ERRORS_NO_CHANGES_MADE,
+    request_issue_comment,
+    request_limit_reached,
+)
+
+from services.github.file_tree import TreeWalk, index_tree
+from services.github.github_client import async_github_client
+from services.github.github_manager import create_headers, create_jwt, initialize_repo
+from services.github.github_types import GitHubLabeledPayload, IssueContext
+from services.github.paginator import paginate_async
+from services.github.token_cache import installation_token_cache
+from services.supabase import get_supabase_manager
+
+ISSUE_CONTEXT_QUERY = """
+query IssueContext($owner: String!, $repo: String!, $issueNumber: Int!, $cursor: String) {
+  repository(owner: $owner, name: $repo) {
+    defaultBranchRef {
+      name
+      target {
+        oid
+        ... on Commit {
+          tree {
+            oid
+          }
+        }
+      }
+    }
+    issue(number: $issueNumber) {
+      comments(first: 100, after: $cursor) {
+        pageInfo {
+          hasNextPage
+          endCursor
+        }
+        nodes {
+          body
+          performedViaGithubApp {
+            databaseId
+          }
+        }
+      }
+    }
+  }
+}
+"""
+
+
+@handle_exceptions(default_return_value=None, raise_on_error=False)
+async def add_reaction_to_issue(
+    owner: str, repo: str, issue_number: int, content: str, token: str
+) -> None:
+    """https://docs.github.com/en/rest/reactions/reactions?apiVersion=2022-11-28#create-reaction-for-an-issue"""
+    response: httpx.Response = await async_github_client.post(
+        url=f"{GITHUB_API_URL}/repos/{owner}/{repo}/issues/{issue_number}/reactions",
+        headers=create_headers(token=token),
+        json={"content": content},
+    )
+    response.raise_for_status()
+    response.json()
+
+
+@handle_exceptions(default_return_value=None, raise_on_error=False)
+async def create_comment(
+    owner: str, repo: str, issue_number: int, body: str, token: str
+) -> str:
+    """https://docs.github.com/en/rest/issues/comments?apiVersion=2022-11-28#create-an-issue-comment"""
+    response: httpx.Response = await async_github_client.post(
+        url=f"{GITHUB_API_URL}/repos/{owner}/{repo}/issues/{issue_number}/comments",
+        headers=create_headers(token=token),
+        json={
+            "body": body,
+        },
+    )
+
+    response.raise_for_status()
+    return response.json()["url"]
+
+
+@handle_exceptions(default_return_value=None, raise_on_error=False)
+async def create_comment_on_issue_with_gitauto_button(
+    payload: GitHubLabeledPayload,
+) -> None:
+    """https://docs.github.com/en/rest/issues/comments?apiVersion=2022-11-28#create-an-issue-comment"""
+    installation_id: int = payload["installation"]["id"]
+    token: str = await get_installation_access_token(installation_id=installation_id)
+
+    owner: str = payload["repository"]["owner"]["login"]
+    owner_id: int = payload["repository"]["owner"]["id"]
+    repo_name: str = payload["repository"]["name"]
+    issue_number: int = payload["issue"]["number"]
+    user_id: int = payload["sender"]["id"]
+    user_name: str = payload["sender"]["login"]
+
+    supabase_manager = get_supabase_manager()
+
+    # Supabase calls are blocking, so run them in a worker thread to keep the event loop free
+    first_issue = False
+    if not await asyncio.to_thread(supabase_manager.user_exists, user_id=user_id):
+        await asyncio.to_thread(
+            supabase_manager.create_user,
+            user_id=user_id,
+            user_name=user_name,
+            installation_id=installation_id,
+        )
+        first_issue = True
+    elif await asyncio.to_thread(
+        supabase_manager.is_users_first_issue,
+        user_id=user_id,
+        installation_id=installation_id,
+    ):
+        first_issue = True
+
+    requests_left, request_count, end_date = await asyncio.to_thread(
+        supabase_manager.get_how_many_requests_left_and_cycle,
+        user_id=user_id,
+        installation_id=installation_id,
+        user_name=user_name,
+        owner_id=owner_id,
+        owner_name=owner,
+    )
+
+    body = "Click the checkbox below to generate a PR!\n- [ ] Generate PR"
+    if PRODUCT_ID != "gitauto":
+        body += " - " + PRODUCT_ID
+
+    if end_date != datetime.datetime(
+        year=1, month=1, day=1, hour=0, minute=0, second=0
+    ):
+        body += request_issue_comment(requests_left=requests_left, end_date=end_date)
+
+    if requests_left <= 0:
+        logging.info("\nRequest limit reached for user %s.", user_name)
+        body = request_limit_reached(
+            user_name=user_name,
+            request_count=request_count,
+            end_date=end_date,
+        )
+
+    if first_issue:
+        body = "Welcome to GitAuto! 🎉\n" + body
+        await asyncio.to_thread(
+            supabase_manager.set_user_first_issue_to_false,
+            user_id=user_id,
+            installation_id=installation_id,
+        )
+
+    response: httpx.Response = await async_github_client.post(
+        url=f"{GITHUB_API_URL}/repos/{owner}/{repo_name}/issues/{issue_number}/comments",
+        headers=create_headers(token=token),
+        json={
+            "body": body,
+        },
+    )
+    response.raise_for_status()
+
+    return response.json()
+
+
+@handle_exceptions(default_return_value=None, raise_on_error=False)
+async def create_pull_request(
+    base: str,  # The branch name you want to merge your changes into. ex) 'main'
+    body: str,
+    head: str,  # The branch name that contains your changes
+    owner: str,
+    repo: str,
+    title: str,
+    token: str,
+) -> str | None:
+    """https://docs.github.com/en/rest/pulls/pulls#create-a-pull-request"""
+    response: httpx.Response = await async_github_client.post(
+        url=f"{GITHUB_API_URL}/repos/{owner}/{repo}/pulls",
+        headers=create_headers(token=token),
+        json={"title": title, "body": body, "head": head, "base": base},
+    )
+    response.raise_for_status()
+    return response.json()["html_url"]
+
+
+@handle_exceptions(default_return_value=None, raise_on_error=False)
+async def get_installation_access_token(installation_id: int) -> str | None:
+    """Shares the token cache with github_manager.get_installation_access_token.
+    https://docs.github.com/en/rest/apps/apps?apiVersion=2022-11-28#create-an-installation-access-token-for-an-app
+    """
+    cached_token: str | None = installation_token_cache.get(key=installation_id)
+    if cached_token is not None:
+        return cached_token
+
+    jwt_token: str = create_jwt()
+    response: httpx.Response = await async_github_client.post(
+        url=f"{GITHUB_API_URL}/app/installations/{installation_id}/access_tokens",
+        headers=create_headers(token=jwt_token),
+    )
+    response.raise_for_status()
+    token_info: dict[str, Any] = response.json()
+    expires_at: datetime.datetime = datetime.datetime.fromisoformat(
+        token_info["expires_at"].replace("Z", "+00:00")
+    )  # ex) "2016-07-11T22:14:10Z"
+    installation_token_cache.set(
+        key=installation_id,
+        token=token_info["token"],
+        expires_at=expires_at.timestamp(),
+    )
+    return token_info["token"]
+
+
+@handle_exceptions(default_return_value=None, raise_on_error=False)
+async def get_issue_context(
+    owner: str, repo: str, issue_number: int, token: str
+) -> IssueContext | None:
+    """Issue comments, default branch, head commit and root tree in one round trip, or None to use REST. https://docs.github.com/en/graphql/reference/objects#repository"""
+    comments: list[str] = []
+    cursor: str | None = None
+    while True:
+        response: httpx.Response = await async_github_client.post(
+            url=f"{GITHUB_API_URL}/graphql",
+            headers=create_headers(token=token),
+            json={
+                "query": ISSUE_CONTEXT_QUERY,
+                "variables": {
+                    "owner": owner,
+                    "repo": repo,
+                    "issueNumber": issue_number,
+                    "cursor": cursor,
+                },
+            },
+        )
+        response.raise_for_status()
+        result: dict[str, Any] = response.json()
+        if result.get("errors"):
+            logging.error(msg=f"get_issue_context GraphQL errors: {result['errors']}")
+            return None
+        repository: dict[str, Any] = result["data"]["repository"]
+        if cursor is None:
+            default_branch_ref: dict[str, Any] | None = repository["defaultBranchRef"]
+            if default_branch_ref is None:
+                return None
+        # Same as the performed_via_github_app filter in get_issue_comments: comments posted by GitHub Apps other than GitAuto's
+        comments.extend(
+            comment["body"]
+            for comment in repository["issue"]["comments"]["nodes"]
+            if comment["performedViaGithubApp"] is not None
+            and comment["performedViaGithubApp"]["databaseId"] not in GITHUB_APP_IDS
+        )
+        page_info: dict[str, Any] = repository["issue"]["comments"]["pageInfo"]
+        if not page_info["hasNextPage"]:
+            break
+        cursor = page_info["endCursor"]
+
+    return {
+        "comments": comments,
+        "default_branch": default_branch_ref["name"],
+        "head_sha": default_branch_ref["target"]["oid"],
+        "tree_sha": default_branch_ref["target"]["tree"]["oid"],
+    }
+
+
+@handle_exceptions(default_return_value=[], raise_on_error=False)
+async def get_issue_comments(
+    owner: str, repo: str, issue_number: int, token: str
+) -> list[str]:
+    """https://docs.github.com/en/rest/issues/comments#list-issue-comments"""
+    comments: list[Any] = [
+        comment
+        async for comment in paginate_async(
+            url=f"{GITHUB_API_URL}/repos/{owner}/{repo}/issues/{issue_number}/comments",
+            headers=create_headers(token=token),
+        )
+    ]
+    filtered_comments: list[Any] = [
+        comment
+        for comment in comments
+        if comment.get("performed_via_github_app")
+        and comment["performed_via_github_app"].get("id") not in GITHUB_APP_IDS
+    ]
+    print(f"\nIssue comments: {json.dumps(filtered_comments, indent=2)}\n")
+    comment_texts: list[str] = [comment["body"] for comment in filtered_comments]
+    return comment_texts
+
+
+async def get_latest_remote_commit_sha(
+    owner: str,
+    repo: str,
+    branch: str,
+    comment_url: str,
+    unique_issue_id: str,
+    clone_url: str,
+    token: str,
+) -> str:
+    """SHA stands for Secure Hash Algorithm. It's a unique identifier for a commit.
+    https://docs.github.com/en/rest/git/refs?apiVersion=2022-11-28#get-a-reference"""
+    try:
+        response: httpx.Response = await async_github_client.get(
+            url=f"{GITHUB_API_URL}/repos/{owner}/{repo}/git/ref/heads/{branch}",
+            headers=create_headers(token=token),
+        )
+        response.raise_for_status()
+        return response.json()["object"]["sha"]
+    except httpx.HTTPStatusError as e:
+        if (
+            e.response.status_code == 409
+            and e.response.json()["message"] == "Git Repository is empty."
+        ):
+            logging.info(
+                msg="Repository is empty. So, creating an initial empty commit."
+            )
+            await asyncio.to_thread(
+                initialize_repo,
+                repo_path=f"/tmp/repo/{owner}-{repo}",
+                remote_url=clone_url,
+            )
+            return await get_latest_remote_commit_sha(
+                owner=owner,
+                repo=repo,
+                branch=branch,
+                comment_url=comment_url,
+                unique_issue_id=unique_issue_id,
+                clone_url=clone_url,
+                token=token,
+            )
+        raise
+    except Exception as e:
+        await update_comment_for_raised_errors(
+            error=e,
+            comment_url=comment_url,
+            token=token,
+            which_function=get_latest_remote_commit_sha.__name__,
+        )
+        # Raise an error because we can't continue without the latest commit SHA
+        raise RuntimeError(
+            f"Error: Could not get the latest commit SHA in {get_latest_remote_commit_sha.__name__}"
+        ) from e
+
+
+async def get_remote_file_tree(
+    owner: str,
+    repo: str,
+    ref: str,
+    comment_url: str,
+    token: str,
+    tree_sha: (
+        str | None
+    ) = None,  # Root tree of ref if already known, which never changes
+) -> list[str]:
+    """
+    Get the file tree of a GitHub repository at a ref branch. Truncated trees are walked concurrently.
+    https://docs.github.com/en/rest/git/trees?apiVersion=2022-11-28#get-a-tree
+    """
+    try:
+        walk = TreeWalk(tree_sha=tree_sha or ref)
+        semaphore = asyncio.Semaphore(value=GITHUB_MAX_WORKERS)
+
+        async def get_level_tree(request: tuple[str, str, bool]) -> dict[str, Any]:
+            async with semaphore:
+                return await get_tree(
+                    owner=owner,
+                    repo=repo,
+                    tree_sha=request[1],
+                    token=token,
+                    recursive=request[2],
+                )
+
+        while walk.pending:
+            level: list[tuple[str, str, bool]] = walk.next_level()
+            trees: list[dict[str, Any]] = await asyncio.gather(
+                *(get_level_tree(request=request) for request in level)
+            )
+            for request, tree in zip(level, trees):
+                walk.add(request=request, tree=tree)
+        return index_tree(owner=owner, repo=repo, ref=ref, tree=walk.items)
+    except httpx.HTTPStatusError as http_err:
+        # Log the error if it's not a 409 error (empty repository)
+        if http_err.response.status_code != 409:
+            logging.error(
+                msg=f"get_remote_file_tree HTTP Error: {http_err.response.status_code} - {http_err.response.text}"
+            )
+        return []
+    except Exception as e:  # pylint: disable=broad-except
+        await update_comment_for_raised_errors(
+            error=e,
+            comment_url=comment_url,
+            token=token,
+            which_function=get_remote_file_tree.__name__,
+        )
+        return []
+
+
+async def get_tree(
+    owner: str, repo: str, tree_sha: str, token: str, recursive: bool = True
+) -> dict[str, Any]:
+    """tree_sha can also be a commit SHA or a branch name. https://docs.github.com/en/rest/git/trees?apiVersion=2022-11-28#get-a-tree"""
+    response: httpx.Response = await async_github_client.get(
+        url=f"{GITHUB_API_URL}/repos/{owner}/{repo}/git/trees/{tree_sha}",
+        headers=create_headers(token=token),
+        params={"recursive": 1} if recursive else None,
+        use_etag_cache=True,
+    )
+    response.raise_for_status()
+    return response.json()
+
+
+@handle_exceptions(default_return_value=None, raise_on_error=False)
+async def update_comment(comment_url: str, body: str, token: str) -> dict[str, Any]:
+    """https://docs.github.com/en/rest/issues/comments#update-an-issue-comment"""
+    response: httpx.Response = await async_github_client.patch(
+        url=comment_url,
+        headers=create_headers(token=token),
+        json={"body": body},
+    )
+    response.raise_for_status()
+    return response.json()
+
+
+async def update_comment_for_raised_errors(
+    error: Any, comment_url: str, token: str, which_function: str
+) -> dict[str, Any]:
+    """Update the comment on issue with an error message and raise the error."""
+    body = UPDATE_COMMENT_FOR_RAISED_ERRORS_BODY
+    if isinstance(error, httpx.HTTPStatusError):
+        logging.error(
+            "%s HTTP Error: %s - %s",
+            which_function,
+            error.response.status_code,
+            error.response.text,
+        )
+        if (
+            error.response.status_code == 422
+            and "No commits between" in error.response.text
+        ):
+            body = UPDATE_COMMENT_FOR_RAISED_ERRORS_NO_CHANGES_MADE
+    else:
+        logging.error("%s Error: %s", which_function, error)
+    await update_comment(comment_url=comment_url, token=token, body=body)
+
+    raise RuntimeError("Error occurred")
@@ -0,0 +1,157 @@
+# Standard imports
+import hashlib
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+
+# Local imports
+from config import (
+    BLOB_CACHE_DIR,
+    BLOB_CACHE_DISK_MAX_BYTES,
+    BLOB_CACHE_MEMORY_MAX_BYTES,
+)
+
+
+class BlobCache:
+    """File contents by git blob SHA, which never go stale, in an LRU in memory and one on disk. https://git-scm.com/book/en/v2/Git-Internals-Git-Objects"""
+
+    def __init__(
+        self,
+        disk_dir: str = BLOB_CACHE_DIR,
+        disk_max_bytes: int = BLOB_CACHE_DISK_MAX_BYTES,
+        memory_max_bytes: int = BLOB_CACHE_MEMORY_MAX_BYTES,
+    ) -> None:
+        self.disk_dir: str = disk_dir
+        self.disk_max_bytes: int = disk_max_bytes
+        self.memory_max_bytes: int = memory_max_bytes
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.bytes_served = 0
+        self._memory: OrderedDict[str, bytes] = OrderedDict()
+        self._memory_bytes = 0
+        self._disk: OrderedDict[str, int] = OrderedDict()  # sha -> size
+        self._disk_bytes = 0
+        self._lock = threading.Lock()
+        self._load_disk_index()
+
+    def _get_path(self, sha: str) -> str:
+        return os.path.join(self.disk_dir, sha[:2], sha[2:])
+
+    def _load_disk_index(self) -> None:
+        """Pick up blobs written by a previous run, oldest access first."""
+        if not os.path.isdir(self.disk_dir):
+            return
+        blobs: list[tuple[float, str, int]] = []
+        for prefix in os.listdir(path=self.disk_dir):
+            prefix_dir = os.path.join(self.disk_dir, prefix)
+            if len(prefix) != 2 or not os.path.isdir(prefix_dir):
+                continue
+            for rest in os.listdir(path=prefix_dir):
+                stat = os.stat(path=os.path.join(prefix_dir, rest))
+                blobs.append((stat.st_mtime, prefix + rest, stat.st_size))
+        for _, sha, size in sorted(blobs):
+            self._disk[sha] = size
+            self._disk_bytes += size
+        with self._lock:
+            self._evict_disk()
+
+    def _evict_disk(self) -> None:
+        while self._disk_bytes > self.disk_max_bytes and self._disk:
+            sha, size = self._disk.popitem(last=False)
+            self._disk_bytes -= size
+            try:
+                os.remove(path=self._get_path(sha=sha))
+            except FileNotFoundError:
+                pass
+
+    def _put_memory(self, sha: str, content: bytes) -> None:
+        if len(content) > self.memory_max_bytes:
+            return
+        old: bytes | None = self._memory.pop(sha, None)
+        if old is not None:
+            self._memory_bytes -= len(old)
+        self._memory[sha] = content
+        self._memory_bytes += len(content)
+        while self._memory_bytes > self.memory_max_bytes:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= len(evicted)
+
+    def get(self, sha: str) -> bytes | None:
+        with self._lock:
+            content: bytes | None = self._memory.get(sha)
+            if content is not None:
+                self._memory.move_to_end(key=sha)
+                self.memory_hits += 1
+                self.bytes_served += len(content)
+                return content
+            on_disk: bool = sha in self._disk
+        if on_disk:
+            try:
+                with open(file=self._get_path(sha=sha), mode="rb") as blob_file:
+                    content = blob_file.read()
+                os.utime(path=self._get_path(sha=sha))  # Keep the LRU order on restart
+            except FileNotFoundError:
+                content = None
+        with self._lock:
+            if content is None:
+                self.misses += 1
+                size: int | None = self._disk.pop(sha, None)
+                if size is not None:
+                    self._disk_bytes -= size
+                return None
+            if sha in self._disk:
+                self._disk.move_to_end(key=sha)
+            self._put_memory(sha=sha, content=content)
+            self.disk_hits += 1
+            self.bytes_served += len(content)
+            return content
+
+    def get_stats(self) -> dict[str, float]:
+        with self._lock:
+            hits: int = self.memory_hits + self.disk_hits
+            requests_count: int = hits + self.misses
+            return {
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_ratio": hits / requests_count if requests_count else 0.0,
+                "bytes_served": self.bytes_served,
+                "memory_bytes": self._memory_bytes,
+                "disk_bytes": self._disk_bytes,
+            }
+
+    @staticmethod
+    def get_blob_sha(content: bytes) -> str:
+        """Same SHA as `git hash-object`"""
+        header: bytes = f"blob {len(content)}\0".encode()
+        return hashlib.sha1(header + content, usedforsecurity=False).hexdigest()
+
+    def put(self, content: bytes) -> str:
+        """Store content under its own blob SHA, so a wrong key can never be cached, and return the SHA."""
+        sha: str = self.get_blob_sha(content=content)
+        with self._lock:
+            self._put_memory(sha=sha, content=content)
+            if sha in self._disk or len(content) > self.disk_max_bytes:
+                return sha
+        try:
+            # Write to a temp file and rename so that a reader never sees a partial blob
+            blob_dir = os.path.dirname(self._get_path(sha=sha))
+            os.makedirs(name=blob_dir, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=blob_dir)
+            with os.fdopen(fd, mode="wb") as tmp_file:
+                tmp_file.write(content)
+            os.replace(src=tmp_path, dst=self._get_path(sha=sha))
+        except OSError:
+            return sha  # e.g. /tmp is full. The memory tier still has it.
+        with self._lock:
+            if sha not in self._disk:
+                self._disk[sha] = len(content)
+                self._disk_bytes += len(content)
+            self._evict_disk()
+        return sha
+
+
+# Shared by every run in this process
+blob_cache = BlobCache()
@@ -0,0 +1,160 @@
+# Standard imports
+import threading
+from collections import OrderedDict
+from typing import Any, Iterator, NamedTuple
+
+IMAGE_EXTENSIONS = (".png", ".jpeg", ".jpg", ".webp", ".gif")
+BINARY_EXTENSIONS = (
+    ".7z", ".a", ".bin", ".bmp", ".class", ".dll", ".dylib", ".eot", ".exe", ".gz",
+    ".ico", ".jar", ".mov", ".mp3", ".mp4", ".o", ".otf", ".pdf", ".pyc", ".so",
+    ".tar", ".tgz", ".ttf", ".wasm", ".wav", ".woff", ".woff2", ".zip",
+)  # fmt: skip
+# Vendored, generated or cached directories. They are not walked, indexed nor shown to the agent.
+EXCLUDED_DIRS = frozenset((
+    ".git", ".next", ".nuxt", ".terraform", ".tox", ".venv", "__pycache__",
+    "bower_components", "coverage", "node_modules", "third_party", "vendor", "venv",
+))  # fmt: skip
+# Generated files. They are indexed but not shown to the agent.
+GENERATED_FILE_NAMES = frozenset((
+    "Cargo.lock", "composer.lock", "Gemfile.lock", "go.sum", "package-lock.json",
+    "Pipfile.lock", "pnpm-lock.yaml", "poetry.lock", "yarn.lock",
+))  # fmt: skip
+GENERATED_EXTENSIONS = (".map", ".min.css", ".min.js", ".snap")
+SUBMODULE_MODE = "160000"
+MAX_INDEXED_TREES = 32
+
+
+class FileEntry(NamedTuple):
+    """What the Git Trees API tells us about a file before downloading it."""
+
+    sha: str  # Blob SHA. ex) "3d21ec53a331a6f037a91c368710b99387d012c1"
+    size: int  # In bytes. 0 for submodules
+    mode: str  # ex) "100644", "100755", "120000" (symlink), "160000" (submodule)
+
+
+class PathTrie:
+    """path -> FileEntry as nested dicts of path segments, so shared directory names are stored once"""
+
+    def __init__(self) -> None:
+        self._root: dict[str, Any] = {}
+        self._size = 0
+
+    def __contains__(self, path: str) -> bool:
+        return self.get(path=path) is not None
+
+    def __iter__(self) -> Iterator[str]:
+        """Paths in insertion order, grouped by directory"""
+        stack: list[tuple[str, Iterator[tuple[str, Any]]]] = [
+            ("", iter(self._root.items()))
+        ]
+        while stack:
+            prefix, children = stack[-1]
+            child: tuple[str, Any] | None = next(children, None)
+            if child is None:
+                stack.pop()
+            elif isinstance(child[1], FileEntry):
+                yield prefix + child[0]
+            else:
+                stack.append((f"{prefix}{child[0]}/", iter(child[1].items())))
+
+    def __len__(self) -> int:
+        return self._size
+
+    def add(self, path: str, entry: FileEntry) -> None:
+        *dirs, name = path.split("/")
+        node: dict[str, Any] = self._root
+        for directory in dirs:
+            node = node.setdefault(directory, {})
+        if name not in node:
+            self._size += 1
+        node[name] = entry
+
+    def get(self, path: str) -> FileEntry | None:
+        node: Any = self._root
+        for segment in path.split("/"):
+            if not isinstance(node, dict):
+                return None
+            node = node.get(segment)
+        return node if isinstance(node, FileEntry) else None
+
+
+# (owner, repo, ref) -> PathTrie, for the most recently fetched trees
+_file_indexes: OrderedDict[tuple[str, str, str], PathTrie] = OrderedDict()
+_lock = threading.Lock()
+
+
+def get_file_entry(owner: str, repo: str, ref: str, file_path: str) -> FileEntry | None:
+    with _lock:
+        file_index = _file_indexes.get((owner, repo, ref))
+        return None if file_index is None else file_index.get(path=file_path)
+
+
+def index_tree(
+    owner: str, repo: str, ref: str, tree: list[dict[str, Any]]
+) -> list[str]:
+    """Keep a compact path -> (sha, size, mode) index of a tree from the Git Trees API and return the paths worth showing to the agent."""
+    file_index = PathTrie()
+    for item in tree:
+        if item["type"] in ("blob", "commit") and not is_excluded(path=item["path"]):
+            file_index.add(
+                path=item["path"],
+                entry=FileEntry(
+                    sha=item["sha"], size=item.get("size", 0), mode=item["mode"]
+                ),
+            )
+    with _lock:
+        _file_indexes[(owner, repo, ref)] = file_index
+        _file_indexes.move_to_end(key=(owner, repo, ref))
+        while len(_file_indexes) > MAX_INDEXED_TREES:
+            _file_indexes.popitem(last=False)
+    return [path for path in file_index if is_useful(path=path)]
+
+
+def is_binary(content: bytes) -> bool:
+    """Same heuristic as git: a NUL byte in the first 8000 bytes"""
+    return b"\0" in content[:8000]
+
+
+def is_excluded(path: str) -> bool:
+    """Whether a path is in or is a vendored, generated or cached directory"""
+    return any(directory in EXCLUDED_DIRS for directory in path.split("/"))
+
+
+def is_useful(path: str) -> bool:
+    """Whether a path is worth listing in prompts. Images are, because they can be described."""
+    name: str = path.rsplit("/", 1)[-1]
+    return not (
+        path.endswith(BINARY_EXTENSIONS)
+        or path.endswith(GENERATED_EXTENSIONS)
+        or name in GENERATED_FILE_NAMES
+    )
+
+
+class TreeWalk:
+    """Lists a truncated tree level by level, sending the requests of one level concurrently. https://docs.github.com/en/rest/git/trees?apiVersion=2022-11-28#get-a-tree"""
+
+    def __init__(self, tree_sha: str) -> None:
+        self.items: list[dict[str, Any]] = []
+        # (path prefix, tree SHA, recursive) to request next
+        self.pending: list[tuple[str, str, bool]] = [("", tree_sha, True)]
+
+    def add(self, request: tuple[str, str, bool], tree: dict[str, Any]) -> None:
+        """Record the response to a pending request and queue the requests it leads to."""
+        prefix, tree_sha, recursive = request
+        if recursive and tree["truncated"]:
+            self.pending.append((prefix, tree_sha, False))
+            return
+        for item in tree["tree"]:
+            path: str = prefix + item["path"]
+            if is_excluded(path=path):
+                continue
+            if item["type"] == "tree":
+                if not recursive:
+                    self.pending.append((path + "/", item["sha"], True))
+                continue
+            self.items.append({**item, "path": path})
+
+    def next_level(self) -> list[tuple[str, str, bool]]:
+        """Take the requests to send concurrently next"""
+        pending, self.pending = self.pending, []
+        return pending
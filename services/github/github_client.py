@@ -0,0 +1,342 @@
+# Standard imports
+import asyncio
+import logging
+import threading
+import time
+from typing import Any
+
+# Third-party imports
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+# Local imports
+from config import (
+    GITHUB_CONNECT_TIMEOUT_IN_SECONDS,
+    GITHUB_POOL_MAXSIZE,
+    GITHUB_READ_TIMEOUT_IN_SECONDS,
+)
+from services.github.rate_limiter import rate_limiter
+from services.github.response_cache import CachedResponse, response_cache
+from services.github.token_cache import get_token_scope
+
+# Number of connections opened by the current thread, so that each call can tell whether it reused a pooled connection
+_connection_events = threading.local()
+
+
+def _count_new_connection() -> None:
+    _connection_events.opened = getattr(_connection_events, "opened", 0) + 1
+
+
+class _CountingHTTPConnectionPool(HTTPConnectionPool):
+    def _new_conn(self) -> Any:
+        _count_new_connection()
+        return super()._new_conn()
+
+
+class _CountingHTTPSConnectionPool(HTTPSConnectionPool):
+    def _new_conn(self) -> Any:
+        _count_new_connection()
+        return super()._new_conn()
+
+
+class _CountingHTTPAdapter(HTTPAdapter):
+    """HTTPAdapter whose connection pools record every new TCP+TLS connection they open."""
+
+    def init_poolmanager(self, *args: Any, **kwargs: Any) -> None:
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": _CountingHTTPConnectionPool,
+            "https": _CountingHTTPSConnectionPool,
+        }
+
+
+def _merge_cached_headers(
+    cached: CachedResponse, fresh: Any
+) -> CaseInsensitiveDict[str]:
+    """Cached headers refreshed with the rate limit headers of the 304 response."""
+    headers: CaseInsensitiveDict[str] = cached.headers.copy()
+    headers.update(
+        {k: v for k, v in fresh.items() if k.lower().startswith("x-ratelimit")}
+    )
+    return headers
+
+
+def _get_scope(headers: dict[str, str] | None) -> str:
+    """Rate limits are per installation (or per app for JWT requests)"""
+    token: str = (headers or {}).get("Authorization", "").removeprefix("Bearer ")
+    return get_token_scope(token=token)
+
+
+def _remove_conditional_headers(headers: dict[str, str]) -> dict[str, str]:
+    return {
+        k: v
+        for k, v in headers.items()
+        if k not in ("If-None-Match", "If-Modified-Since")
+    }
+
+
+class _CachedRequestsResponse(requests.Response):
+    """A cached 200 response served in place of a 304 Not Modified."""
+
+    cached: CachedResponse
+
+    def json(self, **kwargs: Any) -> Any:
+        return self.cached.json()
+
+
+class _CachedHTTPXResponse(httpx.Response):
+    """A cached 200 response served in place of a 304 Not Modified."""
+
+    cached: CachedResponse
+
+    def json(self, **kwargs: Any) -> Any:
+        return self.cached.json()
+
+
+class _ConnectionStats:
+    """Per-call connection reuse stats shared by the sync and async clients."""
+
+    def __init__(self) -> None:
+        self._stats_lock = threading.Lock()
+        self._stats: dict[str, float] = {
+            "requests": 0,
+            "connections_opened": 0,
+            "connections_reused": 0,
+            "seconds_on_new_connections": 0.0,
+            "seconds_on_reused_connections": 0.0,
+        }
+
+    def get_stats(self) -> dict[str, float]:
+        """Connection reuse stats. The latency gap approximates the handshake time saved per reuse."""
+        with self._stats_lock:
+            stats: dict[str, float] = dict(self._stats)
+        opened, reused = stats["connections_opened"], stats["connections_reused"]
+        stats["avg_seconds_on_new_connections"] = (
+            stats["seconds_on_new_connections"] / opened if opened else 0.0
+        )
+        stats["avg_seconds_on_reused_connections"] = (
+            stats["seconds_on_reused_connections"] / reused if reused else 0.0
+        )
+        return {
+            key: round(value, 3) if isinstance(value, float) else value
+            for key, value in stats.items()
+        }
+
+    def _record(self, method: str, url: str, opened: int, seconds: float) -> None:
+        reused: bool = opened == 0
+        with self._stats_lock:
+            self._stats["requests"] += 1
+            if reused:
+                self._stats["connections_reused"] += 1
+                self._stats["seconds_on_reused_connections"] += seconds
+            else:
+                self._stats["connections_opened"] += opened
+                self._stats["seconds_on_new_connections"] += seconds
+        logging.debug(
+            "GitHub %s %s took %.3fs (connection %s)",
+            method,
+            url,
+            seconds,
+            "reused" if reused else "opened",
+        )
+
+
+class GitHubClient(_ConnectionStats):
+    """Keeps connections to the GitHub API alive across calls. https://requests.readthedocs.io/en/latest/user/advanced/#session-objects"""
+
+    def __init__(
+        self,
+        pool_maxsize: int = GITHUB_POOL_MAXSIZE,
+        connect_timeout: float = GITHUB_CONNECT_TIMEOUT_IN_SECONDS,
+        read_timeout: float = GITHUB_READ_TIMEOUT_IN_SECONDS,
+    ) -> None:
+        super().__init__()
+        self.timeout: tuple[float, float] = (connect_timeout, read_timeout)
+        self.session = requests.Session()
+        adapter = _CountingHTTPAdapter(pool_maxsize=pool_maxsize)
+        self.session.mount(prefix="https://", adapter=adapter)
+        self.session.mount(prefix="http://", adapter=adapter)
+
+    def request(self, method: str, url: str, **kwargs: Any) -> requests.Response:
+        kwargs.setdefault("timeout", self.timeout)
+        scope: str = _get_scope(headers=kwargs.get("headers"))
+        time.sleep(
+            rate_limiter.reserve(
+                scope=scope, method=method, url=url, json_body=kwargs.get("json")
+            )
+        )
+        _connection_events.opened = 0
+        start: float = time.perf_counter()
+        try:
+            response = self.session.request(method=method, url=url, **kwargs)
+            rate_limiter.record(scope=scope, headers=response.headers)
+            return response
+        finally:
+            self._record(
+                method=method,
+                url=url,
+                opened=_connection_events.opened,
+                seconds=time.perf_counter() - start,
+            )
+
+    def get(
+        self, url: str, use_etag_cache: bool = False, **kwargs: Any
+    ) -> requests.Response:
+        """With use_etag_cache, send a conditional request and serve a 304 Not Modified from the response cache."""
+        if not use_etag_cache:
+            return self.request(method="GET", url=url, **kwargs)
+
+        headers: dict[str, str] = dict(kwargs.pop("headers", None) or {})
+        key: str = response_cache.create_key(
+            url=url, headers=headers, params=kwargs.get("params")
+        )
+        headers.update(response_cache.get_conditional_headers(key=key))
+        response = self.request(method="GET", url=url, headers=headers, **kwargs)
+        if response.status_code == 304:
+            cached: CachedResponse | None = response_cache.hit(key=key)
+            if cached is not None:
+                cached_response = _CachedRequestsResponse()
+                cached_response.cached = cached
+                cached_response.status_code = 200
+                cached_response.reason = "OK"
+                cached_response.url = response.url
+                cached_response.request = response.request
+                cached_response.headers = _merge_cached_headers(
+                    cached=cached, fresh=response.headers
+                )
+                cached_response._content = (  # pylint: disable=protected-access
+                    cached.content
+                )
+                return cached_response
+
+            # The entry was evicted after the conditional request was sent
+            response = self.request(
+                method="GET",
+                url=url,
+                headers=_remove_conditional_headers(headers=headers),
+                **kwargs,
+            )
+        if response.status_code == 200:
+            response_cache.put(
+                key=key, content=response.content, headers=dict(response.headers)
+            )
+        return response
+
+    def patch(self, url: str, **kwargs: Any) -> requests.Response:
+        return self.request(method="PATCH", url=url, **kwargs)
+
+    def post(self, url: str, **kwargs: Any) -> requests.Response:
+        return self.request(method="POST", url=url, **kwargs)
+
+    def put(self, url: str, **kwargs: Any) -> requests.Response:
+        return self.request(method="PUT", url=url, **kwargs)
+
+
+class AsyncGitHubClient(_ConnectionStats):
+    """asyncio counterpart of GitHubClient. https://www.python-httpx.org/async/"""
+
+    def __init__(
+        self,
+        pool_maxsize: int = GITHUB_POOL_MAXSIZE,
+        connect_timeout: float = GITHUB_CONNECT_TIMEOUT_IN_SECONDS,
+        read_timeout: float = GITHUB_READ_TIMEOUT_IN_SECONDS,
+    ) -> None:
+        super().__init__()
+        self.limits = httpx.Limits(max_keepalive_connections=pool_maxsize)
+        self.timeout = httpx.Timeout(timeout=read_timeout, connect=connect_timeout)
+        self._client: httpx.AsyncClient | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+
+    async def request(self, method: str, url: str, **kwargs: Any) -> httpx.Response:
+        opened = 0
+
+        async def trace(event_name: str, _info: dict[str, Any]) -> None:
+            nonlocal opened
+            if event_name == "connection.connect_tcp.started":
+                opened += 1
+
+        scope: str = _get_scope(headers=kwargs.get("headers"))
+        await asyncio.sleep(
+            rate_limiter.reserve(
+                scope=scope, method=method, url=url, json_body=kwargs.get("json")
+            )
+        )
+        start: float = time.perf_counter()
+        try:
+            response = await self._get_client().request(
+                method=method, url=url, extensions={"trace": trace}, **kwargs
+            )
+            rate_limiter.record(scope=scope, headers=response.headers)
+            return response
+        finally:
+            self._record(
+                method=method,
+                url=url,
+                opened=opened,
+                seconds=time.perf_counter() - start,
+            )
+
+    async def get(
+        self, url: str, use_etag_cache: bool = False, **kwargs: Any
+    ) -> httpx.Response:
+        """With use_etag_cache, send a conditional request and serve a 304 Not Modified from the response cache."""
+        if not use_etag_cache:
+            return await self.request(method="GET", url=url, **kwargs)
+
+        headers: dict[str, str] = dict(kwargs.pop("headers", None) or {})
+        key: str = response_cache.create_key(
+            url=url, headers=headers, params=kwargs.get("params")
+        )
+        headers.update(response_cache.get_conditional_headers(key=key))
+        response = await self.request(method="GET", url=url, headers=headers, **kwargs)
+        if response.status_code == 304:
+            cached: CachedResponse | None = response_cache.hit(key=key)
+            if cached is not None:
+                cached_response = _CachedHTTPXResponse(
+                    status_code=200,
+                    headers=dict(
+                        _merge_cached_headers(cached=cached, fresh=response.headers)
+                    ),
+                    content=cached.content,
+                    request=response.request,
+                )
+                cached_response.cached = cached
+                return cached_response
+
+            # The entry was evicted after the conditional request was sent
+            response = await self.request(
+                method="GET",
+                url=url,
+                headers=_remove_conditional_headers(headers=headers),
+                **kwargs,
+            )
+        if response.status_code == 200:
+            response_cache.put(
+                key=key, content=response.content, headers=dict(response.headers)
+            )
+        return response
+
+    async def patch(self, url: str, **kwargs: Any) -> httpx.Response:
+        return await self.request(method="PATCH", url=url, **kwargs)
+
+    async def post(self, url: str, **kwargs: Any) -> httpx.Response:
+        return await self.request(method="POST", url=url, **kwargs)
+
+    async def put(self, url: str, **kwargs: Any) -> httpx.Response:
+        return await self.request(method="PUT", url=url, **kwargs)
+
+    def _get_client(self) -> httpx.AsyncClient:
+        """httpx connections are bound to the event loop that opened them, so a new loop gets a new pool."""
+        loop: asyncio.AbstractEventLoop = asyncio.get_running_loop()
+        if self._client is None or self._loop is not loop:
+            self._client = httpx.AsyncClient(limits=self.limits, timeout=self.timeout)
+            self._loop = loop
+        return self._client
+
+
+# Shared by every GitHub REST call in this process, including across warm Lambda invocations
+github_client = GitHubClient()
+async_github_client = AsyncGitHubClient()
@@ -1,13 +1,17 @@
 # Standard imports
 import base64
 import datetime
+import gzip
 import hashlib  # For HMAC (Hash-based Message Authentication Code) signatures
 import hmac  # For HMAC (Hash-based Message Authentication Code) signatures
 import json
 import logging
 import os
+import shutil
+import tempfile
 import time
-from typing import Any
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Any, Iterator
 
 # Third-party imports
 import jwt  # For generating JWTs (JSON Web Tokens)
@@ -18,17 +22,18 @@ from config import (
     GITHUB_API_URL,
     GITHUB_API_VERSION,
     GITHUB_APP_ID,
-    GITHUB_APP_IDS,
+    GITHUB_JSON_MEDIA_TYPE,
+    GITHUB_MAX_FILE_SIZE_IN_BYTES,
+    GITHUB_MAX_WORKERS,
     GITHUB_PRIVATE_KEY,
+    GITHUB_RAW_MEDIA_TYPE,
+    OPENAI_MAX_IMAGE_SIZE_IN_BYTES,
     PRODUCT_ID,
     PRODUCT_NAME,
     PRODUCT_URL,
-    SUPABASE_SERVICE_ROLE_KEY,
-    SUPABASE_URL,
-    TIMEOUT_IN_SECONDS,
+    REPO_SNAPSHOT_DIR,
     UTF8,
 )
-from fastapi import Request
 from utils.file_manager import apply_patch, extract_file_name, run_command
 from utils.handle_exceptions import handle_exceptions
 from utils.text_copy import (
@@ -38,13 +43,27 @@ from utils.text_copy import (
     request_limit_reached,
 )
 
+from services.github.blob_cache import blob_cache
+from services.github.file_tree import (
+    BINARY_EXTENSIONS,
+    IMAGE_EXTENSIONS,
+    SUBMODULE_MODE,
+    FileEntry,
+    get_file_entry,
+    is_binary,
+)
+from services.github.github_client import github_client
 from services.github.github_types import (
-    GitHubContentInfo,
     GitHubLabeledPayload,
     IssueInfo,
 )
-from services.openai.vision import describe_image
-from services.supabase import SupabaseManager
+from services.github.paginator import paginate
+from services.github.repo_snapshot import RepoSnapshot, get_snapshot
+from services.github.token_cache import app_jwt_cache, installation_token_cache
+from services.supabase import get_supabase_manager
+
+if TYPE_CHECKING:
+    from fastapi import Request
 
 
 @handle_exceptions(default_return_value=None, raise_on_error=True)
@@ -52,11 +71,10 @@ def add_label_to_issue(
     owner: str, repo: str, issue_number: int, label: str, token: str
 ) -> None:
     """If the label doesn't exist, it will be created. Color will be automatically assigned. If the issue already has the label, no change will be made and no error will be raised. https://docs.github.com/en/rest/issues/labels?apiVersion=2022-11-28#add-labels-to-an-issue"""
-    response: requests.Response = requests.post(
+    response: requests.Response = github_client.post(
         url=f"{GITHUB_API_URL}/repos/{owner}/{repo}/issues/{issue_number}/labels",
         headers=create_headers(token=token),
         json={"labels": [label]},
-        timeout=TIMEOUT_IN_SECONDS,
     )
     response.raise_for_status()
 
@@ -66,11 +84,10 @@ def add_reaction_to_issue(
     owner: str, repo: str, issue_number: int, content: str, token: str
 ) -> None:
     """https://docs.github.com/en/rest/reactions/reactions?apiVersion=2022-11-28#create-reaction-for-an-issue"""
-    response: requests.Response = requests.post(
+    response: requests.Response = github_client.post(
         url=f"{GITHUB_API_URL}/repos/{owner}/{repo}/issues/{issue_number}/reactions",
         headers=create_headers(token=token),
         json={"content": content},
-        timeout=TIMEOUT_IN_SECONDS,
     )
     response.raise_for_status()
     response.json()
@@ -83,78 +100,107 @@ def commit_multiple_changes_to_remote_branch(
     owner: str,
     repo: str,
     token: str,
-) -> None:
-    """Called from assistants api to commit multiple changes to a new branch."""
-    for diff in diffs:
-        file_path: str = extract_file_name(diff_text=diff)
-        print(
-            f"{time.strftime('%H:%M:%S', time.localtime())} File path: {file_path}.\n"
-        )
-        commit_changes_to_remote_branch(
-            branch=new_branch,
-            commit_message=f"Update {file_path}",
-            diff_text=diff,
+    base_sha: str | None = None,
+) -> str | None:
+    """Called from assistants api to commit multiple changes to a new branch. Returns the new head SHA, or None. https://docs.github.com/en/rest/git/trees?apiVersion=2022-11-28#create-a-tree"""
+    head_sha: str | None = get_branch_head_sha(
+        owner=owner, repo=repo, branch=new_branch, token=token
+    )
+    parent_sha: str | None = head_sha or base_sha
+    if parent_sha is None:
+        raise ValueError(f"Branch {new_branch} doesn't exist and no base_sha given")
+
+    # The parent tree gives the blob SHA of every original file, so they can be served from the blob cache
+    file_paths: list[str] = [extract_file_name(diff_text=diff) for diff in diffs]
+    print(f"{time.strftime('%H:%M:%S', time.localtime())} File paths: {file_paths}.\n")
+    parent_tree: dict[str, Any] = get_tree(
+        owner=owner, repo=repo, tree_sha=parent_sha, token=token
+    )
+    parent_items: dict[str, dict[str, Any]] = {
+        item["path"]: item for item in parent_tree["tree"]
+    }
+    modes: dict[str, str] = {path: item["mode"] for path, item in parent_items.items()}
+
+    def get_original_text(file_path: str) -> str:
+        item: dict[str, Any] | None = parent_items.get(file_path)
+        if item is None and not parent_tree["truncated"]:
+            return ""  # A new file
+        if item is not None and item["type"] != "blob":
+            return ""
+        return get_original_file_content(
             file_path=file_path,
             owner=owner,
+            ref=parent_sha,
             repo=repo,
             token=token,
-        )
-        print(
-            f"{time.strftime('%H:%M:%S', time.localtime())} Changes committed to https://github.com/{owner}/{repo}/tree/{new_branch}.\n"
+            sha=None if item is None else item["sha"],
         )
 
+    with ThreadPoolExecutor(max_workers=GITHUB_MAX_WORKERS) as executor:
+        original_texts: list[str] = list(executor.map(get_original_text, file_paths))
 
-@handle_exceptions(default_return_value=None, raise_on_error=False)
-def commit_changes_to_remote_branch(
-    branch: str,
-    commit_message: str,
-    diff_text: str,
-    file_path: str,
-    owner: str,
-    repo: str,
-    token: str,
-) -> None:
-    """https://docs.github.com/en/rest/repos/contents#create-or-update-file-contents"""
-    url: str = f"{GITHUB_API_URL}/repos/{owner}/{repo}/contents/{file_path}"
+    # Inline contents in the tree so that no separate blob has to be created per file
+    tree_items: list[dict[str, str]] = []
+    for file_path, diff, original_text in zip(file_paths, diffs, original_texts):
+        modified_text: str = apply_patch(original_text=original_text, diff_text=diff)
+        if modified_text == "":
+            continue
+        tree_items.append(
+            {
+                "path": file_path,
+                "mode": modes.get(file_path, "100644"),
+                "type": "blob",
+                "content": modified_text,
+            }
+        )
 
-    # Get the SHA of the file if it exists
-    response = requests.get(
-        url=url, headers=create_headers(token=token), timeout=TIMEOUT_IN_SECONDS
-    )
-    original_text = ""
-    sha = ""
-    print(f"{response.status_code=}\n")
-    if response.status_code == 200:
-        file_info: GitHubContentInfo = response.json()
-        content: str = file_info.get("content")
-        # content is base64 encoded by default in GitHub API
-        original_text: str = base64.b64decode(s=content).decode(
-            encoding=UTF8, errors="replace"
+    commit_sha: str = parent_sha
+    if tree_items:
+        tree_response: requests.Response = github_client.post(
+            url=f"{GITHUB_API_URL}/repos/{owner}/{repo}/git/trees",
+            headers=create_headers(token=token),
+            json={"base_tree": parent_tree["sha"], "tree": tree_items},
         )
-        sha: str = file_info["sha"]
-    elif response.status_code != 404:  # Error other than 'file not found'
-        response.raise_for_status()
+        tree_response.raise_for_status()
 
-    # Create a new commit
-    modified_text: str = apply_patch(original_text=original_text, diff_text=diff_text)
-    if modified_text == "":
-        return
-    data: dict[str, str | None] = {
-        "message": commit_message,
-        "content": base64.b64encode(s=modified_text.encode(encoding=UTF8)).decode(
-            encoding=UTF8
-        ),
-        "branch": branch,
-    }
-    if sha != "":
-        data["sha"] = sha
-    put_response = requests.put(
-        url=url,
-        json=data,
-        headers=create_headers(token=token),
-        timeout=TIMEOUT_IN_SECONDS,
+        changed_paths: list[str] = [item["path"] for item in tree_items]
+        commit_message: str = f"Update {changed_paths[0]}"
+        if len(changed_paths) > 1:
+            commit_message = f"Update {len(changed_paths)} files\n\n" + "\n".join(
+                f"- {path}" for path in changed_paths
+            )
+        commit_response: requests.Response = github_client.post(
+            url=f"{GITHUB_API_URL}/repos/{owner}/{repo}/git/commits",
+            headers=create_headers(token=token),
+            json={
+                "message": commit_message,
+                "tree": tree_response.json()["sha"],
+                "parents": [parent_sha],
+            },
+        )
+        commit_response.raise_for_status()
+        commit_sha = commit_response.json()["sha"]
+
+    # Fast-forward the branch, or create it at the new commit
+    if head_sha is not None:
+        if commit_sha == head_sha:
+            return commit_sha
+        ref_response: requests.Response = github_client.patch(
+            url=f"{GITHUB_API_URL}/repos/{owner}/{repo}/git/refs/heads/{new_branch}",
+            headers=create_headers(token=token),
+            json={"sha": commit_sha},
+        )
+    else:
+        ref_response = github_client.post(
+            url=f"{GITHUB_API_URL}/repos/{owner}/{repo}/git/refs",
+            headers=create_headers(token=token),
+            json={"ref": f"refs/heads/{new_branch}", "sha": commit_sha},
+        )
+    ref_response.raise_for_status()
+    print(
+        f"{time.strftime('%H:%M:%S', time.localtime())} Changes committed to https://github.com/{owner}/{repo}/tree/{new_branch}.\n"
     )
-    put_response.raise_for_status()
+    return commit_sha
 
 
 @handle_exceptions(default_return_value=None, raise_on_error=False)
@@ -162,13 +208,12 @@ def create_comment(
     owner: str, repo: str, issue_number: int, body: str, token: str
 ) -> str:
     """https://docs.github.com/en/rest/issues/comments?apiVersion=2022-11-28#create-an-issue-comment"""
-    response: requests.Response = requests.post(
+    response: requests.Response = github_client.post(
         url=f"{GITHUB_API_URL}/repos/{owner}/{repo}/issues/{issue_number}/comments",
         headers=create_headers(token=token),
         json={
             "body": body,
         },
-        timeout=TIMEOUT_IN_SECONDS,
     )
 
     response.raise_for_status()
@@ -188,7 +233,7 @@ def create_comment_on_issue_with_gitauto_button(payload: GitHubLabeledPayload) -
     user_id: int = payload["sender"]["id"]
     user_name: str = payload["sender"]["login"]
 
-    supabase_manager = SupabaseManager(url=SUPABASE_URL, key=SUPABASE_SERVICE_ROLE_KEY)
+    supabase_manager = get_supabase_manager()
 
     # Proper issue generation comment, create user if not exist (first issue in an orgnanization)
     first_issue = False
@@ -237,29 +282,35 @@ def create_comment_on_issue_with_gitauto_button(payload: GitHubLabeledPayload) -
             user_id=user_id, installation_id=installation_id
         )
 
-    response: requests.Response = requests.post(
+    response: requests.Response = github_client.post(
         url=f"{GITHUB_API_URL}/repos/{owner}/{repo_name}/issues/{issue_number}/comments",
         headers=create_headers(token=token),
         json={
             "body": body,
         },
-        timeout=TIMEOUT_IN_SECONDS,
     )
     response.raise_for_status()
 
     return response.json()
 
 
-def create_headers(token: str) -> dict[str, str]:
+def create_headers(
+    token: str, media_type: str = GITHUB_JSON_MEDIA_TYPE
+) -> dict[str, str]:
+    """https://docs.github.com/en/rest/using-the-rest-api/getting-started-with-the-rest-api?apiVersion=2022-11-28#media-types"""
     return {
-        "Accept": "application/vnd.github.v3+json",
+        "Accept": media_type,
         "Authorization": f"Bearer {token}",
         "X-GitHub-Api-Version": GITHUB_API_VERSION,
     }
 
 
 def create_jwt() -> str:
-    """Generate a JWT (JSON Web Token) for GitHub App authentication"""
+    """Generate a JWT (JSON Web Token) for GitHub App authentication. The JWT is reused for most of its 10-minute lifetime."""
+    cached_jwt: str | None = app_jwt_cache.get(key=GITHUB_APP_ID)
+    if cached_jwt is not None:
+        return cached_jwt
+
     now = int(time.time())
     payload: dict[str, int | str] = {
         "iat": now,  # Issued at time
@@ -267,7 +318,11 @@ def create_jwt() -> str:
         "iss": GITHUB_APP_ID,  # Issuer
     }
     # The reason we use RS256 is that GitHub requires it for JWTs
-    return jwt.encode(payload=payload, key=GITHUB_PRIVATE_KEY, algorithm="RS256")
+    encoded_jwt: str = jwt.encode(
+        payload=payload, key=GITHUB_PRIVATE_KEY, algorithm="RS256"
+    )
+    app_jwt_cache.set(key=GITHUB_APP_ID, token=encoded_jwt, expires_at=now + 600)
+    return encoded_jwt
 
 
 @handle_exceptions(default_return_value=None, raise_on_error=False)
@@ -281,41 +336,15 @@ def create_pull_request(
     token: str,
 ) -> str | None:
     """https://docs.github.com/en/rest/pulls/pulls#create-a-pull-request"""
-    response: requests.Response = requests.post(
+    response: requests.Response = github_client.post(
         url=f"{GITHUB_API_URL}/repos/{owner}/{repo}/pulls",
         headers=create_headers(token=token),
         json={"title": title, "body": body, "head": head, "base": base},
-        timeout=TIMEOUT_IN_SECONDS,
     )
     response.raise_for_status()
     return response.json()["html_url"]
 
 
-def create_remote_branch(
-    branch_name: str,
-    owner: str,
-    repo: str,
-    sha: str,
-    comment_url: str,
-    token: str,
-) -> None:
-    try:
-        response: requests.Response = requests.post(
-            url=f"{GITHUB_API_URL}/repos/{owner}/{repo}/git/refs",
-            headers=create_headers(token=token),
-            json={"ref": f"refs/heads/{branch_name}", "sha": sha},
-            timeout=TIMEOUT_IN_SECONDS,
-        )
-        response.raise_for_status()
-    except Exception as e:  # pylint: disable=broad-except
-        update_comment_for_raised_errors(
-            error=e,
-            comment_url=comment_url,
-            token=token,
-            which_function=create_remote_branch.__name__,
-        )
-
-
 def initialize_repo(repo_path: str, remote_url: str) -> None:
     """Push an initial empty commit to the remote repository to create a commit sha."""
     if not os.path.exists(path=repo_path):
@@ -330,172 +359,159 @@ def initialize_repo(repo_path: str, remote_url: str) -> None:
     run_command(command="git push -u origin main", cwd=repo_path)
 
 
+@handle_exceptions(default_return_value=None, raise_on_error=False)
+def download_repo_snapshot(
+    owner: str, repo: str, ref: str, token: str
+) -> RepoSnapshot | None:
+    """Download the tarball of a ref once and decompress it into Lambda /tmp so that file reads can be served locally.
+    https://docs.github.com/en/rest/repos/contents?apiVersion=2022-11-28#download-a-repository-archive-tar
+    """
+    os.makedirs(name=REPO_SNAPSHOT_DIR, exist_ok=True)
+    fd, tar_path = tempfile.mkstemp(
+        prefix=f"{owner}-{repo}-", suffix=".tar", dir=REPO_SNAPSHOT_DIR
+    )
+    try:
+        # Opened first, so the file descriptor is closed even if the request fails
+        with os.fdopen(fd, mode="wb") as tar_file, github_client.get(
+            url=f"{GITHUB_API_URL}/repos/{owner}/{repo}/tarball/{ref}",
+            headers=create_headers(token=token),
+            stream=True,
+        ) as response:
+            response.raise_for_status()
+            with gzip.GzipFile(fileobj=response.raw) as gzip_file:
+                shutil.copyfileobj(gzip_file, tar_file, 1024 * 1024)
+        return RepoSnapshot(tar_path=tar_path)
+    except Exception:
+        os.remove(path=tar_path)
+        raise
+
+
+def get_branch_head_sha(owner: str, repo: str, branch: str, token: str) -> str | None:
+    """Return None if the branch doesn't exist. https://docs.github.com/en/rest/git/refs?apiVersion=2022-11-28#get-a-reference"""
+    response: requests.Response = github_client.get(
+        url=f"{GITHUB_API_URL}/repos/{owner}/{repo}/git/ref/heads/{branch}",
+        headers=create_headers(token=token),
+    )
+    if response.status_code == 404:
+        return None
+    response.raise_for_status()
+    return response.json()["object"]["sha"]
+
+
 @handle_exceptions(default_return_value=None, raise_on_error=False)
 def get_installation_access_token(installation_id: int) -> str | None:
-    """https://docs.github.com/en/rest/apps/apps?apiVersion=2022-11-28#create-an-installation-access-token-for-an-app"""
+    """Tokens are cached per installation and refreshed shortly before they expire in 1 hour.
+    https://docs.github.com/en/rest/apps/apps?apiVersion=2022-11-28#create-an-installation-access-token-for-an-app
+    """
+    cached_token: str | None = installation_token_cache.get(key=installation_id)
+    if cached_token is not None:
+        return cached_token
+
     jwt_token: str = create_jwt()
-    response: requests.Response = requests.post(
+    response: requests.Response = github_client.post(
         url=f"{GITHUB_API_URL}/app/installations/{installation_id}/access_tokens",
         headers=create_headers(token=jwt_token),
-        timeout=TIMEOUT_IN_SECONDS,
     )
     response.raise_for_status()
-    return response.json()["token"]
+    token_info: dict[str, Any] = response.json()
+    expires_at: datetime.datetime = datetime.datetime.fromisoformat(
+        token_info["expires_at"].replace("Z", "+00:00")
+    )  # ex) "2016-07-11T22:14:10Z"
+    installation_token_cache.set(
+        key=installation_id,
+        token=token_info["token"],
+        expires_at=expires_at.timestamp(),
+    )
+    return token_info["token"]
 
 
 @handle_exceptions(default_return_value=[], raise_on_error=False)
 def get_installed_owners_and_repos(token: str) -> list[dict[str, int | str]]:
     """https://docs.github.com/en/rest/apps/installations?apiVersion=2022-11-28#list-repositories-accessible-to-the-app-installation"""
-    owners_repos = []
-    page = 1
-    while True:
-        response: requests.Response = requests.get(
+    owners_repos: list[dict[str, int | str]] = [
+        {
+            "owner_id": repo["owner"]["id"],
+            "owner": repo["owner"]["login"],
+            "repo": repo["name"],
+        }
+        for repo in paginate(
             url=f"{GITHUB_API_URL}/installation/repositories",
             headers=create_headers(token=token),
-            params={"per_page": 100, "page": page},
-            timeout=TIMEOUT_IN_SECONDS,
+            items_key="repositories",
         )
-        response.raise_for_status()
-        repos = response.json().get("repositories", [])
-
-        # If there are no more repositories, break the loop. Otherwise, add them to the list
-        if not repos:
-            break
-        items: list[dict[str, int | str]] = [
-            {
-                "owner_id": repo["owner"]["id"],
-                "owner": repo["owner"]["login"],
-                "repo": repo["name"],
-            }
-            for repo in repos
-        ]
-        owners_repos.extend(items)
-
-        # https://docs.github.com/en/rest/using-the-rest-api/using-pagination-in-the-rest-api?apiVersion=2022-11-28
-        print("response.links:", json.dumps(response.links, indent=2))
-        if "next" not in response.links:
-            break
-        page += 1
+    ]
     return owners_repos
 
 
-@handle_exceptions(default_return_value=[], raise_on_error=False)
-def get_issue_comments(
-    owner: str, repo: str, issue_number: int, token: str
-) -> list[str]:
-    """https://docs.github.com/en/rest/issues/comments#list-issue-comments"""
-    response = requests.get(
-        url=f"{GITHUB_API_URL}/repos/{owner}/{repo}/issues/{issue_number}/comments",
+@handle_exceptions(default_return_value=None, raise_on_error=False)
+def get_oldest_unassigned_open_issue(
+    owner: str, repo: str, token: str
+) -> IssueInfo | None:
+    """Get an oldest unassigned open issue without "gitauto" label in a repository. https://docs.github.com/en/rest/issues/issues?apiVersion=2022-11-28#list-repository-issues"""
+    issues: Iterator[IssueInfo] = paginate(
+        url=f"{GITHUB_API_URL}/repos/{owner}/{repo}/issues",
         headers=create_headers(token=token),
-        timeout=TIMEOUT_IN_SECONDS,
+        params={
+            "assignee": "none",  # none, *, or username
+            "direction": "asc",  # asc or desc
+            "sort": "created",  # created, updated, comments
+            "state": "open",  # open, closed, or all
+        },
     )
-    response.raise_for_status()
-    comments: list[Any] = response.json()
-    filtered_comments: list[Any] = [
-        comment
-        for comment in comments
-        if comment.get("performed_via_github_app")
-        and comment["performed_via_github_app"].get("id") not in GITHUB_APP_IDS
-    ]
-    print(f"\nIssue comments: {json.dumps(filtered_comments, indent=2)}\n")
-    comment_texts: list[str] = [comment["body"] for comment in filtered_comments]
-    return comment_texts
 
+    # Find the first issue without the PRODUCT_ID label. No more pages are requested once it is found.
+    for issue in issues:
+        if all(label["name"] != PRODUCT_ID for label in issue["labels"]):
+            return issue
+    return None
 
-def get_latest_remote_commit_sha(
+
+def get_original_file_content(
+    file_path: str,
     owner: str,
+    ref: str,
     repo: str,
-    branch: str,
-    comment_url: str,
-    unique_issue_id: str,
-    clone_url: str,
     token: str,
+    sha: str | None = None,  # Blob SHA from the parent tree, if known
 ) -> str:
-    """SHA stands for Secure Hash Algorithm. It's a unique identifier for a commit.
-    https://docs.github.com/en/rest/git/refs?apiVersion=2022-11-28#get-a-reference"""
-    try:
-        response: requests.Response = requests.get(
-            url=f"{GITHUB_API_URL}/repos/{owner}/{repo}/git/ref/heads/{branch}",
-            headers=create_headers(token=token),
-            timeout=TIMEOUT_IN_SECONDS,
-        )
-        response.raise_for_status()
-        return response.json()["object"]["sha"]
-    except requests.exceptions.HTTPError as e:
-        if (
-            e.response.status_code == 409
-            and e.response.json()["message"] == "Git Repository is empty."
-        ):
-            logging.info(
-                msg="Repository is empty. So, creating an initial empty commit."
-            )
-            initialize_repo(repo_path=f"/tmp/repo/{owner}-{repo}", remote_url=clone_url)
-            return get_latest_remote_commit_sha(
-                owner=owner,
-                repo=repo,
-                branch=branch,
-                comment_url=comment_url,
-                unique_issue_id=unique_issue_id,
-                clone_url=clone_url,
-                token=token,
+    """Text of a file to apply a patch to, or an empty string if the file doesn't exist yet.
+    https://docs.github.com/en/rest/git/blobs?apiVersion=2022-11-28#get-a-blob
+    https://docs.github.com/en/rest/repos/contents?apiVersion=2022-11-28#get-repository-content
+    """
+    content: bytes | None = None if sha is None else blob_cache.get(sha=sha)
+    if content is not None:
+        return content.decode(encoding=UTF8, errors="replace")
+
+    snapshot: RepoSnapshot | None = get_snapshot(owner=owner, repo=repo, ref=ref)
+    if snapshot is not None:
+        if file_path not in snapshot.paths:
+            return ""
+        content = snapshot.read(file_path=file_path)
+    if content is None:
+        if sha is None:
+            url: str = (
+                f"{GITHUB_API_URL}/repos/{owner}/{repo}/contents/{file_path}?ref={ref}"
             )
-        raise
-    except Exception as e:
-        update_comment_for_raised_errors(
-            error=e,
-            comment_url=comment_url,
-            token=token,
-            which_function=get_latest_remote_commit_sha.__name__,
-        )
-        # Raise an error because we can't continue without the latest commit SHA
-        raise RuntimeError(
-            f"Error: Could not get the latest commit SHA in {get_latest_remote_commit_sha.__name__}"
-        ) from e
-
-
-@handle_exceptions(default_return_value=None, raise_on_error=False)
-def get_oldest_unassigned_open_issue(
-    owner: str, repo: str, token: str
-) -> IssueInfo | None:
-    """Get an oldest unassigned open issue without "gitauto" label in a repository. https://docs.github.com/en/rest/issues/issues?apiVersion=2022-11-28#list-repository-issues"""
-    page = 1
-    while True:
-        response: requests.Response = requests.get(
-            url=f"{GITHUB_API_URL}/repos/{owner}/{repo}/issues",
-            headers=create_headers(token=token),
-            params={
-                "assignee": "none",  # none, *, or username
-                "direction": "asc",  # asc or desc
-                "page": page,
-                "per_page": 100,
-                "sort": "created",  # created, updated, comments
-                "state": "open",  # open, closed, or all
-            },
-            timeout=TIMEOUT_IN_SECONDS,
+        else:
+            url = f"{GITHUB_API_URL}/repos/{owner}/{repo}/git/blobs/{sha}"
+        response: requests.Response = github_client.get(
+            url=url,
+            headers=create_headers(token=token, media_type=GITHUB_RAW_MEDIA_TYPE),
         )
+        if response.status_code == 404:
+            return ""
         response.raise_for_status()
-        issues: list[IssueInfo] = response.json()
-
-        # If there are no corresponding issues, return None
-        if not issues:
-            return None
-
-        # Find the first issue without the PRODUCT_ID label
-        for issue in issues:
-            if all(label["name"] != PRODUCT_ID for label in issue["labels"]):
-                return issue
-
-        # If there are open issues, but all of them have the PRODUCT_ID label, continue to the next page
-        page += 1
+        content = response.content
+    blob_cache.put(content=content)
+    return content.decode(encoding=UTF8, errors="replace")
 
 
 @handle_exceptions(default_return_value=None, raise_on_error=False)
 def get_owner_name(owner_id: int, token: str) -> str | None:
     """https://docs.github.com/en/rest/users/users?apiVersion=2022-11-28#get-a-user-using-their-id"""
-    response: requests.Response = requests.get(
+    response: requests.Response = github_client.get(
         url=f"{GITHUB_API_URL}/user/{owner_id}",
         headers=create_headers(token=token),
-        timeout=TIMEOUT_IN_SECONDS,
     )
     response.raise_for_status()
     return response.json()["login"]
@@ -509,59 +525,84 @@ def get_remote_file_content(
     repo: str,
     token: str,
 ) -> str:
-    """https://docs.github.com/en/rest/repos/contents?apiVersion=2022-11-28"""
-    url: str = f"{GITHUB_API_URL}/repos/{owner}/{repo}/contents/{file_path}?ref={ref}"
-    headers: dict[str, str] = create_headers(token=token)
-    response: requests.Response = requests.get(
-        url=url, headers=headers, timeout=TIMEOUT_IN_SECONDS
+    """Read from the repository snapshot if there is one, otherwise as raw bytes. https://docs.github.com/en/rest/git/blobs?apiVersion=2022-11-28#get-a-blob"""
+    is_image: bool = file_path.endswith(IMAGE_EXTENSIONS)
+    snapshot: RepoSnapshot | None = get_snapshot(owner=owner, repo=repo, ref=ref)
+    entry: FileEntry | None = get_file_entry(
+        owner=owner, repo=repo, ref=ref, file_path=file_path
     )
-    response.raise_for_status()
-    encoded_content: str = response.json()["content"]  # Base64 encoded content
+    if entry is not None and entry.mode == SUBMODULE_MODE:
+        return f"{file_path} is a git submodule at commit {entry.sha}, not a file."
+
+    size: int | None = None
+    if snapshot is not None:
+        size = snapshot.get_size(file_path=file_path)
+    if size is None and entry is not None:
+        size = entry.size
+    if size is not None:
+        max_size: int = (
+            OPENAI_MAX_IMAGE_SIZE_IN_BYTES
+            if is_image
+            else GITHUB_MAX_FILE_SIZE_IN_BYTES
+        )
+        if size > max_size:
+            return f"{file_path} is {size} bytes, which is too large to read (limit: {max_size} bytes)."
+        if file_path.endswith(BINARY_EXTENSIONS):
+            return f"{file_path} is a binary file of {size} bytes, so its content is not shown."
+
+    content: bytes | None = None if entry is None else blob_cache.get(sha=entry.sha)
+    if content is None:
+        if snapshot is not None:
+            content = snapshot.read(file_path=file_path)
+        if content is None:
+            # A blob never changes, so only the path lookup benefits from the ETag cache
+            if entry is None:
+                url: str = (
+                    f"{GITHUB_API_URL}/repos/{owner}/{repo}/contents/{file_path}?ref={ref}"
+                )
+            else:
+                url = f"{GITHUB_API_URL}/repos/{owner}/{repo}/git/blobs/{entry.sha}"
+            response: requests.Response = github_client.get(
+                url=url,
+                headers=create_headers(token=token, media_type=GITHUB_RAW_MEDIA_TYPE),
+                use_etag_cache=entry is None,
+            )
+            response.raise_for_status()
+            content = response.content
+        blob_cache.put(content=content)
+
+    # If the content is image, describe the image content in text by vision API
+    if is_image:
+        # Imported on first use to keep the OpenAI SDK off the scheduler's cold start
+        from services.openai.vision import (  # pylint: disable=import-outside-toplevel
+            describe_image,
+        )
 
-    # If encoded_content is image, describe the image content in text by vision API
-    if file_path.endswith((".png", ".jpeg", ".jpg", ".webp", ".gif")):
-        return describe_image(base64_image=encoded_content)
+        return describe_image(base64_image=base64.b64encode(s=content).decode())
 
     # Otherwise, decode the content
-    decoded_content: str = base64.b64decode(s=encoded_content).decode(encoding=UTF8)
+    if is_binary(content=content):
+        return f"{file_path} is a binary file of {len(content)} bytes, so its content is not shown."
+    decoded_content: str = content.decode(encoding=UTF8, errors="replace")
     return decoded_content
 
 
-def get_remote_file_tree(
-    owner: str, repo: str, ref: str, comment_url: str, token: str
-) -> list[str]:
-    """
-    Get the file tree of a GitHub repository at a ref branch.
-    https://docs.github.com/en/rest/git/trees?apiVersion=2022-11-28#get-a-tree
-    """
-    response: requests.Response | None = None  # Otherwise response could be Unbound
-    try:
-        response = requests.get(
-            url=f"{GITHUB_API_URL}/repos/{owner}/{repo}/git/trees/{ref}?recursive=1",
-            headers=create_headers(token=token),
-            timeout=TIMEOUT_IN_SECONDS,
-        )
-        response.raise_for_status()
-        return [item["path"] for item in response.json()["tree"]]
-    except requests.exceptions.HTTPError as http_err:
-        # Log the error if it's not a 409 error (empty repository)
-        if http_err.response.status_code != 409:
-            logging.error(
-                msg=f"get_remote_file_tree HTTP Error: {http_err.response.status_code} - {http_err.response.text}"
-            )
-        return []
-    except Exception as e:  # pylint: disable=broad-except
-        update_comment_for_raised_errors(
-            error=e,
-            comment_url=comment_url,
-            token=token,
-            which_function=get_remote_file_tree.__name__,
-        )
-        return []
+def get_tree(
+    owner: str, repo: str, tree_sha: str, token: str, recursive: bool = True
+) -> dict[str, Any]:
+    """tree_sha can also be a commit SHA or a branch name. https://docs.github.com/en/rest/git/trees?apiVersion=2022-11-28#get-a-tree"""
+    response: requests.Response = github_client.get(
+        url=f"{GITHUB_API_URL}/repos/{owner}/{repo}/git/trees/{tree_sha}",
+        headers=create_headers(token=token),
+        params={"recursive": 1} if recursive else None,
+        use_etag_cache=True,
+    )
+    response.raise_for_status()
+    return response.json()
 
 
 @handle_exceptions(raise_on_error=True)
-async def verify_webhook_signature(request: Request, secret: str) -> None:
+async def verify_webhook_signature(request: "Request", secret: str) -> None:
     """Verify the webhook signature for security"""
     signature: str | None = request.headers.get("X-Hub-Signature-256")
     if signature is None:
@@ -581,11 +622,10 @@ async def verify_webhook_signature(request: Request, secret: str) -> None:
 @handle_exceptions(default_return_value=None, raise_on_error=False)
 def update_comment(comment_url: str, body: str, token: str) -> dict[str, Any]:
     """https://docs.github.com/en/rest/issues/comments#update-an-issue-comment"""
-    response: requests.Response = requests.patch(
+    response: requests.Response = github_client.patch(
         url=comment_url,
         headers=create_headers(token=token),
         json={"body": body},
-        timeout=TIMEOUT_IN_SECONDS,
     )
     response.raise_for_status()
     return response.json()
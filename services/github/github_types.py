@@ -216,6 +216,15 @@ class GitHubLabeledPayload(TypedDict):
     installation: InstallationMiniInfo
 
 
+class IssueContext(TypedDict):
+    """What the agent needs to know about an issue and its repository before it starts"""
+
+    comments: List[str]
+    default_branch: str
+    head_sha: str  # Latest commit SHA of the default branch
+    tree_sha: str  # Root tree SHA of that commit
+
+
 class GitHubContentInfo(TypedDict):
     """https://docs.github.com/en/rest/repos/contents?apiVersion=2022-11-28"""
 
@@ -0,0 +1,113 @@
+"""Fetch every page of a list endpoint, the rest concurrently once the first tells the last. https://docs.github.com/en/rest/using-the-rest-api/using-pagination-in-the-rest-api?apiVersion=2022-11-28"""
+
+# Standard imports
+import asyncio
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, AsyncIterator, Iterator
+from urllib.parse import parse_qs, urlparse
+
+# Third-party imports
+import httpx
+import requests
+
+# Local imports
+from config import GITHUB_MAX_WORKERS, GITHUB_PER_PAGE
+from services.github.github_client import async_github_client, github_client
+
+
+def _get_items(page: Any, items_key: str | None) -> list[Any]:
+    """List endpoints return either a list or an object wrapping it, e.g. {"total_count": 1, "repositories": [...]}"""
+    return page if items_key is None else page.get(items_key, [])
+
+
+def _get_last_page(links: dict[str, dict[str, str]]) -> int:
+    """ex) links["last"]["url"] = "https://api.github.com/installation/repositories?per_page=100&page=7" """
+    if "last" not in links:
+        return 1
+    query: dict[str, list[str]] = parse_qs(urlparse(links["last"]["url"]).query)
+    return int(query.get("page", ["1"])[0])
+
+
+def paginate(
+    url: str,
+    headers: dict[str, str],
+    params: dict[str, Any] | None = None,
+    items_key: str | None = None,
+    per_page: int = GITHUB_PER_PAGE,
+    max_workers: int = GITHUB_MAX_WORKERS,
+    use_etag_cache: bool = True,
+) -> Iterator[Any]:
+    """Yield items in order. At most max_workers pages are in flight, so a caller that stops early doesn't fetch every page."""
+
+    def get_page(page: int) -> requests.Response:
+        response: requests.Response = github_client.get(
+            url=url,
+            headers=headers,
+            params={**(params or {}), "per_page": per_page, "page": page},
+            use_etag_cache=use_etag_cache,
+        )
+        response.raise_for_status()
+        return response
+
+    first_page: requests.Response = get_page(page=1)
+    yield from _get_items(page=first_page.json(), items_key=items_key)
+    last_page: int = _get_last_page(links=first_page.links)
+    if last_page <= 1:
+        return
+
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    futures: deque[Future[requests.Response]] = deque()
+    next_page = 2
+    try:
+        while next_page <= last_page or futures:
+            while next_page <= last_page and len(futures) < max_workers:
+                futures.append(executor.submit(get_page, page=next_page))
+                next_page += 1
+            response: requests.Response = futures.popleft().result()
+            yield from _get_items(page=response.json(), items_key=items_key)
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+async def paginate_async(
+    url: str,
+    headers: dict[str, str],
+    params: dict[str, Any] | None = None,
+    items_key: str | None = None,
+    per_page: int = GITHUB_PER_PAGE,
+    max_workers: int = GITHUB_MAX_WORKERS,
+    use_etag_cache: bool = True,
+) -> AsyncIterator[Any]:
+    """asyncio variant of paginate"""
+
+    async def get_page(page: int) -> httpx.Response:
+        response: httpx.Response = await async_github_client.get(
+            url=url,
+            headers=headers,
+            params={**(params or {}), "per_page": per_page, "page": page},
+            use_etag_cache=use_etag_cache,
+        )
+        response.raise_for_status()
+        return response
+
+    first_page: httpx.Response = await get_page(page=1)
+    for item in _get_items(page=first_page.json(), items_key=items_key):
+        yield item
+    last_page: int = _get_last_page(links=first_page.links)
+    if last_page <= 1:
+        return
+
+    tasks: deque[asyncio.Task[httpx.Response]] = deque()
+    next_page = 2
+    try:
+        while next_page <= last_page or tasks:
+            while next_page <= last_page and len(tasks) < max_workers:
+                tasks.append(asyncio.create_task(get_page(page=next_page)))
+                next_page += 1
+            response: httpx.Response = await tasks.popleft()
+            for item in _get_items(page=response.json(), items_key=items_key):
+                yield item
+    finally:
+        for task in tasks:
+            task.cancel()
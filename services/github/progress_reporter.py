@@ -0,0 +1,82 @@
+# Standard imports
+import threading
+import time
+
+# Local imports
+from config import GITHUB_PROGRESS_DEBOUNCE_IN_SECONDS
+from services.github.github_manager import update_comment
+
+
+def create_progress_body(percent: int, message: str) -> str:
+    return (
+        f"![X](https://progress-bar.dev/{percent}/?title=Progress&width=800)\n{message}"
+    )
+
+
+class ProgressReporter:
+    """Updates the progress comment in the background, coalescing updates within debounce_in_seconds. Call close() to send the last one."""
+
+    def __init__(
+        self,
+        comment_url: str,
+        token: str,
+        debounce_in_seconds: float = GITHUB_PROGRESS_DEBOUNCE_IN_SECONDS,
+    ) -> None:
+        self.comment_url: str = comment_url
+        self.token: str = token
+        self.debounce_in_seconds: float = debounce_in_seconds
+        self.percent = 0
+        self.updates = 0
+        self.sent = 0
+        self._pending: str | None = None
+        self._closed = False
+        self._condition = threading.Condition()
+        self._thread: threading.Thread | None = None
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                while self._pending is None and not self._closed:
+                    self._condition.wait()
+                if self._pending is None:
+                    return
+                # Let more updates arrive and keep only the latest one
+                deadline: float = time.monotonic() + self.debounce_in_seconds
+                while not self._closed and time.monotonic() < deadline:
+                    self._condition.wait(timeout=deadline - time.monotonic())
+                body: str = self._pending
+                self._pending = None
+            update_comment(comment_url=self.comment_url, body=body, token=self.token)
+            with self._condition:
+                self.sent += 1
+
+    def close(self) -> None:
+        """Send the latest update right away and stop the background thread. Blocks until done."""
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+        if self._thread is not None:
+            self._thread.join()
+
+    def get_stats(self) -> dict[str, int]:
+        with self._condition:
+            return {"updates": self.updates, "sent": self.sent}
+
+    def update(self, body: str) -> None:
+        """Replace the comment body. Returns immediately."""
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("ProgressReporter is already closed")
+            self._pending = body
+            self.updates += 1
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+            self._condition.notify()
+
+    def update_progress(self, percent: int, message: str) -> None:
+        """Update the progress bar. percent never goes backwards."""
+        with self._condition:
+            self.percent = max(self.percent, percent)
+            percent = self.percent
+        self.update(body=create_progress_body(percent=percent, message=message))
@@ -0,0 +1,109 @@
+# Standard imports
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any
+from urllib.parse import urlsplit
+
+# Local imports
+from config import (
+    GITHUB_MUTATIVE_BURST,
+    GITHUB_MUTATIVE_REQUESTS_PER_SECOND,
+    GITHUB_RATE_LIMIT_MAX_SCOPES,
+)
+
+MUTATIVE_METHODS = ("POST", "PATCH", "PUT", "DELETE")
+
+
+def is_mutative(method: str, url: str = "", json_body: Any = None) -> bool:
+    """GraphQL queries are sent with POST too, but only mutations change anything. https://docs.github.com/en/graphql/guides/forming-calls-with-graphql#about-mutations"""
+    if method.upper() not in MUTATIVE_METHODS:
+        return False
+    if not urlsplit(url).path.rstrip("/").endswith("/graphql"):
+        return True
+    if not isinstance(json_body, dict):
+        return True
+    return str(json_body.get("query", "")).lstrip().startswith("mutation")
+
+
+@dataclass
+class RateLimitBudget:
+    """The primary rate limit of one scope as of the latest response. https://docs.github.com/en/rest/using-the-rest-api/rate-limits-for-the-rest-api?apiVersion=2022-11-28#checking-the-status-of-your-rate-limit"""
+
+    limit: int
+    remaining: int
+    reset: int  # Unix timestamp in seconds
+    used: int
+
+    def get_remaining_ratio(self) -> float:
+        """Share of the limit left, treating a past reset as a full budget."""
+        if self.reset <= time.time():
+            return 1.0
+        return self.remaining / self.limit if self.limit else 0.0
+
+
+class RateLimiter:
+    """Rate limit budgets per scope from response headers, and pacing of mutative requests. https://docs.github.com/en/rest/using-the-rest-api/best-practices-for-using-the-rest-api?apiVersion=2022-11-28#pause-between-mutative-requests"""
+
+    def __init__(
+        self,
+        mutative_requests_per_second: float = GITHUB_MUTATIVE_REQUESTS_PER_SECOND,
+        mutative_burst: int = GITHUB_MUTATIVE_BURST,
+        max_scopes: int = GITHUB_RATE_LIMIT_MAX_SCOPES,
+    ) -> None:
+        self.mutative_requests_per_second: float = mutative_requests_per_second
+        self.mutative_burst: int = mutative_burst
+        self.max_scopes: int = max_scopes
+        self._budgets: OrderedDict[str, dict[str, RateLimitBudget]] = OrderedDict()
+        # scope -> (tokens, at)
+        self._buckets: OrderedDict[str, tuple[float, float]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _touch(self, entries: OrderedDict, scope: str) -> None:
+        """Mark scope as recently used and drop the least recently used ones over max_scopes. Call with the lock held."""
+        entries.move_to_end(scope)
+        while len(entries) > self.max_scopes:
+            entries.popitem(last=False)
+
+    def get_budget(self, scope: str, resource: str = "core") -> RateLimitBudget | None:
+        """None until a response for the scope has been seen. resource is "core", "graphql", "search", etc."""
+        with self._lock:
+            return self._budgets.get(scope, {}).get(resource)
+
+    def record(self, scope: str, headers: Any) -> None:
+        """Update the budget from the X-RateLimit-* headers of a response, if it has them."""
+        if "X-RateLimit-Remaining" not in headers:
+            return
+        budget = RateLimitBudget(
+            limit=int(headers.get("X-RateLimit-Limit", 0)),
+            remaining=int(headers["X-RateLimit-Remaining"]),
+            reset=int(headers.get("X-RateLimit-Reset", 0)),
+            used=int(headers.get("X-RateLimit-Used", 0)),
+        )
+        resource: str = headers.get("X-RateLimit-Resource", "core")
+        with self._lock:
+            self._budgets.setdefault(scope, {})[resource] = budget
+            self._touch(entries=self._budgets, scope=scope)
+
+    def reserve(
+        self, scope: str, method: str, url: str = "", json_body: Any = None
+    ) -> float:
+        """Seconds to wait before sending a request. Concurrent callers queue up in call order."""
+        if not is_mutative(method=method, url=url, json_body=json_body):
+            return 0.0
+        now: float = time.monotonic()
+        with self._lock:
+            tokens, at = self._buckets.get(scope, (float(self.mutative_burst), now))
+            tokens = min(
+                float(self.mutative_burst),
+                tokens + (now - at) * self.mutative_requests_per_second,
+            )
+            tokens -= 1
+            self._buckets[scope] = (tokens, now)
+            self._touch(entries=self._buckets, scope=scope)
+        return max(0.0, -tokens / self.mutative_requests_per_second)
+
+
+# Shared by the sync and async GitHub clients
+rate_limiter = RateLimiter()
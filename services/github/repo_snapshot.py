@@ -0,0 +1,102 @@
+# Standard imports
+import mmap
+import os
+import shutil
+import tarfile
+import threading
+
+# Local imports
+from config import REPO_SNAPSHOT_DIR, REPO_SNAPSHOT_MAX_SIZE_IN_KB
+
+
+class RepoSnapshot:
+    """An uncompressed tarball of one commit on local disk, memory-mapped and indexed by path"""
+
+    def __init__(self, tar_path: str) -> None:
+        self.tar_path: str = tar_path
+        self.paths: set[str] = set()  # Every member including symlinks and dirs
+        self._files: dict[str, tuple[int, int]] = {}  # path -> (offset, size)
+        with tarfile.open(name=tar_path, mode="r:") as tar:
+            for member in tar:
+                # Members are prefixed with a top-level dir like "owner-repo-sha/"
+                _, _, path = member.name.partition("/")
+                if not path:
+                    continue
+                self.paths.add(path)
+                if member.isfile():
+                    self._files[path] = (member.offset_data, member.size)
+        with open(file=tar_path, mode="rb") as tar_file:
+            self._mmap = mmap.mmap(tar_file.fileno(), length=0, access=mmap.ACCESS_READ)
+
+    def close(self) -> None:
+        """Unmap and delete the tarball to free Lambda /tmp space."""
+        self._mmap.close()
+        if os.path.exists(path=self.tar_path):
+            os.remove(path=self.tar_path)
+
+    def get_size(self, file_path: str) -> int | None:
+        """Size in bytes, or None if the path isn't a regular file in the snapshot."""
+        file: tuple[int, int] | None = self._files.get(file_path)
+        return None if file is None else file[1]
+
+    def read(self, file_path: str) -> bytes | None:
+        """Content of a regular file, or None if the path isn't one."""
+        file: tuple[int, int] | None = self._files.get(file_path)
+        if file is None:
+            return None
+        offset, size = file
+        try:
+            return self._mmap[offset : offset + size]
+        except ValueError:
+            return None  # Closed by the last run releasing it, so read it from GitHub
+
+
+# (owner, repo, ref) -> snapshot. One snapshot is registered under both the branch name and the commit SHA.
+_snapshots: dict[tuple[str, str, str], RepoSnapshot] = {}
+# Runs using each snapshot. Concurrent runs of the same commit share one.
+_references: dict[RepoSnapshot, int] = {}
+_lock = threading.Lock()
+
+
+def should_use_snapshot(repo_size_in_kb: int) -> bool:
+    """Unless the repository is too large for Lambda /tmp. repo_size_in_kb is the "size" of the repository payload."""
+    if repo_size_in_kb <= 0 or repo_size_in_kb > REPO_SNAPSHOT_MAX_SIZE_IN_KB:
+        return False
+    os.makedirs(name=REPO_SNAPSHOT_DIR, exist_ok=True)
+    # The uncompressed tarball can be a few times larger than the packed repository size
+    return shutil.disk_usage(path=REPO_SNAPSHOT_DIR).free > repo_size_in_kb * 1024 * 4
+
+
+def get_snapshot(owner: str, repo: str, ref: str) -> RepoSnapshot | None:
+    with _lock:
+        return _snapshots.get((owner, repo, ref))
+
+
+def acquire_snapshot(owner: str, repo: str, ref: str) -> RepoSnapshot | None:
+    """Use the snapshot of another run, if any. Release it like a registered one."""
+    with _lock:
+        snapshot: RepoSnapshot | None = _snapshots.get((owner, repo, ref))
+        if snapshot is not None:
+            _references[snapshot] += 1
+        return snapshot
+
+
+def register_snapshot(
+    owner: str, repo: str, refs: list[str], snapshot: RepoSnapshot
+) -> None:
+    with _lock:
+        for ref in refs:
+            _snapshots[(owner, repo, ref)] = snapshot
+        _references[snapshot] = _references.get(snapshot, 0) + 1
+
+
+def release_snapshot(snapshot: RepoSnapshot) -> None:
+    """Unregister and delete a snapshot once the last run using it releases it."""
+    with _lock:
+        _references[snapshot] = _references.get(snapshot, 1) - 1
+        if _references[snapshot] > 0:
+            return
+        del _references[snapshot]
+        for key in [key for key, value in _snapshots.items() if value is snapshot]:
+            del _snapshots[key]
+    snapshot.close()
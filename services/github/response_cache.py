@@ -0,0 +1,126 @@
+# Standard imports
+import json
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any
+from urllib.parse import urlencode
+
+# Third-party imports
+from requests.structures import CaseInsensitiveDict
+
+# Local imports
+from config import GITHUB_RESPONSE_CACHE_MAX_BYTES, UTF8
+from services.github.token_cache import get_token_scope
+
+_NOT_DECODED = object()
+
+
+@dataclass
+class CachedResponse:
+    """Body, validators and decoded JSON of a 200 response. Callers must not mutate it."""
+
+    content: bytes
+    headers: CaseInsensitiveDict[str]
+    etag: str | None
+    last_modified: str | None
+    _json: Any = field(default=_NOT_DECODED, repr=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def json(self) -> Any:
+        with self._lock:
+            if self._json is _NOT_DECODED:
+                self._json = json.loads(self.content.decode(encoding=UTF8))
+            return self._json
+
+
+class ResponseCache:
+    """Size-bounded LRU of GET responses for conditional requests. https://docs.github.com/en/rest/using-the-rest-api/best-practices-for-using-the-rest-api?apiVersion=2022-11-28#use-conditional-requests-if-appropriate"""
+
+    def __init__(self, max_bytes: int = GITHUB_RESPONSE_CACHE_MAX_BYTES) -> None:
+        self.max_bytes: int = max_bytes
+        self.size_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.bytes_saved = 0
+        self._entries: OrderedDict[str, CachedResponse] = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def create_key(
+        url: str, headers: dict[str, str], params: dict[str, Any] | None = None
+    ) -> str:
+        """Key by URL, media type and token scope."""
+        if params:
+            url += ("&" if "?" in url else "?") + urlencode(sorted(params.items()))
+        token: str = headers.get("Authorization", "").removeprefix("Bearer ")
+        scope: str = get_token_scope(token=token)
+        return f"{scope} {headers.get('Accept', '')} {url}"
+
+    def get(self, key: str) -> CachedResponse | None:
+        with self._lock:
+            entry: CachedResponse | None = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key=key)
+            return entry
+
+    def get_conditional_headers(self, key: str) -> dict[str, str]:
+        """If-None-Match / If-Modified-Since headers for a cached response, if any."""
+        entry: CachedResponse | None = self.get(key=key)
+        if entry is None:
+            return {}
+        if entry.etag is not None:
+            return {"If-None-Match": entry.etag}
+        if entry.last_modified is not None:
+            return {"If-Modified-Since": entry.last_modified}
+        return {}
+
+    def get_stats(self) -> dict[str, float]:
+        with self._lock:
+            requests_count: int = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / requests_count if requests_count else 0.0,
+                "bytes_saved": self.bytes_saved,
+                "size_bytes": self.size_bytes,
+                "entries": len(self._entries),
+            }
+
+    def hit(self, key: str) -> CachedResponse | None:
+        """Called on a 304 Not Modified. Returns None if the entry was evicted in the meantime."""
+        entry: CachedResponse | None = self.get(key=key)
+        if entry is None:
+            return None
+        with self._lock:
+            self.hits += 1
+            self.bytes_saved += len(entry.content)
+        return entry
+
+    def put(self, key: str, content: bytes, headers: dict[str, str]) -> None:
+        """Store a 200 response if it has a validator, evicting the least recently used entries to stay within max_bytes."""
+        headers = CaseInsensitiveDict(headers)
+        etag: str | None = headers.get("ETag")
+        last_modified: str | None = headers.get("Last-Modified")
+        has_validator: bool = etag is not None or last_modified is not None
+        with self._lock:
+            self.misses += 1
+            old_entry: CachedResponse | None = self._entries.pop(key, None)
+            if old_entry is not None:
+                self.size_bytes -= len(old_entry.content)
+            if not has_validator or len(content) > self.max_bytes:
+                return
+            self._entries[key] = CachedResponse(
+                content=content,
+                headers=headers,
+                etag=etag,
+                last_modified=last_modified,
+            )
+            self.size_bytes += len(content)
+            while self.size_bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.size_bytes -= len(evicted.content)
+
+
+# Shared by the sync and async GitHub clients
+response_cache = ResponseCache()
@@ -0,0 +1,76 @@
+# Standard imports
+import hashlib
+import threading
+import time
+from collections.abc import Hashable
+
+# Local imports
+from config import GITHUB_TOKEN_REFRESH_MARGIN_IN_SECONDS, UTF8
+
+
+class TokenCache:
+    """Keeps tokens in memory until shortly before they expire. Module-level instances survive across warm Lambda invocations."""
+
+    def __init__(self, refresh_margin_in_seconds: int) -> None:
+        self.refresh_margin_in_seconds: int = refresh_margin_in_seconds
+        self.hits = 0
+        self.misses = 0
+        self._tokens: dict[Hashable, tuple[str, float]] = {}
+        self._keys_by_token: dict[str, Hashable] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> str | None:
+        """Return the cached token, or None if it is missing or about to expire."""
+        with self._lock:
+            entry: tuple[str, float] | None = self._tokens.get(key)
+            if (
+                entry is None
+                or entry[1] - self.refresh_margin_in_seconds <= time.time()
+            ):
+                self.misses += 1
+                return None
+            self.hits += 1
+            return entry[0]
+
+    def get_key(self, token: str) -> Hashable | None:
+        """Reverse lookup, e.g. the installation ID a token was issued for."""
+        with self._lock:
+            return self._keys_by_token.get(token)
+
+    def get_stats(self) -> dict[str, int]:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "size": len(self._tokens)}
+
+    def invalidate(self, key: Hashable) -> None:
+        with self._lock:
+            entry: tuple[str, float] | None = self._tokens.pop(key, None)
+            if entry is not None:
+                self._keys_by_token.pop(entry[0], None)
+
+    def set(self, key: Hashable, token: str, expires_at: float) -> None:
+        """expires_at is a Unix timestamp in seconds."""
+        with self._lock:
+            old_entry: tuple[str, float] | None = self._tokens.get(key)
+            if old_entry is not None:
+                self._keys_by_token.pop(old_entry[0], None)
+            self._tokens[key] = (token, expires_at)
+            self._keys_by_token[token] = key
+
+
+# App JWTs live for 10 minutes. Re-sign one a minute before it expires.
+app_jwt_cache = TokenCache(refresh_margin_in_seconds=60)
+
+# Installation access tokens live for 1 hour, keyed by installation ID.
+installation_token_cache = TokenCache(
+    refresh_margin_in_seconds=GITHUB_TOKEN_REFRESH_MARGIN_IN_SECONDS
+)
+
+
+def get_token_scope(token: str) -> str:
+    """Who a token acts for: the app, an installation, or else a hash of the token"""
+    if token.count(".") == 2:  # JWTs rotate every 10 minutes but share the app's limit
+        return "app"
+    installation_id = installation_token_cache.get_key(token=token)
+    if installation_id is not None:
+        return f"installation:{installation_id}"
+    return hashlib.sha256(token.encode(encoding=UTF8)).hexdigest()
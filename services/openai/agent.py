@@ -1,29 +1,44 @@
 import difflib
 import json
 import logging
+import threading
 import time
-from typing import Any
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from contextvars import copy_context
+from typing import Any, Callable
 
 # Local imports
-from config import OPENAI_FINAL_STATUSES, OPENAI_MODEL_ID, TIMEOUT_IN_SECONDS
+from config import (
+    GITHUB_MAX_WORKERS,
+    LAMBDA_DEADLINE_MARGIN_IN_SECONDS,
+    OPENAI_FINAL_STATUSES,
+    OPENAI_MODEL_ID,
+    OPENAI_POLL_MAX_INTERVAL_IN_SECONDS,
+    OPENAI_POLL_MIN_INTERVAL_IN_SECONDS,
+    OPENAI_POLL_TIMEOUT_IN_SECONDS,
+    OPENAI_STREAM_RUNS,
+    OPENAI_TOOL_JOIN_TIMEOUT_IN_SECONDS,
+    OPENAI_TOOL_STEP_TIMEOUT_IN_SECONDS,
+    TIMEOUT_IN_SECONDS,
+)
+from utils.deadline import DeadlineExceeded, check_deadline, get_remaining_seconds
 from utils.file_manager import clean_specific_lines, correct_hunk_headers, split_diffs
+from utils.spans import span
 
 # Third-party imports
-from openai import OpenAI
-from openai.pagination import SyncCursorPage
-from openai.types.beta import Assistant, Thread
+from openai import APIError, OpenAI, Stream
+from openai.types.beta import Assistant, AssistantStreamEvent, Thread
 from openai.types.beta.threads import Message, Run, TextContentBlock
 from openai.types.beta.threads.run_submit_tool_outputs_params import ToolOutput
-from services.github.github_manager import (
-    commit_multiple_changes_to_remote_branch,
-    update_comment,
-)
+from services.github.github_manager import commit_multiple_changes_to_remote_branch
+from services.github.progress_reporter import ProgressReporter
+from services.openai.assistant_registry import assistant_registry
 from services.openai.functions import (
     GET_REMOTE_FILE_CONTENT,
     REASON_FOR_MODYING_DIFF,
     functions,
 )
-from services.openai.init import create_openai_client
+from services.openai.init import get_openai_client
 from services.openai.instructions import (
     SYSTEM_INSTRUCTION_FOR_AGENT,
     SYSTEM_INSTRUCTION_FOR_AGENT_REVIEW_DIFFS,
@@ -31,8 +46,8 @@ from services.openai.instructions import (
 
 
 def create_assistant() -> tuple[Assistant, str]:
-    """Create Open AI client and then create the assistant."""
-    client: OpenAI = create_openai_client()
+    """Get the assistant from the registry, which creates it only the first time its definition is used"""
+    client: OpenAI = get_openai_client()
     input_data = json.dumps(
         {
             "name": "GitAuto: Automated Issue Resolver",
@@ -41,42 +56,50 @@ def create_assistant() -> tuple[Assistant, str]:
         }
     )
     return (
-        client.beta.assistants.create(
-            name="GitAuto: Automated Issue Resolver",
-            instructions=SYSTEM_INSTRUCTION_FOR_AGENT,
-            tools=[
-                {"type": "function", "function": GET_REMOTE_FILE_CONTENT},
-                {"type": "function", "function": REASON_FOR_MODYING_DIFF},
-            ],
-            model=OPENAI_MODEL_ID,
-            timeout=TIMEOUT_IN_SECONDS,
+        assistant_registry.get_assistant(
+            client=client,
+            definition={
+                "name": "GitAuto: Automated Issue Resolver",
+                "instructions": SYSTEM_INSTRUCTION_FOR_AGENT,
+                "tools": [
+                    {"type": "function", "function": GET_REMOTE_FILE_CONTENT},
+                    {"type": "function", "function": REASON_FOR_MODYING_DIFF},
+                ],
+                "model": OPENAI_MODEL_ID,
+            },
         ),
         input_data,
     )
 
 
-def create_thread_and_run(
-    user_input: str,
-) -> tuple[OpenAI, Assistant, Thread, Run, str]:
+def create_assistant_and_thread() -> tuple[Assistant, Thread, str]:
     """thread represents a conversation. 1 thread per 1 issue.
     Assistants API will manage the context window.
     https://cookbook.openai.com/examples/assistants_api_overview_python"""
-    client: OpenAI = create_openai_client()
+    client: OpenAI = get_openai_client()
     thread: Thread = client.beta.threads.create(timeout=TIMEOUT_IN_SECONDS)
     assistant, input_data = create_assistant()
-    run, submit_message_input_data = submit_message(
-        client=client, assistant=assistant, thread=thread, user_message=user_input
-    )
-    input_data += submit_message_input_data
-    return client, assistant, thread, run, input_data
+    return assistant, thread, input_data
 
 
-def get_response(thread: Thread) -> SyncCursorPage[Message]:
-    """https://cookbook.openai.com/examples/assistants_api_overview_python"""
-    client: OpenAI = create_openai_client()
-    return client.beta.threads.messages.list(
-        thread_id=thread.id, order="desc", timeout=TIMEOUT_IN_SECONDS
-    )
+def get_latest_text(client: OpenAI, thread: Thread, run: Run) -> str:
+    """Only the latest message of the run is needed, so only that one is listed
+    https://platform.openai.com/docs/api-reference/messages/listMessages"""
+    messages: list[Message] = client.beta.threads.messages.list(
+        thread_id=thread.id,
+        order="desc",
+        limit=1,
+        run_id=run.id,
+        timeout=OPENAI_POLL_TIMEOUT_IN_SECONDS,
+    ).data
+    if not messages:
+        raise ValueError("messages_list is empty.")
+    latest_message: Message = messages[0]
+    if not latest_message.content:
+        raise ValueError("latest_message.content is empty.")
+    if not isinstance(latest_message.content[0], TextContentBlock):
+        raise ValueError("Last message content is not text.")
+    return latest_message.content[0].text.value
 
 
 def run_assistant(
@@ -91,7 +114,15 @@ def run_assistant(
     comment_url: str,
     token: str,
     new_branch: str,
+    base_sha: str,
+    assistant: Assistant,
+    thread: Thread,
+    assistant_input_data: str,  # From create_assistant_and_thread
+    progress: ProgressReporter,
+    checkpoint: dict[str, Any],
+    save_checkpoint: Callable[[str, Any], None],
 ) -> tuple[int, int]:
+    """Steps already in checkpoint, i.e. done by an earlier attempt, are skipped. Each step is passed to save_checkpoint once it's done."""
     # Create a message in the thread
     data: dict[str, str | list[str]] = {
         "owner": owner,
@@ -106,107 +137,104 @@ def run_assistant(
         "new_branch": new_branch,
     }
     user_input: str = json.dumps(obj=data)
+    client: OpenAI = get_openai_client()
+    input_data: str = assistant_input_data
+    output_data: str = ""
+    first_run_output: list[str] | None = checkpoint.get("first_diffs")
+    output: list[str] | None = checkpoint.get("reviewed_diffs")
+
+    if first_run_output is None:
+        # Run the assistant
+        input_data += add_message(client=client, thread=thread, user_message=user_input)
+        print(f"Thread is created: {thread.id}\n")
+
+        # Wait for the run to complete, handle function calling if necessary
+        with span(name="run:generate diffs"):
+            value, input_output_data = run_and_get_text(
+                client=client,
+                assistant=assistant,
+                thread=thread,
+                token=token,
+                run_name="generate diffs",
+                progress=progress,
+            )
+        input_data += input_output_data
+        output_data += input_output_data
+        output_data += json.dumps(value)
+        print(f"Last message: {value}\n")
+
+        # Clean the diff text and split it
+        diff: str = clean_specific_lines(text=value)
+        text_diffs: list[str] = split_diffs(diff_text=diff)
+        first_run_output = []
+        for diff in text_diffs:
+            diff = correct_hunk_headers(diff_text=diff)
+            first_run_output.append(diff)
+        save_checkpoint("first_diffs", first_run_output)
+    elif output is None:
+        # Resumed on a new thread, which needs the request before the review
+        input_data += add_message(client=client, thread=thread, user_message=user_input)
+
+    progress.update_progress(percent=50, message="50% Half way there!")
+
+    if output is None:
+        # Self review diff
+        input_data += add_message(
+            client=client,
+            thread=thread,
+            user_message=SYSTEM_INSTRUCTION_FOR_AGENT_REVIEW_DIFFS
+            + json.dumps(first_run_output),
+        )
 
-    # Run the assistant
-    client, assistant, thread, run, input_data = create_thread_and_run(
-        user_input=user_input
-    )
-    print(f"Thread is created: {thread.id}\n")
-    print(f"Run is created: {run.id}\n")
-
-    # Wait for the run to complete, handle function calling if necessary
-    run, input_output_data = wait_on_run(
-        run=run, thread=thread, token=token, run_name="generate diffs"
-    )
-    input_data += input_output_data
-    output_data: str = input_output_data
-
-    # Get the response
-    messages: SyncCursorPage[Message] = get_response(thread=thread)
-    messages_list = list(messages)
-    if not messages_list:
-        raise ValueError("messages_list is empty.")
-    latest_message: Message = messages_list[0]
-    if not latest_message.content:
-        raise ValueError("latest_message.content is empty.")
-    if isinstance(latest_message.content[0], TextContentBlock):
-        value: str = latest_message.content[0].text.value
-        output_data += json.dumps(latest_message.content[0].text.value)
-    else:
-        raise ValueError("Last message content is not text.")
-    print(f"Last message: {value}\n")
-
-    # Clean the diff text and split it
-    diff: str = clean_specific_lines(text=value)
-    text_diffs: list[str] = split_diffs(diff_text=diff)
-    first_run_output: list[str] = []
-    for diff in text_diffs:
-        diff = correct_hunk_headers(diff_text=diff)
-        first_run_output.append(diff)
-
-    update_comment(
-        comment_url=comment_url,
-        token=token,
-        body="![X](https://progress-bar.dev/50/?title=Progress&width=800)\n50% Half way there!",
-    )
-
-    # Self review diff
-    self_review_run, self_review_input_data = submit_message(
-        client,
-        assistant,
-        thread,
-        SYSTEM_INSTRUCTION_FOR_AGENT_REVIEW_DIFFS + json.dumps(first_run_output),
-    )
-    input_data += self_review_input_data
-
-    self_review_run, self_review_input_data = wait_on_run(
-        run=self_review_run, thread=thread, token=token, run_name="review diffs"
-    )
-    input_data += self_review_input_data
-
-    # Get the response
-    messages: SyncCursorPage[Message] = get_response(thread=thread)
-    messages_list = list(messages)
-    if not messages_list:
-        raise ValueError("No messages in the list.")
-    latest_message: Message = messages_list[0]
-    if isinstance(latest_message.content[0], TextContentBlock):
-        value: str = latest_message.content[0].text.value
-        output_data += json.dumps(latest_message.content[0].text.value)
-    else:
-        raise ValueError("Last message content is not text.")
-    print(f"Last message: {value}\n")
-
-    # Clean the diff text and split it
-    diff: str = clean_specific_lines(text=value)
-    text_diffs: list[str] = split_diffs(diff_text=diff)
-    output: list[str] = []
-    i = 0
-    for diff in text_diffs:
-        diff = correct_hunk_headers(diff_text=diff)
-        # Show difference between the create diff and the modified diff
-        if i < len(first_run_output):
-            difference_from_first = "\n".join(
-                difflib.unified_diff(
-                    first_run_output[i].splitlines(), diff.splitlines(), lineterm=""
+        with span(name="run:review diffs"):
+            value, self_review_input_data = run_and_get_text(
+                client=client,
+                assistant=assistant,
+                thread=thread,
+                token=token,
+                run_name="review diffs",
+                progress=progress,
+            )
+        input_data += self_review_input_data
+        output_data += json.dumps(value)
+        print(f"Last message: {value}\n")
+
+        # Clean the diff text and split it
+        diff: str = clean_specific_lines(text=value)
+        text_diffs: list[str] = split_diffs(diff_text=diff)
+        output = []
+        i = 0
+        for diff in text_diffs:
+            diff = correct_hunk_headers(diff_text=diff)
+            # Show difference between the create diff and the modified diff
+            if i < len(first_run_output):
+                difference_from_first = "\n".join(
+                    difflib.unified_diff(
+                        first_run_output[i].splitlines(), diff.splitlines(), lineterm=""
+                    )
                 )
+                print(f"Difference from first: {difference_from_first}\n")
+            output.append(diff)
+            i += 1
+        save_checkpoint("reviewed_diffs", output)
+
+    if not checkpoint.get("committed"):
+        with span(name="commit"):
+            commit_sha: str | None = commit_multiple_changes_to_remote_branch(
+                diffs=output,
+                new_branch=new_branch,
+                owner=owner,
+                repo=repo,
+                token=token,
+                base_sha=base_sha,
             )
-            print(f"Difference from first: {difference_from_first}\n")
-        output.append(diff)
-        i += 1
-
-    commit_multiple_changes_to_remote_branch(
-        diffs=output,
-        new_branch=new_branch,
-        owner=owner,
-        repo=repo,
-        token=token,
-    )
+        # The error was logged and swallowed. Raise so that a retry commits again instead of opening an empty PR.
+        if commit_sha is None:
+            raise ValueError(f"Failed to commit the changes to {new_branch}.")
+        save_checkpoint("committed", True)
 
-    update_comment(
-        comment_url=comment_url,
-        token=token,
-        body="![X](https://progress-bar.dev/70/?title=Progress&width=800)\n80% there! We're reviewing your new code changes!",
+    progress.update_progress(
+        percent=70, message="80% there! We're reviewing your new code changes!"
     )
 
     output_data += json.dumps(output)
@@ -218,9 +246,7 @@ def run_assistant(
     return token_input, token_output
 
 
-def submit_message(
-    client: OpenAI, assistant: Assistant, thread: Thread, user_message: str
-) -> tuple[Run, str]:
+def add_message(client: OpenAI, thread: Thread, user_message: str) -> str:
     """https://cookbook.openai.com/examples/assistants_api_overview_python"""
     client.beta.threads.messages.create(
         thread_id=thread.id,
@@ -228,54 +254,203 @@ def submit_message(
         content=user_message,
         timeout=TIMEOUT_IN_SECONDS,
     )
-    input_data = json.dumps(
+    return json.dumps(
         {
             "content": str(user_message),
             "role": "'user",
         }
     )
-    return (
-        client.beta.threads.runs.create(
+
+
+def run_and_get_text(
+    client: OpenAI,
+    assistant: Assistant,
+    thread: Thread,
+    token: str,
+    run_name: str,
+    progress: ProgressReporter | None = None,
+) -> tuple[str, str]:
+    """Run the assistant on the thread and return the text of its last message, and the tool outputs it was given as input data"""
+    if OPENAI_STREAM_RUNS:
+        run, input_data, text = stream_run(
+            client=client,
+            assistant=assistant,
+            thread=thread,
+            token=token,
+            run_name=run_name,
+            progress=progress,
+        )
+    else:
+        run = client.beta.threads.runs.create(
             thread_id=thread.id, assistant_id=assistant.id, timeout=TIMEOUT_IN_SECONDS
-        ),
-        input_data,
-    )
+        )
+        print(f"Run is created: {run.id}\n")
+        run, input_data = wait_on_run(
+            run=run, thread=thread, token=token, run_name=run_name, progress=progress
+        )
+        text = None
+    if text is None:
+        text = get_latest_text(client=client, thread=thread, run=run)
+    return text, input_data
+
+
+def get_file_path(arguments: str) -> str:
+    """The file a tool call asks for, to show in the progress comment. Bad arguments are left to the call, which gets its own error."""
+    try:
+        args: Any = json.loads(s=arguments)
+    except ValueError:
+        return ""
+    file_path: Any = args.get("file_path") if isinstance(args, dict) else None
+    return file_path if isinstance(file_path, str) else ""
+
+
+def get_tool_outputs(
+    run: Run, token: str, progress: ProgressReporter | None = None
+) -> list[ToolOutput]:
+    """Call the functions the run requires. The combined tool outputs must be less than 512kb."""
+    if progress is not None and run.required_action is not None:
+        names: list[str] = [
+            get_file_path(arguments=call.function.arguments) or call.function.name
+            for call in run.required_action.submit_tool_outputs.tool_calls
+        ]
+        progress.update_progress(
+            percent=progress.percent, message=f"Reading {', '.join(names)}"
+        )
+    try:
+        tool_outputs: list[Any] = call_functions(run=run, funcs=functions, token=token)
+    except Exception as e:
+        raise ValueError(f"Error: {e}") from e
+    return [
+        {"tool_call_id": tool_call.id, "output": json.dumps(obj=result)}
+        for tool_call, result in tool_outputs
+    ]
+
+
+def cancel_run_on_deadline(client: OpenAI, thread: Thread, run: Run) -> None:
+    try:
+        check_deadline()
+    except DeadlineExceeded:
+        # Don't leave the run going, as a retry starts this step over on a new thread
+        client.beta.threads.runs.cancel(
+            thread_id=thread.id, run_id=run.id, timeout=TIMEOUT_IN_SECONDS
+        )
+        raise
 
 
-def wait_on_run(run: Run, thread: Thread, token: str, run_name: str) -> tuple[Run, str]:
-    """https://cookbook.openai.com/examples/assistants_api_overview_python"""
+def stream_run(
+    client: OpenAI,
+    assistant: Assistant,
+    thread: Thread,
+    token: str,
+    run_name: str,
+    progress: ProgressReporter | None = None,
+) -> tuple[Run, str, str | None]:
+    """Follow the run by its events, or poll it with the text None if the stream fails. https://platform.openai.com/docs/api-reference/assistants-streaming/events"""
+    input_data = ""
+    text: str | None = None
+    run: Run | None = None
+    try:
+        stream: Stream[AssistantStreamEvent] | None = client.beta.threads.runs.create(
+            thread_id=thread.id,
+            assistant_id=assistant.id,
+            stream=True,
+            timeout=TIMEOUT_IN_SECONDS,
+        )
+        while stream is not None:
+            # Submitting tool outputs continues the run on a new stream
+            next_stream: Stream[AssistantStreamEvent] | None = None
+            with stream:
+                for event in stream:
+                    if event.event == "error":
+                        raise ValueError(f"Run `{run_name}` stream error: {event.data}")
+                    if isinstance(event.data, Run):
+                        if run is None:
+                            print(f"Run is created: {event.data.id}\n")
+                        run = event.data
+                        cancel_run_on_deadline(client=client, thread=thread, run=run)
+                    if event.event == "thread.run.requires_action" and run is not None:
+                        print("Run requires action")
+                        tool_outputs: list[ToolOutput] = get_tool_outputs(
+                            run=run, token=token, progress=progress
+                        )
+                        input_data += json.dumps(tool_outputs)
+                        next_stream = client.beta.threads.runs.submit_tool_outputs(
+                            thread_id=thread.id,
+                            run_id=run.id,
+                            tool_outputs=tool_outputs,
+                            stream=True,
+                            timeout=TIMEOUT_IN_SECONDS,
+                        )
+                        break
+                    if event.event == "thread.message.completed":
+                        content = event.data.content
+                        if content and isinstance(content[0], TextContentBlock):
+                            text = content[0].text.value
+            stream = next_stream
+    except APIError as err:
+        print(f"Run `{run_name}` stream failed, polling instead: {err}")
+        if run is None:
+            run = client.beta.threads.runs.create(
+                thread_id=thread.id,
+                assistant_id=assistant.id,
+                timeout=TIMEOUT_IN_SECONDS,
+            )
+        run, poll_input_data = wait_on_run(
+            run=run, thread=thread, token=token, run_name=run_name, progress=progress
+        )
+        return run, input_data + poll_input_data, None
+
+    if run is None:
+        raise ValueError(f"Run `{run_name}` stream ended without a run.")
+    if run.status == "failed":
+        logging.error("Run %s failed: %s", run_name, run.last_error)
+    print(f"Run {run_name} status after stream: {run.status}")
+    return run, input_data, text
+
+
+def wait_on_run(
+    run: Run,
+    thread: Thread,
+    token: str,
+    run_name: str,
+    progress: ProgressReporter | None = None,
+) -> tuple[Run, str]:
+    """Poll the run, backing off while its status doesn't change
+    https://cookbook.openai.com/examples/assistants_api_overview_python"""
     print(f"Run `{run_name}` status before loop: { run.status}")
-    client: OpenAI = create_openai_client()
+    client: OpenAI = get_openai_client()
     input_data = ""
+    interval: float = OPENAI_POLL_MIN_INTERVAL_IN_SECONDS
     while run.status not in OPENAI_FINAL_STATUSES:
         print(f"Run `{run_name}` status during loop: {run.status}")
+        cancel_run_on_deadline(client=client, thread=thread, run=run)
+        status: str = run.status
         run = client.beta.threads.runs.retrieve(
-            thread_id=thread.id, run_id=run.id, timeout=TIMEOUT_IN_SECONDS
+            thread_id=thread.id, run_id=run.id, timeout=OPENAI_POLL_TIMEOUT_IN_SECONDS
         )
 
         # If the run requires action, call the function and run again with the output
         if run.status == "requires_action":
             print("Run requires action")
-            try:
-                tool_outputs: list[Any] = call_functions(
-                    run=run, funcs=functions, token=token
-                )
-
-                # The combined tool outputs must be less than 512kb.
-                tool_outputs_json: list[ToolOutput] = [
-                    {"tool_call_id": tool_call.id, "output": json.dumps(obj=result)}
-                    for tool_call, result in tool_outputs
-                ]
-                input_data += json.dumps(tool_outputs_json)
-                run = client.beta.threads.runs.submit_tool_outputs(
-                    thread_id=thread.id,
-                    run_id=run.id,
-                    tool_outputs=tool_outputs_json,
-                    timeout=TIMEOUT_IN_SECONDS,
-                )
-            except Exception as e:
-                raise ValueError(f"Error: {e}") from e
-        time.sleep(0.5)
+            tool_outputs: list[ToolOutput] = get_tool_outputs(
+                run=run, token=token, progress=progress
+            )
+            input_data += json.dumps(tool_outputs)
+            run = client.beta.threads.runs.submit_tool_outputs(
+                thread_id=thread.id,
+                run_id=run.id,
+                tool_outputs=tool_outputs,
+                timeout=TIMEOUT_IN_SECONDS,
+            )
+        if run.status in OPENAI_FINAL_STATUSES:
+            break
+        # Poll again soon after a change, as the next one often follows quickly
+        interval = (
+            OPENAI_POLL_MIN_INTERVAL_IN_SECONDS
+            if run.status != status
+            else min(interval * 2, OPENAI_POLL_MAX_INTERVAL_IN_SECONDS)
+        )
+        time.sleep(interval)
 
     # Loop is done, check if the run failed
     # See https://platform.openai.com/docs/api-reference/runs/object#runs/object-last_error
@@ -285,31 +460,78 @@ def wait_on_run(run: Run, thread: Thread, token: str, run_name: str) -> tuple[Ru
     return run, input_data
 
 
+# Tool calls that outlived their step. They can still be reading the repository snapshot.
+_stragglers: set[Future[Any]] = set()
+_stragglers_lock = threading.Lock()
+
+
+def _get_timeout(timeout: float) -> float:
+    """Stop waiting before the invocation's deadline too, so the run can be cancelled in time"""
+    remaining: float | None = get_remaining_seconds()
+    if remaining is None:
+        return timeout
+    return max(min(timeout, remaining - LAMBDA_DEADLINE_MARGIN_IN_SECONDS), 0)
+
+
+def _discard_straggler(future: Future[Any]) -> None:
+    with _stragglers_lock:
+        _stragglers.discard(future)
+
+
+def join_tool_calls(timeout: float = OPENAI_TOOL_JOIN_TIMEOUT_IN_SECONDS) -> int:
+    """Wait for the tool calls that timed out to finish. Return how many are still running."""
+    with _stragglers_lock:
+        futures: list[Future[Any]] = list(_stragglers)
+    _, not_done = wait(fs=futures, timeout=_get_timeout(timeout=timeout))
+    return len(not_done)
+
+
 def call_functions(run: Run, funcs: dict[str, Any], token: str) -> list[Any]:
+    """Call the tools of one step concurrently. A call that fails or times out gets its error as output."""
     # Raise an error if there is no tool call in the run
     if run.required_action is None:
         raise ValueError("No tool call in the run.")
+    tool_calls: list[Any] = run.required_action.submit_tool_outputs.tool_calls
 
-    # Get the tool calls
-    results: list[Any] = []
-    for tool_call in run.required_action.submit_tool_outputs.tool_calls:
+    def call_function(tool_call: Any) -> Any:
         name: str = tool_call.function.name
         args = json.loads(s=tool_call.function.arguments)
         args["token"] = token
         print(f"{name=}\n{args=}\n")
-
         if name not in funcs:
-            print(f"Function not found: {name}, skipping it.")
-            continue
-
-        # Call the function if it exists
-        try:
-            func: Any = funcs[name]
-            result: Any = func(**args)
-            results.append((tool_call, result))
-        except KeyError as e:
-            raise ValueError(f"call_functions Function not found: {e}") from e
-        except Exception as e:
-            raise ValueError(f"call_functions Error: {e}") from e
+            raise ValueError(f"Function not found: {name}")
+        with span(name=f"tool:{name}"):
+            return funcs[name](**args)
+
+    timeout: float = _get_timeout(timeout=OPENAI_TOOL_STEP_TIMEOUT_IN_SECONDS)
+
+    executor = ThreadPoolExecutor(max_workers=GITHUB_MAX_WORKERS)
+    try:
+        # Each call runs in its own copy of the context, so its span is added to the request's spans
+        futures: list[Future[Any]] = [
+            executor.submit(copy_context().run, call_function, tool_call)
+            for tool_call in tool_calls
+        ]
+        wait(fs=futures, timeout=timeout)
+    finally:
+        # Calls still running are left behind instead of holding up the step, until join_tool_calls
+        executor.shutdown(wait=False, cancel_futures=True)
+    for future in futures:
+        if not future.done():
+            with _stragglers_lock:
+                _stragglers.add(future)
+            future.add_done_callback(_discard_straggler)
 
+    results: list[Any] = []
+    for tool_call, future in zip(tool_calls, futures):
+        name: str = tool_call.function.name
+        if not future.done() or future.cancelled():
+            result: Any = f"Error: {name} timed out after {timeout:g} seconds."
+            print(f"call_functions {result}")
+        elif future.exception() is not None:
+            result = f"Error: {future.exception()}"
+            print(f"call_functions {name} {result}")
+        else:
+            result = future.result()
+        results.append((tool_call, result))
     return results
@@ -0,0 +1,77 @@
+# Standard imports
+import hashlib
+import json
+import threading
+from typing import Any
+
+# Third-party imports
+from openai import OpenAI
+from openai.types.beta import Assistant
+
+# Local imports
+from config import OPENAI_POLL_TIMEOUT_IN_SECONDS, PRODUCT_ID, TIMEOUT_IN_SECONDS, UTF8
+
+
+def get_definition_hash(definition: dict[str, Any]) -> str:
+    """Same hash for the same name, instructions, model and tool schemas, whatever the order of their keys"""
+    serialized: str = json.dumps(obj=definition, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(serialized.encode(encoding=UTF8)).hexdigest()
+
+
+class AssistantRegistry:
+    """One assistant per definition, found by its metadata after a cold start. https://platform.openai.com/docs/api-reference/assistants/object#assistants/object-metadata"""
+
+    def __init__(self, key: str) -> None:
+        self.key: str = key
+        self.hits = 0
+        self.found = 0
+        self.created = 0
+        self._assistants: dict[str, Assistant] = {}
+        self._lock = threading.Lock()
+
+    def get_assistant(self, client: OpenAI, definition: dict[str, Any]) -> Assistant:
+        """definition holds the arguments of client.beta.assistants.create, e.g. name, instructions, model and tools"""
+        definition_hash: str = get_definition_hash(definition=definition)
+        # Held while looking up, so concurrent issues in one container create at most one assistant
+        with self._lock:
+            assistant: Assistant | None = self._assistants.get(definition_hash)
+            if assistant is not None:
+                self.hits += 1
+                return assistant
+            assistant = self._find(client=client, definition_hash=definition_hash)
+            if assistant is not None:
+                self.found += 1
+            else:
+                assistant = client.beta.assistants.create(
+                    **definition,
+                    metadata={
+                        "registry_key": self.key,
+                        "definition_hash": definition_hash,
+                    },
+                    timeout=TIMEOUT_IN_SECONDS,
+                )
+                self.created += 1
+                print(f"Assistant {assistant.id} is created for {self.key}")
+            self._assistants[definition_hash] = assistant
+            return assistant
+
+    def get_stats(self) -> dict[str, int]:
+        with self._lock:
+            return {"hits": self.hits, "found": self.found, "created": self.created}
+
+    def _find(self, client: OpenAI, definition_hash: str) -> Assistant | None:
+        """Only the newest page is searched. Once registered, assistants stop being created per issue, so the current one stays near the top."""
+        for assistant in client.beta.assistants.list(
+            order="desc", limit=100, timeout=OPENAI_POLL_TIMEOUT_IN_SECONDS
+        ).data:
+            metadata: dict[str, Any] = assistant.metadata or {}
+            if (
+                metadata.get("registry_key") == self.key
+                and metadata.get("definition_hash") == definition_hash
+            ):
+                return assistant
+        return None
+
+
+# Keyed by PRODUCT_ID, so each environment sharing the OpenAI organization has its own assistant
+assistant_registry = AssistantRegistry(key=f"{PRODUCT_ID}:agent")
@@ -1,18 +1,22 @@
 # Third-party imports
 # Local imports
-from config import OPENAI_MODEL_ID, OPENAI_TEMPERATURE
+from config import (
+    OPENAI_CHAT_TIMEOUT_IN_SECONDS,
+    OPENAI_MODEL_ID,
+    OPENAI_TEMPERATURE,
+)
 from utils.handle_exceptions import handle_exceptions
 
 from openai import OpenAI
 from openai.types.chat import ChatCompletion
-from services.openai.init import create_openai_client
+from services.openai.init import get_openai_client
 from services.openai.instructions import SYSTEM_INSTRUCTION_FOR_WRITING_PR
 
 
 @handle_exceptions(raise_on_error=True)
 def write_pr_body(input_message: str) -> str:
     """https://platform.openai.com/docs/api-reference/chat/create"""
-    client: OpenAI = create_openai_client()
+    client: OpenAI = get_openai_client()
     completion: ChatCompletion = client.chat.completions.create(
         messages=[
             {"role": "system", "content": SYSTEM_INSTRUCTION_FOR_WRITING_PR},
@@ -21,6 +25,7 @@ def write_pr_body(input_message: str) -> str:
         model=OPENAI_MODEL_ID,
         n=1,
         temperature=OPENAI_TEMPERATURE,
+        timeout=OPENAI_CHAT_TIMEOUT_IN_SECONDS,
     )
     content: str | None = completion.choices[0].message.content
     response: str = content if content else "No response from OpenAI"
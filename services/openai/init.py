@@ -1,7 +1,74 @@
-from config import OPENAI_API_KEY, OPENAI_ORG_ID
+# Standard imports
+import threading
+from functools import cache
+from typing import Any
 
-from openai import OpenAI
+# Third-party imports
+import httpx
+from openai import DefaultHttpxClient, OpenAI
 
+# Local imports
+from config import (
+    OPENAI_API_KEY,
+    OPENAI_CONNECT_TIMEOUT_IN_SECONDS,
+    OPENAI_KEEPALIVE_EXPIRY_IN_SECONDS,
+    OPENAI_ORG_ID,
+    OPENAI_POOL_MAXSIZE,
+    TIMEOUT_IN_SECONDS,
+)
 
-def create_openai_client() -> OpenAI:
-    return OpenAI(api_key=OPENAI_API_KEY, organization=OPENAI_ORG_ID)
+
+class OpenAITransport(httpx.BaseTransport):
+    """Pooled transport to the OpenAI API that counts requests made against connections opened"""
+
+    def __init__(self) -> None:
+        self._transport = httpx.HTTPTransport(
+            limits=httpx.Limits(
+                max_connections=OPENAI_POOL_MAXSIZE,
+                max_keepalive_connections=OPENAI_POOL_MAXSIZE,
+                keepalive_expiry=OPENAI_KEEPALIVE_EXPIRY_IN_SECONDS,
+            ),
+        )
+        self._stats_lock = threading.Lock()
+        self._stats: dict[str, int] = {"requests": 0, "connections_opened": 0}
+
+    def get_stats(self) -> dict[str, int]:
+        with self._stats_lock:
+            return dict(self._stats)
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        opened: list[int] = [0]
+
+        # https://www.encode.io/httpcore/extensions/#trace
+        def trace(event_name: str, _info: dict[str, Any]) -> None:
+            if event_name == "connection.connect_tcp.complete":
+                opened[0] += 1
+
+        request.extensions["trace"] = trace
+        try:
+            return self._transport.handle_request(request)
+        finally:
+            with self._stats_lock:
+                self._stats["requests"] += 1
+                self._stats["connections_opened"] += opened[0]
+
+    def close(self) -> None:
+        self._transport.close()
+
+
+@cache
+def get_openai_transport() -> OpenAITransport:
+    return OpenAITransport()
+
+
+@cache
+def get_openai_client() -> OpenAI:
+    """Shared by every call and warm invocation to reuse connections. https://github.com/openai/openai-python#configuring-the-http-client"""
+    return OpenAI(
+        api_key=OPENAI_API_KEY,
+        organization=OPENAI_ORG_ID,
+        timeout=httpx.Timeout(
+            timeout=TIMEOUT_IN_SECONDS, connect=OPENAI_CONNECT_TIMEOUT_IN_SECONDS
+        ),
+        http_client=DefaultHttpxClient(transport=get_openai_transport()),
+    )
@@ -1,11 +1,15 @@
 # Third-party imports
 # Local imports
-from config import OPENAI_MODEL_ID, OPENAI_TEMPERATURE
+from config import (
+    OPENAI_CHAT_TIMEOUT_IN_SECONDS,
+    OPENAI_MODEL_ID,
+    OPENAI_TEMPERATURE,
+)
 from utils.handle_exceptions import handle_exceptions
 
 from openai import OpenAI
 from openai.types.chat import ChatCompletion
-from services.openai.init import create_openai_client
+from services.openai.init import get_openai_client
 from services.openai.instructions import USER_INSTRUCTION
 
 
@@ -16,7 +20,7 @@ def describe_image(base64_image: str) -> str:
     2. 20MB per image is allowed: https://platform.openai.com/docs/guides/vision/is-there-a-limit-to-the-size-of-the-image-i-can-upload
     3. PNG (.png), JPEG (.jpeg and .jpg), WEBP (.webp), and non-animated GIF (.gif) are only supported: https://platform.openai.com/docs/guides/vision/what-type-of-files-can-i-upload
     """
-    client: OpenAI = create_openai_client()
+    client: OpenAI = get_openai_client()
     completion: ChatCompletion = client.chat.completions.create(
         messages=[
             {
@@ -39,6 +43,7 @@ def describe_image(base64_image: str) -> str:
         model=OPENAI_MODEL_ID,
         n=1,
         temperature=OPENAI_TEMPERATURE,
+        timeout=OPENAI_CHAT_TIMEOUT_IN_SECONDS,
     )
     content: str | None = completion.choices[0].message.content.strip()
     description: str = content if content else "No response from OpenAI"
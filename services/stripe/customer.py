@@ -1,9 +1,21 @@
+from functools import cache
+from types import ModuleType
+from typing import TYPE_CHECKING
+
 from config import FREE_TIER_REQUEST_AMOUNT, STRIPE_API_KEY, STRIPE_FREE_TIER_PRICE_ID
 from utils.handle_exceptions import handle_exceptions
 
-import stripe
+if TYPE_CHECKING:
+    import stripe
+
+
+@cache
+def get_stripe() -> ModuleType:
+    """The Stripe SDK takes about a second to import, so it's imported on first use instead of on every cold start."""
+    import stripe  # pylint: disable=import-outside-toplevel,redefined-outer-name
 
-stripe.api_key = STRIPE_API_KEY
+    stripe.api_key = STRIPE_API_KEY
+    return stripe
 
 
 @handle_exceptions(raise_on_error=True)
@@ -15,7 +27,7 @@ def subscribe_to_free_plan(
     owner_name: str,
     installation_id: int,
 ):
-    stripe.Subscription.create(
+    get_stripe().Subscription.create(
         customer=customer_id,
         items=[{"price": STRIPE_FREE_TIER_PRICE_ID}],
         description="GitAuto Github App Installation Event",
@@ -33,7 +45,7 @@ def subscribe_to_free_plan(
 def create_stripe_customer(
     owner_name: str, owner_id: int, installation_id: int, user_id: int, user_name: str
 ) -> str:
-    customer = stripe.Customer.create(
+    customer = get_stripe().Customer.create(
         name=owner_name,
         metadata={
             "owner_id": str(owner_id),
@@ -47,13 +59,13 @@ def create_stripe_customer(
 
 
 @handle_exceptions(raise_on_error=True)
-def get_subscription(customer_id: str) -> stripe.ListObject[stripe.Subscription]:
-    subscription = stripe.Subscription.list(customer=customer_id, status="active")
+def get_subscription(customer_id: str) -> "stripe.ListObject[stripe.Subscription]":
+    subscription = get_stripe().Subscription.list(customer=customer_id, status="active")
     return subscription
 
 
 @handle_exceptions(default_return_value=FREE_TIER_REQUEST_AMOUNT, raise_on_error=False)
 def get_request_count_from_product_id_metadata(product_id: str) -> int:
     """https://docs.stripe.com/api/products/retrieve?lang=python"""
-    price = stripe.Product.retrieve(product_id)
+    price = get_stripe().Product.retrieve(product_id)
     return int(price["metadata"]["request_count"])
@@ -1,11 +1,38 @@
-from supabase import Client, create_client
+from functools import cache
+from typing import TYPE_CHECKING
+
+from config import SUPABASE_SERVICE_ROLE_KEY, SUPABASE_URL
 
 from .gitauto_manager import GitAutoAgentManager
+from .locks_manager import LocksManager
+from .supabase_client import SupabaseTransport, create_session
 from .users_manager import UsersManager
 
+if TYPE_CHECKING:
+    from supabase import Client
+
 
-class SupabaseManager(GitAutoAgentManager, UsersManager):
+class SupabaseManager(GitAutoAgentManager, LocksManager, UsersManager):
     "Combines all supabase services into one manager so you only need to instntiate one object."
 
     def __init__(self, url: str, key: str) -> None:
+        # The SDK is imported here, on first use, to keep it off the cold start of paths that don't need it
+        from supabase import create_client  # pylint: disable=import-outside-toplevel
+
         self.client: Client = create_client(supabase_url=url, supabase_key=key)
+        # Every table call goes through this one session, so connections are pooled and kept alive instead of opened per query.
+        # The service role never signs in, so the client never rebuilds its postgrest client and drops the session.
+        self.transport = SupabaseTransport()
+        self.client.postgrest.session = create_session(
+            session=self.client.postgrest.session, transport=self.transport
+        )
+
+    def get_stats(self) -> dict[str, int]:
+        """Round trips and connections opened since the manager was created. Fewer connections than round trips means keep-alive is working."""
+        return self.transport.get_stats()
+
+
+@cache
+def get_supabase_manager() -> SupabaseManager:
+    """The manager shared by every module and every warm invocation, created on first use"""
+    return SupabaseManager(url=SUPABASE_URL, key=SUPABASE_SERVICE_ROLE_KEY)
@@ -1,17 +1,21 @@
 """Class to manage all GitAuto related operations"""
 
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
+from typing import TYPE_CHECKING, Any
 
+from config import CHECKPOINT_MAX_AGE_IN_SECONDS
 from utils.handle_exceptions import handle_exceptions
 
 from services.stripe.customer import create_stripe_customer, subscribe_to_free_plan
-from supabase import Client
+
+if TYPE_CHECKING:
+    from supabase import Client
 
 
 class GitAutoAgentManager:
     """Class to manage all GitAuto related operations"""
 
-    def __init__(self, client: Client) -> None:
+    def __init__(self, client: "Client") -> None:
         self.client = client
 
     @handle_exceptions(default_return_value=None, raise_on_error=False)
@@ -21,6 +25,7 @@ class GitAutoAgentManager:
         token_input: int,
         token_output: int,
         total_seconds: int,
+        spans: dict[str, Any] | None = None,
     ) -> None:
         """Add agent information to usage record and set is_completed to True."""
         self.client.table(table_name="usage").update(
@@ -31,6 +36,9 @@ class GitAutoAgentManager:
                 "total_seconds": total_seconds,
             }
         ).eq(column="id", value=usage_record_id).execute()
+        # Written on its own, so a failure can't keep the run from being completed
+        if spans is not None:
+            self.save_spans(usage_record_id=usage_record_id, spans=spans)
 
     @handle_exceptions(default_return_value=None, raise_on_error=True)
     def create_installation(
@@ -175,6 +183,27 @@ class GitAutoAgentManager:
         )
         return [item["installation_id"] for item in data[1]]
 
+    @handle_exceptions(default_return_value=None, raise_on_error=False)
+    def get_checkpoint(self, unique_issue_id: str) -> tuple[int, dict[str, Any]] | None:
+        """The usage record ID and checkpoints of the latest unfinished run of an issue, to resume it"""
+        created_after: datetime = datetime.now(tz=timezone.utc) - timedelta(
+            seconds=CHECKPOINT_MAX_AGE_IN_SECONDS
+        )
+        data, _ = (
+            self.client.table(table_name="usage")
+            .select("id, checkpoint")
+            .eq(column="unique_issue_id", value=unique_issue_id)
+            .eq(column="is_completed", value=False)
+            .not_.is_(column="checkpoint", value="null")
+            .gte(column="created_at", value=created_after.isoformat())
+            .order(column="id", desc=True)
+            .limit(size=1)
+            .execute()
+        )
+        if not data[1]:
+            return None
+        return data[1][0]["id"], data[1][0]["checkpoint"]
+
     @handle_exceptions(default_return_value=False, raise_on_error=False)
     def is_users_first_issue(self, user_id: int, installation_id: int) -> bool:
         """Checks if it's the users first issue"""
@@ -190,6 +219,27 @@ class GitAutoAgentManager:
             return True
         return False
 
+    @handle_exceptions(default_return_value=False, raise_on_error=False)
+    def save_checkpoint(self, usage_record_id: int, checkpoint: dict[str, Any]) -> bool:
+        """Replace the checkpoints of a run. Return False if they couldn't be saved."""
+        (
+            self.client.table(table_name="usage")
+            .update(json={"checkpoint": checkpoint})
+            .eq(column="id", value=usage_record_id)
+            .execute()
+        )
+        return True
+
+    @handle_exceptions(default_return_value=None, raise_on_error=False)
+    def save_spans(self, usage_record_id: int, spans: dict[str, Any]) -> None:
+        """spans is the JSON breakdown of total_seconds"""
+        (
+            self.client.table(table_name="usage")
+            .update(json={"spans": spans})
+            .eq(column="id", value=usage_record_id)
+            .execute()
+        )
+
     @handle_exceptions(default_return_value=None, raise_on_error=False)
     def set_issue_to_merged(self, unique_issue_id: str) -> None:
         (
@@ -0,0 +1,68 @@
+"""Class to manage locks shared by every Lambda container"""
+
+from datetime import datetime, timedelta, timezone
+from typing import TYPE_CHECKING
+
+from utils.handle_exceptions import handle_exceptions
+
+if TYPE_CHECKING:
+    from supabase import Client
+
+# The "locks" table is created by supabase/migrations/20261018000002_create_locks.sql
+UNIQUE_VIOLATION = "23505"
+
+
+class LocksManager:
+    """TTLStore on the "locks" table, used to deduplicate webhook deliveries and to run one job per issue at a time"""
+
+    def __init__(self, client: "Client") -> None:
+        self.client: Client = client
+
+    # Raises if the table can't be queried, so that each caller decides whether to fail open or closed
+    @handle_exceptions(raise_on_error=True)
+    def acquire_lock(self, key: str, owner: str, ttl_in_seconds: float) -> bool:
+        """Insert the key, or take it over if it has expired. Both are single statements, so two containers can't both acquire it."""
+        now: datetime = datetime.now(tz=timezone.utc)
+        expires_at: str = (now + timedelta(seconds=ttl_in_seconds)).isoformat()
+        # Loaded with the Supabase client by then
+        from postgrest.exceptions import (  # pylint: disable=import-outside-toplevel
+            APIError,
+        )
+
+        try:
+            self.client.table(table_name="locks").insert(
+                json={"key": key, "owner": owner, "expires_at": expires_at}
+            ).execute()
+            return True
+        except APIError as err:
+            if err.code != UNIQUE_VIOLATION:
+                raise
+        data, _ = (
+            self.client.table(table_name="locks")
+            .update(json={"owner": owner, "expires_at": expires_at})
+            .eq(column="key", value=key)
+            .lt(column="expires_at", value=now.isoformat())
+            .execute()
+        )
+        return len(data[1]) > 0
+
+    @handle_exceptions(default_return_value=None, raise_on_error=False)
+    def release_lock(self, key: str, owner: str) -> None:
+        (
+            self.client.table(table_name="locks")
+            .delete()
+            .eq(column="key", value=key)
+            .eq(column="owner", value=owner)
+            .execute()
+        )
+
+    @handle_exceptions(default_return_value=0, raise_on_error=False)
+    def delete_expired_locks(self) -> int:
+        """Called by the scheduler. Expired rows are only taken over when their key comes back, which deliveries never do, so the rest are deleted here."""
+        data, _ = (
+            self.client.table(table_name="locks")
+            .delete()
+            .lt(column="expires_at", value=datetime.now(tz=timezone.utc).isoformat())
+            .execute()
+        )
+        return len(data[1])
@@ -0,0 +1,89 @@
+# Standard imports
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Iterator
+
+# Third-party imports
+import httpx
+
+# Local imports
+from config import SUPABASE_KEEPALIVE_EXPIRY_IN_SECONDS, SUPABASE_POOL_MAXSIZE
+from utils.spans import Spans, current_spans
+
+# Round trips of the webhook being handled, by "METHOD table". Set by count_round_trips.
+current_round_trips: ContextVar[Spans | None] = ContextVar(
+    "current_round_trips", default=None
+)
+
+
+@contextmanager
+def count_round_trips() -> Iterator[Spans]:
+    """Count the Supabase round trips made in the block, including those made from asyncio.to_thread"""
+    round_trips = Spans()
+    token = current_round_trips.set(round_trips)
+    try:
+        yield round_trips
+    finally:
+        current_round_trips.reset(token)
+
+
+class SupabaseTransport(httpx.BaseTransport):
+    """Pooled HTTP/2 transport to the Supabase REST endpoint that records every round trip and every new connection"""
+
+    def __init__(self) -> None:
+        self._transport = httpx.HTTPTransport(
+            http2=True,
+            limits=httpx.Limits(
+                max_connections=SUPABASE_POOL_MAXSIZE,
+                max_keepalive_connections=SUPABASE_POOL_MAXSIZE,
+                keepalive_expiry=SUPABASE_KEEPALIVE_EXPIRY_IN_SECONDS,
+            ),
+        )
+        self._stats_lock = threading.Lock()
+        self._stats: dict[str, int] = {"round_trips": 0, "connections_opened": 0}
+
+    def get_stats(self) -> dict[str, int]:
+        with self._stats_lock:
+            return dict(self._stats)
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        # e.g. "GET usage" for /rest/v1/usage or "POST rpc/fn" for /rest/v1/rpc/fn
+        name: str = f"{request.method} {request.url.path.split('/rest/v1/', 1)[-1]}"
+        opened: list[int] = [0]
+
+        # https://www.encode.io/httpcore/extensions/#trace
+        def trace(event_name: str, _info: dict[str, Any]) -> None:
+            if event_name == "connection.connect_tcp.complete":
+                opened[0] += 1
+
+        request.extensions["trace"] = trace
+        start: float = time.perf_counter()
+        try:
+            return self._transport.handle_request(request)
+        finally:
+            seconds: float = time.perf_counter() - start
+            with self._stats_lock:
+                self._stats["round_trips"] += 1
+                self._stats["connections_opened"] += opened[0]
+            for spans in (current_spans.get(), current_round_trips.get()):
+                if spans is not None:
+                    spans.add(name=f"supabase:{name}", seconds=seconds)
+
+    def close(self) -> None:
+        self._transport.close()
+
+
+def create_session(session: httpx.Client, transport: SupabaseTransport) -> httpx.Client:
+    """Replace the session of the postgrest client with one on the given transport. The base URL, headers and timeout are kept."""
+    # postgrest follows redirects too, and its session class only adds aclose(), so it's created the same way
+    new_session = type(session)(
+        base_url=session.base_url,
+        headers=session.headers,
+        timeout=session.timeout,
+        follow_redirects=True,
+        transport=transport,
+    )
+    session.close()
+    return new_session
@@ -1,22 +1,25 @@
 import datetime
 import logging
+from typing import TYPE_CHECKING
 
 from config import DEFAULT_TIME, STRIPE_FREE_TIER_PRICE_ID
 from utils.handle_exceptions import handle_exceptions
 
-import stripe
 from services.stripe.customer import (
     get_request_count_from_product_id_metadata,
     get_subscription,
     subscribe_to_free_plan,
 )
-from supabase import Client
+
+if TYPE_CHECKING:
+    import stripe
+    from supabase import Client
 
 
 class UsersManager:
     """Manager for all user related operations"""
 
-    def __init__(self, client: Client) -> None:
+    def __init__(self, client: "Client") -> None:
         self.client: Client = client
 
     @handle_exceptions(default_return_value=None, raise_on_error=False)
@@ -74,7 +77,7 @@ class UsersManager:
     @handle_exceptions(default_return_value=None, raise_on_error=True)
     def parse_subscription_object(
         self,
-        subscription: stripe.ListObject[stripe.Subscription],
+        subscription: "stripe.ListObject[stripe.Subscription]",
         user_id: int,
         installation_id: int,
         customer_id: str,
@@ -1,23 +1,50 @@
 # Standard imports
+import asyncio
+import json
+import logging
 import re
+from contextlib import contextmanager
+from functools import cache, partial
+from typing import Any, Awaitable, Callable, Iterator
+from uuid import uuid4
 
 # Local imports
 from config import (
+    ISSUE_LOCK_TTL_IN_SECONDS,
     ISSUE_NUMBER_FORMAT,
     PR_BODY_STARTS_WITH,
     PRODUCT_ID,
-    SUPABASE_SERVICE_ROLE_KEY,
-    SUPABASE_URL,
+    WEBHOOK_DELIVERY_TTL_IN_SECONDS,
 )
 from utils.handle_exceptions import handle_exceptions
+from utils.job_queue import Job, JobQueue
+from utils.single_flight import SingleFlight
+from utils.ttl_store import LayeredTTLStore, MemoryTTLStore
+
+from services.github.async_github_manager import (
+    create_comment_on_issue_with_gitauto_button,
+)
+from services.github.github_types import (
+    GitHubEventPayload,
+    GitHubInstallationPayload,
+    GitHubLabeledPayload,
+)
+from services.github.token_cache import installation_token_cache
+from services.supabase import get_supabase_manager
+from services.supabase.supabase_client import count_round_trips
+
+
+@cache
+def get_lock_store() -> LayeredTTLStore:
+    """Duplicates hitting the same warm container are turned away before the shared table is queried"""
+    return LayeredTTLStore(stores=[MemoryTTLStore(), get_supabase_manager()])
 
-from services.gitauto_handler import handle_gitauto
-from services.github.github_manager import create_comment_on_issue_with_gitauto_button
-from services.github.github_types import GitHubEventPayload, GitHubInstallationPayload
-from services.supabase import SupabaseManager
 
-# Initialize managers
-supabase_manager = SupabaseManager(url=SUPABASE_URL, key=SUPABASE_SERVICE_ROLE_KEY)
+@cache
+def get_issue_single_flight() -> SingleFlight:
+    return SingleFlight(
+        store=get_lock_store(), ttl_in_seconds=ISSUE_LOCK_TTL_IN_SECONDS
+    )
 
 
 async def handle_installation_created(payload: GitHubInstallationPayload) -> None:
@@ -29,7 +56,8 @@ async def handle_installation_created(payload: GitHubInstallationPayload) -> Non
     user_id: int = payload["sender"]["id"]
     user_name: str = payload["sender"]["login"]
 
-    supabase_manager.create_installation(
+    await asyncio.to_thread(
+        get_supabase_manager().create_installation,
         installation_id=installation_id,
         owner_type=owner_type,
         owner_name=owner_name,
@@ -42,64 +70,164 @@ async def handle_installation_created(payload: GitHubInstallationPayload) -> Non
 async def handle_installation_deleted(payload: GitHubInstallationPayload) -> None:
     """Soft deletes installation record on GitAuto APP installation"""
     installation_id: int = payload["installation"]["id"]
-    supabase_manager.delete_installation(installation_id=installation_id)
+    await asyncio.to_thread(
+        get_supabase_manager().delete_installation, installation_id=installation_id
+    )
+    installation_token_cache.invalidate(key=installation_id)
+
+
+async def handle_gitauto_once(payload: GitHubLabeledPayload, trigger_type: str) -> None:
+    """Run at most one job per issue, so that a label and a checkbox on the same issue don't open two PRs"""
+    repo = payload["repository"]
+    unique_issue_id = f"{repo['owner']['type']}/{repo['owner']['login']}/{repo['name']}#{payload['issue']['number']}"
+
+    async def run() -> None:
+        # Imported on the first PR request, as it loads the OpenAI SDK, which no other event needs
+        # pylint: disable-next=import-outside-toplevel
+        from services.gitauto_handler import handle_gitauto
+
+        await handle_gitauto(payload=payload, trigger_type=trigger_type)
+
+    await get_issue_single_flight().run(key=f"issue:{unique_issue_id}", func=run)
+
+
+@contextmanager
+def log_round_trips(event_name: str) -> Iterator[None]:
+    """Log the Supabase round trips made for each webhook, to see and budget database chatter"""
+    with count_round_trips() as round_trips:
+        try:
+            yield
+        finally:
+            breakdown: dict[str, dict[str, Any]] = round_trips.get_breakdown()
+            count: int = sum(trips["count"] for trips in breakdown.values())
+            print(
+                f"Supabase round trips for {event_name}: {count} {json.dumps(breakdown)}"
+            )
 
 
 @handle_exceptions(default_return_value=None, raise_on_error=True)
-async def handle_webhook_event(event_name: str, payload: GitHubEventPayload) -> None:
-    """Determine the event type and call the appropriate handler"""
+async def handle_webhook_event(
+    event_name: str,
+    payload: GitHubEventPayload,
+    delivery_id: str | None = None,
+    queue: JobQueue | None = None,
+) -> None:
+    """Handle or enqueue each delivery once. https://docs.github.com/en/webhooks/using-webhooks/handling-webhook-deliveries#handling-redeliveries"""
+
+    # Events that trigger no work are neither deduplicated nor queued, so they cost no round trip
+    handler: Callable[[], Awaitable[None]] | None = get_event_handler(
+        event_name=event_name, payload=payload
+    )
+    if handler is None:
+        return
+
+    async def dispatch() -> None:
+        if queue is None:
+            await handler()
+            return
+        job_id: int = await asyncio.to_thread(
+            queue.enqueue,
+            body={"event_name": event_name, "payload": payload},
+        )
+        print(f"Event {event_name} is queued as job {job_id}: {queue.get_depth()}")
+
+    with log_round_trips(event_name=event_name):
+        if not delivery_id:
+            await dispatch()
+            return
+        key: str = f"delivery:{delivery_id}"
+        owner: str = uuid4().hex
+        try:
+            acquired: bool = await asyncio.to_thread(
+                get_lock_store().acquire_lock,
+                key=key,
+                owner=owner,
+                ttl_in_seconds=WEBHOOK_DELIVERY_TTL_IN_SECONDS,
+            )
+        except Exception:  # pylint: disable=broad-except
+            # Fail closed. A delivery handled twice opens duplicate PRs, while a skipped one can be redelivered.
+            logging.error("Delivery %s couldn't be deduplicated. Skipped.", delivery_id)
+            return
+        if not acquired:
+            print(f"Delivery {delivery_id} was already received. Skipped.")
+            return
+        try:
+            await dispatch()
+        except Exception:
+            # Let a redelivery retry an event that failed or couldn't be queued
+            await asyncio.to_thread(get_lock_store().release_lock, key=key, owner=owner)
+            raise
+
+
+async def handle_queued_event(job: Job) -> None:
+    """Worker side of handle_webhook_event. Deliveries were deduplicated when they were queued, so a retried job is handled again."""
+    print(f"Handling job {job.id}, attempt {job.attempts}")
+    with log_round_trips(event_name=job.body["event_name"]):
+        await handle_event(
+            event_name=job.body["event_name"], payload=job.body["payload"]
+        )
+
+
+async def handle_issue_merged(unique_issue_id: str) -> None:
+    await asyncio.to_thread(
+        get_supabase_manager().set_issue_to_merged, unique_issue_id=unique_issue_id
+    )
+
+
+def get_event_handler(
+    event_name: str, payload: GitHubEventPayload
+) -> Callable[[], Awaitable[None]] | None:
+    """Determine the event type and return the handler to call, or None if the event doesn't trigger any work"""
     action: str = payload.get("action")
     if not action:
-        return
+        return None
     # Check the type of webhook event and handle accordingly
     # See https://docs.github.com/en/apps/github-marketplace/using-the-github-marketplace-api-in-your-app/handling-new-purchases-and-free-trials
     # See https://docs.github.com/en/webhooks/webhook-events-and-payloads?actionType=purchased#marketplace_purchase
     # if event_name == "marketplace_purchase" and action in ("purchased"):
     #     print("Marketplace purchase is triggered")
-    #     await handle_installation_created(payload=payload)
+    #     return partial(handle_installation_created, payload=payload)
 
     if event_name == "installation" and action in ("created"):
         print("Installation is created")
-        await handle_installation_created(payload=payload)
+        return partial(handle_installation_created, payload=payload)
 
-    elif event_name == "installation" and action in ("deleted"):
+    if event_name == "installation" and action in ("deleted"):
         print("Installation is deleted")
-        await handle_installation_deleted(payload=payload)
+        return partial(handle_installation_deleted, payload=payload)
 
-    elif event_name == "issues":
-        if action == "labeled":
+    if event_name == "issues":
+        if action == "labeled" and payload["label"]["name"] == PRODUCT_ID:
             print("Issue is labeled")
-            await handle_gitauto(payload=payload, trigger_type="label")
-        elif action == "opened":
-            create_comment_on_issue_with_gitauto_button(payload=payload)
+            return partial(handle_gitauto_once, payload=payload, trigger_type="label")
+        if action == "opened":
+            return partial(create_comment_on_issue_with_gitauto_button, payload=payload)
 
     # Run agent on proper environment
     elif event_name == "issue_comment" and action == "edited":
-        issue_handled = False
-
         search_text = "- [x] Generate PR"
         if PRODUCT_ID != "gitauto":
             search_text += " - " + PRODUCT_ID
             if payload["comment"]["body"].find(search_text) != -1:
-                issue_handled = True
                 print("Triggered GitAuto PR")
-                await handle_gitauto(payload=payload, trigger_type="comment")
+                return partial(
+                    handle_gitauto_once, payload=payload, trigger_type="comment"
+                )
         else:
             if (
                 payload["comment"]["body"].find(search_text) != -1
                 and payload["comment"]["body"].find(search_text + " - ") == -1
             ):
-                issue_handled = True
                 print("Triggered GitAuto PR")
-
-                await handle_gitauto(payload=payload, trigger_type="comment")
-        if not issue_handled:
-            print("Edit is not an activated GitAtuo trigger.")
+                return partial(
+                    handle_gitauto_once, payload=payload, trigger_type="comment"
+                )
+        print("Edit is not an activated GitAtuo trigger.")
 
     elif event_name == "pull_request" and action == "closed":
         pull_request = payload.get("pull_request")
         if not pull_request:
-            return
+            return None
 
         # Check PR is merged and this is correct GitAuto environment
         if pull_request["merged_at"] is not None and pull_request["head"][
@@ -108,14 +236,23 @@ async def handle_webhook_event(event_name: str, payload: GitHubEventPayload) ->
             # Create unique_issue_id to update merged status
             body = pull_request["body"]
             if not body.startswith(PR_BODY_STARTS_WITH):
-                return
+                return None
             pattern = re.compile(r"/issues/(\d+)")
             match = re.search(pattern, body)
             if not match:
-                return
+                return None
             issue_number = match.group(1)
             owner_type = payload["repository"]["owner"]["type"]
             unique_issue_id = f"{owner_type}/{payload['repository']['owner']['login']}/{payload['repository']['name']}#{issue_number}"
-            supabase_manager.set_issue_to_merged(unique_issue_id=unique_issue_id)
+            return partial(handle_issue_merged, unique_issue_id=unique_issue_id)
 
     print(f"Event {event_name} with action {action} is not handled")
+    return None
+
+
+async def handle_event(event_name: str, payload: GitHubEventPayload) -> None:
+    handler: Callable[[], Awaitable[None]] | None = get_event_handler(
+        event_name=event_name, payload=payload
+    )
+    if handler is not None:
+        await handler()
@@ -0,0 +1,2 @@
+-- Breakdown of total_seconds by stage, assistant run and tool call, written by complete_and_update_usage_record
+alter table public.usage add column if not exists spans jsonb;
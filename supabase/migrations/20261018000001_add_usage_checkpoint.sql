@@ -0,0 +1,7 @@
+-- Results of the finished stages and agent steps of a run, so that a retry resumes it (save_checkpoint / get_checkpoint)
+alter table public.usage add column if not exists checkpoint jsonb;
+
+-- get_checkpoint looks up the latest unfinished run of an issue
+create index if not exists usage_unfinished_checkpoint_idx
+    on public.usage (unique_issue_id, id desc)
+    where is_completed = false and checkpoint is not null;
@@ -0,0 +1,13 @@
+-- Keys held across Lambda containers until released or expired (LocksManager):
+-- "delivery:<X-GitHub-Delivery>" deduplicates webhook deliveries, "issue:<unique_issue_id>" runs one job per issue at a time
+create table if not exists public.locks (
+    key text primary key,
+    owner text not null,
+    expires_at timestamptz not null
+);
+
+-- delete_expired_locks, called by the scheduler
+create index if not exists locks_expires_at_idx on public.locks (expires_at);
+
+-- Only the service role, which bypasses RLS, reads and writes locks
+alter table public.locks enable row level security;
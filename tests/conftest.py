@@ -0,0 +1,70 @@
+# Standard imports
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Iterator
+
+# Third-party imports
+import pytest
+
+# Local imports
+from services.github import async_github_manager, github_client, github_manager
+from services.github.rate_limiter import RateLimiter
+
+# Gets the request and its raw body, returns the status, the body and optionally headers.
+# The body is sent as is if it's bytes, as JSON otherwise.
+Respond = Callable[[BaseHTTPRequestHandler, bytes], tuple[Any, ...]]
+
+
+def create_handler(respond: Respond) -> type[BaseHTTPRequestHandler]:
+    class FakeHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # Keep-alive is only supported from HTTP/1.1
+
+        def _respond(self) -> None:
+            body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+            status, data, *headers = respond(self, body)
+            headers = dict(headers[0]) if headers else {}
+            if not isinstance(data, bytes):
+                data = json.dumps(data).encode()
+                headers.setdefault("Content-Type", "application/json")
+            try:
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+            except BrokenPipeError:
+                pass  # The client stopped waiting, e.g. a test ending at the first LLM call
+
+        do_DELETE = do_GET = do_PATCH = do_POST = do_PUT = _respond  # noqa: N815
+
+        def log_message(self, *_args) -> None:
+            return
+
+    return FakeHandler
+
+
+@pytest.fixture(name="fake_server")
+def fixture_fake_server(request: pytest.FixtureRequest) -> Iterator[str]:
+    """Base URL of a local server answering with request.param, e.g. @pytest.mark.parametrize("fake_server", [respond], indirect=True)"""
+    server = ThreadingHTTPServer(
+        ("127.0.0.1", 0), create_handler(respond=request.param)
+    )
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture(name="github_api_url")
+def fixture_github_api_url(fake_server: str, monkeypatch: pytest.MonkeyPatch) -> str:
+    """fake_server as the GitHub API, without pacing mutative requests"""
+    monkeypatch.setattr(github_manager, "GITHUB_API_URL", fake_server)
+    monkeypatch.setattr(async_github_manager, "GITHUB_API_URL", fake_server)
+    monkeypatch.setattr(
+        github_client,
+        "rate_limiter",
+        RateLimiter(mutative_requests_per_second=1000, mutative_burst=1000),
+    )
+    return fake_server
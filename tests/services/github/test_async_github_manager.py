@@ -0,0 +1,63 @@
+# Benchmark: run this file locally with: python -m pytest -s tests/services/github/test_async_github_manager.py
+# Standard imports
+import asyncio
+import time
+
+# Third-party imports
+import pytest
+
+# Local imports
+from services.github import async_github_manager, github_manager
+
+CONCURRENT_WEBHOOKS = 5
+SERVER_LATENCY_IN_SECONDS = 0.1
+
+
+def respond(request, _body) -> tuple:
+    """Answers every request after a fixed delay, like a distant api.github.com"""
+    time.sleep(SERVER_LATENCY_IN_SECONDS)
+    return 200, {"url": f"http://{request.headers['Host']}{request.path}"}
+
+
+async def blocking_webhook(issue_number: int) -> None:
+    """Before: an async handler calling the blocking github_manager functions"""
+    comment_url = github_manager.create_comment(
+        owner="o", repo="r", issue_number=issue_number, body="0%", token="t"
+    )
+    github_manager.update_comment(comment_url=comment_url, body="50%", token="t")
+    github_manager.update_comment(comment_url=comment_url, body="100%", token="t")
+
+
+async def async_webhook(issue_number: int) -> None:
+    """After: the same handler awaiting async_github_manager functions"""
+    comment_url = await async_github_manager.create_comment(
+        owner="o", repo="r", issue_number=issue_number, body="0%", token="t"
+    )
+    await async_github_manager.update_comment(
+        comment_url=comment_url, body="50%", token="t"
+    )
+    await async_github_manager.update_comment(
+        comment_url=comment_url, body="100%", token="t"
+    )
+
+
+def measure_throughput(webhook) -> float:
+    """Webhooks completed per second when CONCURRENT_WEBHOOKS are delivered at once"""
+
+    async def deliver_all() -> None:
+        await asyncio.gather(*(webhook(n) for n in range(CONCURRENT_WEBHOOKS)))
+
+    start = time.perf_counter()
+    asyncio.run(deliver_all())
+    return CONCURRENT_WEBHOOKS / (time.perf_counter() - start)
+
+
+@pytest.mark.parametrize("fake_server", [respond], indirect=True)
+def test_async_github_manager_overlaps_concurrent_webhooks(github_api_url: str) -> None:
+    assert github_api_url
+    before = measure_throughput(blocking_webhook)
+    after = measure_throughput(async_webhook)
+    print(f"\nWebhook throughput: before {before:.1f}/s, after {after:.1f}/s")
+
+    # Blocking calls serialize every webhook, awaited calls let them overlap
+    assert after > before * 2
@@ -0,0 +1,35 @@
+# Standard imports
+import subprocess
+
+# Local imports
+from services.github.blob_cache import BlobCache
+
+
+def test_blob_sha_matches_git(tmp_path):
+    path = tmp_path / "hello.txt"
+    path.write_bytes(b"hello\n")
+    git_sha = subprocess.run(
+        ["git", "hash-object", str(path)], capture_output=True, check=True, text=True
+    ).stdout.strip()
+    assert BlobCache.get_blob_sha(content=b"hello\n") == git_sha
+
+
+def test_blob_cache_tiers_and_eviction(tmp_path):
+    cache = BlobCache(disk_dir=str(tmp_path), disk_max_bytes=20, memory_max_bytes=10)
+    sha_a = cache.put(content=b"a" * 8)
+    assert cache.get(sha=sha_a) == b"a" * 8  # From memory
+    sha_b = cache.put(content=b"b" * 8)  # Evicts "a" from memory only
+    assert cache.get(sha=sha_a) == b"a" * 8  # From disk
+    assert cache.get(sha="0" * 40) is None
+    cache.put(content=b"c" * 8)  # Evicts "b" from disk, the least recently used
+    stats = cache.get_stats()
+    assert (stats["memory_hits"], stats["disk_hits"], stats["misses"]) == (1, 1, 1)
+    assert stats["bytes_served"] == 16
+    assert stats["disk_bytes"] == 16
+
+    # A new process picks up the blobs left on disk
+    restarted = BlobCache(
+        disk_dir=str(tmp_path), disk_max_bytes=20, memory_max_bytes=10
+    )
+    assert restarted.get(sha=sha_a) == b"a" * 8
+    assert restarted.get(sha=sha_b) is None
@@ -0,0 +1,101 @@
+# Standard imports
+import json
+
+# Third-party imports
+import pytest
+
+# Local imports
+from services.github import github_manager
+from services.github.blob_cache import BlobCache
+from services.github.github_manager import commit_multiple_changes_to_remote_branch
+
+ORIGINALS = {"src/a.py": "a = 1\n", "src/b.py": "b = 1\n"}
+BLOBS = {BlobCache.get_blob_sha(content=c.encode()): c for c in ORIGINALS.values()}
+
+
+REQUESTS: list[tuple[str, str, dict]] = []
+
+
+def respond(request, body: bytes) -> tuple:
+    """Just enough of the blobs, refs, trees and commits endpoints"""
+    data = json.loads(body) if body else {}
+    REQUESTS.append((request.command, request.path, data))
+    path = request.path.split("?")[0]
+    if "/git/ref/heads/" in path:
+        return 404, {"message": "Not Found"}
+    if "/git/trees/" in path:
+        tree = [
+            {
+                "path": p,
+                "mode": "100755",
+                "type": "blob",
+                "sha": BlobCache.get_blob_sha(content=c.encode()),
+            }
+            for p, c in ORIGINALS.items()
+        ]
+        return 200, {"sha": "base-tree", "tree": tree, "truncated": False}
+    if "/git/blobs/" in path:
+        return 200, BLOBS[path.split("/git/blobs/")[1]].encode()  # Raw media type
+    if path.endswith("/git/trees"):
+        return 201, {"sha": "new-tree"}
+    if path.endswith("/git/commits"):
+        return 201, {"sha": "new-commit"}
+    return 201, {"ref": data["ref"]}
+
+
+@pytest.fixture(name="fake_github")
+def fixture_fake_github(
+    github_api_url: str, monkeypatch: pytest.MonkeyPatch, tmp_path
+) -> list[tuple[str, str, dict]]:
+    assert github_api_url
+    REQUESTS.clear()
+    monkeypatch.setattr(github_manager, "blob_cache", BlobCache(disk_dir=str(tmp_path)))
+    return REQUESTS
+
+
+@pytest.mark.parametrize("fake_server", [respond], indirect=True)
+def test_commit_multiple_changes_creates_one_commit(fake_github) -> None:
+    diffs = [
+        "--- src/a.py\n+++ src/a.py\n@@ -1,1 +1,1 @@\n-a = 1\n+a = 2\n",
+        "--- src/b.py\n+++ src/b.py\n@@ -1,1 +1,1 @@\n-b = 1\n+b = 2\n",
+        "--- /dev/null\n+++ src/c.py\n@@ -0,0 +1,1 @@\n+c = 1\n",
+    ]
+    commit_sha = commit_multiple_changes_to_remote_branch(
+        diffs=diffs,
+        new_branch="gitauto/issue-#1",
+        owner="owner",
+        repo="repo",
+        token="token",
+        base_sha="base-commit",
+    )
+    posts = {
+        path.rsplit("/", 1)[-1]: body
+        for method, path, body in fake_github
+        if method == "POST"
+    }
+    assert posts["trees"]["base_tree"] == "base-tree"
+    assert [(item["path"], item["mode"]) for item in posts["trees"]["tree"]] == [
+        ("src/a.py", "100755"),
+        ("src/b.py", "100755"),
+        ("src/c.py", "100644"),
+    ]
+    assert posts["trees"]["tree"][0]["content"] == "a = 2\n"
+    assert posts["commits"]["parents"] == ["base-commit"]
+    assert posts["refs"] == {"ref": "refs/heads/gitauto/issue-#1", "sha": "new-commit"}
+    assert commit_sha == "new-commit"
+
+    # 1 ref lookup + 1 tree + 2 original blobs (src/c.py is new) + tree, commit and ref creation
+    assert len(fake_github) == 7
+
+    # The original blobs are served from the blob cache the second time
+    fake_github.clear()
+    commit_multiple_changes_to_remote_branch(
+        diffs=diffs,
+        new_branch="gitauto/issue-#2",
+        owner="owner",
+        repo="repo",
+        token="token",
+        base_sha="base-commit",
+    )
+    assert not [path for _, path, _ in fake_github if "/git/blobs/" in path]
+    assert len(fake_github) == 5
@@ -0,0 +1,86 @@
+# Standard imports
+import asyncio
+
+# Local imports
+from services.github import async_github_manager
+from services.github.file_tree import FileEntry, PathTrie, get_file_entry, index_tree
+from services.github.github_manager import get_remote_file_content
+
+TREE = [
+    {"path": "src", "mode": "040000", "type": "tree", "sha": "t1"},
+    {"path": "src/main.py", "mode": "100644", "type": "blob", "sha": "b1", "size": 12},
+    {"path": "data/dump.sql", "mode": "100644", "type": "blob", "sha": "b2", "size": 10**9},
+    {"path": "assets/font.woff2", "mode": "100644", "type": "blob", "sha": "b3", "size": 900},
+    {"path": "libs/sub", "mode": "160000", "type": "commit", "sha": "c1"},
+    {"path": "package-lock.json", "mode": "100644", "type": "blob", "sha": "b4", "size": 9},
+    {"path": "web/node_modules/react/index.js", "mode": "100644", "type": "blob", "sha": "b5", "size": 9},
+]  # fmt: skip
+
+
+def test_index_tree_keeps_sha_size_and_mode() -> None:
+    paths = index_tree(owner="o", repo="r", ref="main", tree=TREE)
+    assert paths == ["src/main.py", "data/dump.sql", "libs/sub"]
+    entry = get_file_entry(owner="o", repo="r", ref="main", file_path="src/main.py")
+    assert entry == FileEntry(sha="b1", size=12, mode="100644")
+    assert get_file_entry(owner="o", repo="r", ref="main", file_path="src") is None
+    assert (
+        get_file_entry(owner="o", repo="r", ref="dev", file_path="src/main.py") is None
+    )
+    vendored = "web/node_modules/react/index.js"
+    assert get_file_entry(owner="o", repo="r", ref="main", file_path=vendored) is None
+
+
+def test_path_trie() -> None:
+    trie = PathTrie()
+    for path in ["a/b/c.py", "a/d.py", "e.py", "a/b/f.py"]:
+        trie.add(path=path, entry=FileEntry(sha=path, size=1, mode="100644"))
+    assert list(trie) == ["a/b/c.py", "a/b/f.py", "a/d.py", "e.py"]
+    assert len(trie) == 4
+    assert "a/d.py" in trie and "a/b" not in trie and "a/d.py/x" not in trie
+
+
+def test_get_remote_file_content_refuses_before_downloading() -> None:
+    """Oversized, binary and submodule entries are answered without any request"""
+    index_tree(owner="o", repo="r", ref="main", tree=TREE)
+    kwargs = {"owner": "o", "repo": "r", "ref": "main", "token": "t"}
+    assert "too large" in get_remote_file_content(file_path="data/dump.sql", **kwargs)
+    assert "binary" in get_remote_file_content(file_path="assets/font.woff2", **kwargs)
+    assert "submodule" in get_remote_file_content(file_path="libs/sub", **kwargs)
+
+
+def test_get_remote_file_tree_walks_truncated_trees(monkeypatch) -> None:
+    def blob(path: str) -> dict:
+        return {"path": path, "mode": "100644", "type": "blob", "sha": path}
+
+    def subtree(path: str) -> dict:
+        return {"path": path, "mode": "040000", "type": "tree", "sha": path}
+
+    trees = {
+        ("root", True): {"truncated": True, "tree": [blob("partial.py")]},
+        ("root", False): {
+            "truncated": False,
+            "tree": [blob("README.md"), subtree("app"), subtree("vendor")],
+        },
+        ("app", True): {"truncated": True, "tree": []},
+        ("app", False): {"truncated": False, "tree": [subtree("api"), subtree("ui")]},
+        ("api", True): {"truncated": False, "tree": [blob("main.py")]},
+        ("ui", True): {
+            "truncated": False,
+            "tree": [subtree("src"), blob("src/App.tsx")],
+        },
+    }
+    requested = []
+
+    async def fake_get_tree(owner, repo, tree_sha, token, recursive=True):
+        requested.append((owner, repo, tree_sha, token, recursive))
+        return trees[(tree_sha, recursive)]
+
+    monkeypatch.setattr(async_github_manager, "get_tree", fake_get_tree)
+    paths = asyncio.run(
+        async_github_manager.get_remote_file_tree(
+            owner="o", repo="r", ref="main", comment_url="", token="t", tree_sha="root"
+        )
+    )
+    assert paths == ["README.md", "app/api/main.py", "app/ui/src/App.tsx"]
+    assert ("o", "r", "vendor", "t", True) not in requested
+    assert get_file_entry(owner="o", repo="r", ref="main", file_path="app/api/main.py")
@@ -0,0 +1,22 @@
+# Third-party imports
+import pytest
+
+# Local imports
+from services.github.github_client import GitHubClient
+
+
+def respond(_request, _body) -> tuple:
+    return 200, {"ok": True}
+
+
+@pytest.mark.parametrize("fake_server", [respond], indirect=True)
+def test_github_client_reuses_connections(fake_server: str) -> None:
+    """Only the first call should open a connection, the rest should reuse it"""
+    client = GitHubClient(pool_maxsize=2, connect_timeout=1, read_timeout=5)
+    for _ in range(5):
+        response = client.get(url=f"{fake_server}/")
+        assert response.json() == {"ok": True}
+    stats = client.get_stats()
+    assert stats["requests"] == 5
+    assert stats["connections_opened"] == 1
+    assert stats["connections_reused"] == 4
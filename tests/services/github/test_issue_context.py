@@ -0,0 +1,84 @@
+# Standard imports
+import asyncio
+import json
+
+# Third-party imports
+import pytest
+
+# Local imports
+from config import GITHUB_APP_ID
+from services.github.async_github_manager import get_issue_context
+
+
+def _page(cursor: str | None) -> dict:
+    """Two pages of comments: from another app, from GitAuto apps, one a user posted through GitAuto, then a human one"""
+    if cursor is None:
+        nodes = [
+            {"body": "other app", "performedViaGithubApp": {"databaseId": 12345}},
+            {"body": "gitauto", "performedViaGithubApp": {"databaseId": GITHUB_APP_ID}},
+            {
+                "body": "gitauto production",
+                "performedViaGithubApp": {"databaseId": 844909},
+            },
+            {
+                "body": "user via gitauto",
+                "performedViaGithubApp": {"databaseId": 901480},
+            },
+        ]
+        page_info = {"hasNextPage": True, "endCursor": "page-2"}
+    else:
+        nodes = [{"body": "human", "performedViaGithubApp": None}]
+        page_info = {"hasNextPage": False, "endCursor": None}
+    branch = {"name": "main", "target": {"oid": "head", "tree": {"oid": "tree"}}}
+    return {
+        "data": {
+            "repository": {
+                "defaultBranchRef": branch,
+                "issue": {"comments": {"pageInfo": page_info, "nodes": nodes}},
+            }
+        }
+    }
+
+
+QUERIES: list[dict] = []
+ERRORS: list[dict] = []
+
+
+def respond(_request, body: bytes) -> tuple:
+    query = json.loads(body)
+    QUERIES.append(query)
+    if ERRORS:
+        return 200, {"errors": ERRORS}
+    return 200, _page(cursor=query["variables"]["cursor"])
+
+
+@pytest.fixture(name="fake_graphql")
+def fixture_fake_graphql(github_api_url: str) -> list[dict]:
+    assert github_api_url
+    QUERIES.clear()
+    ERRORS.clear()
+    return QUERIES
+
+
+@pytest.mark.parametrize("fake_server", [respond], indirect=True)
+def test_get_issue_context_pages_comments(fake_graphql) -> None:
+    context = asyncio.run(
+        get_issue_context(owner="o", repo="r", issue_number=1, token="t")
+    )
+    assert context == {
+        "comments": ["other app"],
+        "default_branch": "main",
+        "head_sha": "head",
+        "tree_sha": "tree",
+    }
+    assert [q["variables"]["cursor"] for q in fake_graphql] == [None, "page-2"]
+
+
+@pytest.mark.parametrize("fake_server", [respond], indirect=True)
+@pytest.mark.usefixtures("fake_graphql")
+def test_get_issue_context_returns_none_on_errors() -> None:
+    ERRORS.append({"message": "Something went wrong"})
+    context = asyncio.run(
+        get_issue_context(owner="o", repo="r", issue_number=1, token="t")
+    )
+    assert context is None
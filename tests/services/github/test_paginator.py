@@ -0,0 +1,88 @@
+# Standard imports
+import asyncio
+import time
+from itertools import islice
+from urllib.parse import parse_qs, urlparse
+
+# Third-party imports
+import pytest
+
+# Local imports
+from services.github.paginator import paginate, paginate_async
+
+LAST_PAGE = 6
+PER_PAGE = 3
+SERVER_LATENCY_IN_SECONDS = 0.1
+
+
+PAGES: list[int] = []
+
+
+def respond(request, _body) -> tuple:
+    """A list endpoint of LAST_PAGE * PER_PAGE numbered items"""
+    query = parse_qs(urlparse(request.path).query)
+    page, per_page = int(query["page"][0]), int(query["per_page"][0])
+    PAGES.append(page)
+    time.sleep(SERVER_LATENCY_IN_SECONDS)
+    start = (page - 1) * per_page
+    base = f"http://{request.headers['Host']}/items?per_page={per_page}"
+    link = (
+        f'<{base}&page={page + 1}>; rel="next", <{base}&page={LAST_PAGE}>; rel="last"'
+    )
+    return 200, {"items": list(range(start, start + per_page))}, {"Link": link}
+
+
+@pytest.fixture(name="list_url")
+def fixture_list_url(fake_server: str) -> str:
+    PAGES.clear()
+    return f"{fake_server}/items"
+
+
+@pytest.mark.parametrize("fake_server", [respond], indirect=True)
+def test_paginate_fetches_remaining_pages_concurrently(list_url) -> None:
+    start = time.perf_counter()
+    items = list(
+        paginate(
+            url=list_url,
+            headers={},
+            items_key="items",
+            per_page=PER_PAGE,
+            use_etag_cache=False,
+        )
+    )
+    elapsed = time.perf_counter() - start
+    assert items == list(range(LAST_PAGE * PER_PAGE))
+    # The first page, then the other 5 at once instead of one after another
+    assert elapsed < SERVER_LATENCY_IN_SECONDS * 4
+
+
+@pytest.mark.parametrize("fake_server", [respond], indirect=True)
+def test_paginate_stops_early(list_url) -> None:
+    items = paginate(
+        url=list_url,
+        headers={},
+        items_key="items",
+        per_page=PER_PAGE,
+        max_workers=2,
+        use_etag_cache=False,
+    )
+    assert list(islice(items, 4)) == [0, 1, 2, 3]
+    items.close()
+    assert max(PAGES) <= 3  # Page 3 may still be in flight
+
+
+@pytest.mark.parametrize("fake_server", [respond], indirect=True)
+def test_paginate_async(list_url) -> None:
+    async def collect() -> list[int]:
+        return [
+            item
+            async for item in paginate_async(
+                url=list_url,
+                headers={},
+                items_key="items",
+                per_page=PER_PAGE,
+                use_etag_cache=False,
+            )
+        ]
+
+    assert asyncio.run(collect()) == list(range(LAST_PAGE * PER_PAGE))
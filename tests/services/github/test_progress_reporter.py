@@ -0,0 +1,52 @@
+# Standard imports
+import threading
+import time
+
+# Local imports
+from services.github import progress_reporter
+from services.github.progress_reporter import ProgressReporter
+
+
+def test_progress_updates_are_coalesced_and_flushed_on_close(monkeypatch):
+    sent: list[str] = []
+    release = threading.Event()
+
+    def slow_update_comment(comment_url: str, body: str, token: str):
+        release.wait(timeout=5)
+        sent.append(body)
+
+    monkeypatch.setattr(progress_reporter, "update_comment", slow_update_comment)
+    reporter = ProgressReporter(
+        comment_url="https://example.com/comment",
+        token="token",
+        debounce_in_seconds=0.05,
+    )
+
+    # Updates never wait for the PATCH, even while one is in flight
+    start = time.perf_counter()
+    for percent in range(10, 60, 10):
+        reporter.update_progress(percent=percent, message=f"{percent}%")
+    reporter.update_progress(percent=30, message="Reading a.py")
+    assert time.perf_counter() - start < 0.05
+
+    time.sleep(0.1)  # The first PATCH is in flight
+    reporter.update(body="Done")
+    release.set()
+    reporter.close()
+
+    # Only the latest body of each debounce window is sent and the last one always is
+    assert sent[-1] == "Done"
+    assert len(sent) <= 2
+    assert reporter.percent == 50
+    assert reporter.get_stats() == {"updates": 7, "sent": len(sent)}
+
+
+def test_progress_reporter_without_updates_sends_nothing(monkeypatch):
+    monkeypatch.setattr(
+        progress_reporter,
+        "update_comment",
+        lambda **kwargs: (_ for _ in ()).throw(AssertionError("Unexpected PATCH")),
+    )
+    reporter = ProgressReporter(comment_url="https://example.com/comment", token="t")
+    reporter.close()
+    assert reporter.get_stats() == {"updates": 0, "sent": 0}
@@ -0,0 +1,66 @@
+# Standard imports
+import time
+
+# Third-party imports
+from requests.structures import CaseInsensitiveDict
+
+# Local imports
+from services.github.rate_limiter import RateLimiter
+
+
+def test_record_keeps_budget_per_scope_and_resource() -> None:
+    limiter = RateLimiter()
+    reset = int(time.time()) + 600
+    limiter.record(
+        scope="installation:1",
+        headers=CaseInsensitiveDict(
+            {
+                "x-ratelimit-limit": "5000",
+                "x-ratelimit-remaining": "500",
+                "x-ratelimit-reset": str(reset),
+                "x-ratelimit-used": "4500",
+                "x-ratelimit-resource": "core",
+            }
+        ),
+    )
+    limiter.record(scope="installation:1", headers={"Content-Type": "text/plain"})
+    budget = limiter.get_budget(scope="installation:1")
+    assert budget is not None
+    assert (budget.remaining, budget.used, budget.reset) == (500, 4500, reset)
+    assert budget.get_remaining_ratio() == 0.1
+    assert limiter.get_budget(scope="installation:2") is None
+    assert limiter.get_budget(scope="installation:1", resource="graphql") is None
+
+
+def test_reserve_paces_mutative_requests_per_scope() -> None:
+    limiter = RateLimiter(mutative_requests_per_second=2, mutative_burst=2)
+    assert limiter.reserve(scope="a", method="GET") == 0
+    waits = [limiter.reserve(scope="a", method="POST") for _ in range(4)]
+    assert waits[:2] == [0, 0]  # The burst
+    assert 0.4 < waits[2] <= 0.5 and 0.9 < waits[3] <= 1.0  # Then 2 per second
+    assert limiter.reserve(scope="b", method="PATCH") == 0
+
+
+def test_reserve_paces_graphql_mutations_but_not_queries() -> None:
+    limiter = RateLimiter(mutative_requests_per_second=1, mutative_burst=1)
+    url = "https://api.github.com/graphql"
+    for _ in range(3):
+        query = {"query": "query($owner: String!) { repository { id } }"}
+        assert limiter.reserve(scope="a", method="POST", url=url, json_body=query) == 0
+    mutation = {"query": " mutation { addComment(input: {}) { clientMutationId } }"}
+    assert limiter.reserve(scope="a", method="POST", url=url, json_body=mutation) == 0
+    assert limiter.reserve(scope="a", method="POST", url=url, json_body=mutation) > 0
+
+
+def test_least_recently_used_scopes_are_dropped() -> None:
+    limiter = RateLimiter(
+        mutative_requests_per_second=1, mutative_burst=1, max_scopes=2
+    )
+    headers = {"X-RateLimit-Remaining": "10", "X-RateLimit-Limit": "100"}
+    for scope in ("a", "b", "c"):
+        limiter.record(scope=scope, headers=headers)
+        limiter.reserve(scope=scope, method="POST")
+    assert limiter.get_budget(scope="a") is None
+    assert limiter.get_budget(scope="c") is not None
+    assert limiter.reserve(scope="a", method="POST") == 0  # A new bucket
+    assert limiter.reserve(scope="c", method="POST") > 0
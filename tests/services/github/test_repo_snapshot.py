@@ -0,0 +1,86 @@
+# Standard imports
+import io
+import os
+import tarfile
+import tempfile
+
+# Third-party imports
+import pytest
+import requests
+
+# Local imports
+from services.github import github_manager
+from services.github.repo_snapshot import (
+    RepoSnapshot,
+    acquire_snapshot,
+    get_snapshot,
+    register_snapshot,
+    release_snapshot,
+)
+
+
+def _add_file(tar: tarfile.TarFile, name: str, content: bytes) -> None:
+    info = tarfile.TarInfo(name=name)
+    info.size = len(content)
+    tar.addfile(tarinfo=info, fileobj=io.BytesIO(initial_bytes=content))
+
+
+def test_repo_snapshot_reads_files_by_path(tmp_path):
+    tar_path = str(tmp_path / "snapshot.tar")
+    with tarfile.open(name=tar_path, mode="w") as tar:
+        tar.addfile(tarinfo=tarfile.TarInfo(name="owner-repo-abc123/"))
+        _add_file(tar=tar, name="owner-repo-abc123/README.md", content=b"# Hello\n")
+        _add_file(tar=tar, name="owner-repo-abc123/src/main.py", content=b"x = 1\n")
+        link = tarfile.TarInfo(name="owner-repo-abc123/link.py")
+        link.type = tarfile.SYMTYPE
+        link.linkname = "src/main.py"
+        tar.addfile(tarinfo=link)
+
+    snapshot = RepoSnapshot(tar_path=tar_path)
+    assert snapshot.read(file_path="src/main.py") == b"x = 1\n"
+    assert snapshot.get_size(file_path="README.md") == 8
+    assert "link.py" in snapshot.paths
+    assert snapshot.read(file_path="link.py") is None
+    assert snapshot.read(file_path="missing.py") is None
+
+    register_snapshot(
+        owner="owner", repo="repo", refs=["main", "abc123"], snapshot=snapshot
+    )
+    assert get_snapshot(owner="owner", repo="repo", ref="main") is snapshot
+
+    # A concurrent run of the same commit shares it, and the first to finish doesn't close it
+    assert acquire_snapshot(owner="owner", repo="repo", ref="abc123") is snapshot
+    release_snapshot(snapshot=snapshot)
+    assert snapshot.read(file_path="src/main.py") == b"x = 1\n"
+    release_snapshot(snapshot=snapshot)
+    assert get_snapshot(owner="owner", repo="repo", ref="abc123") is None
+    assert acquire_snapshot(owner="owner", repo="repo", ref="abc123") is None
+    assert not os.path.exists(tar_path)
+    # A read racing with the release falls back to GitHub
+    assert snapshot.read(file_path="src/main.py") is None
+
+
+def test_failed_download_closes_and_removes_the_tarball(tmp_path, monkeypatch):
+    fds: list[int] = []
+    original_mkstemp = tempfile.mkstemp
+
+    def mkstemp(**kwargs):
+        fd, path = original_mkstemp(**kwargs)
+        fds.append(fd)
+        return fd, path
+
+    def get(**_kwargs):
+        raise requests.exceptions.ConnectionError("connection reset")
+
+    monkeypatch.setattr(github_manager, "REPO_SNAPSHOT_DIR", str(tmp_path))
+    monkeypatch.setattr(tempfile, "mkstemp", mkstemp)
+    monkeypatch.setattr(github_manager.github_client, "get", get)
+
+    snapshot = github_manager.download_repo_snapshot(
+        owner="owner", repo="repo", ref="main", token="t"
+    )
+    assert snapshot is None
+    assert len(fds) == 1
+    with pytest.raises(OSError):
+        os.fstat(fds[0])
+    assert not os.listdir(tmp_path)
@@ -0,0 +1,68 @@
+# Standard imports
+import asyncio
+import json
+
+# Third-party imports
+import pytest
+
+# Local imports
+from services.github.github_client import AsyncGitHubClient, GitHubClient
+from services.github.response_cache import ResponseCache, response_cache
+
+BODY = json.dumps({"tree": [{"path": "README.md"}]}).encode()
+ETAG = '"abc123"'
+
+
+def respond(request, _body) -> tuple:
+    if request.headers.get("If-None-Match") == ETAG:
+        return 304, b"", {"ETag": ETAG, "X-RateLimit-Remaining": "4999"}
+    return (
+        200,
+        BODY,
+        {
+            "Content-Type": "application/json",
+            "ETag": ETAG,
+            "X-RateLimit-Remaining": "5000",
+        },
+    )
+
+
+@pytest.mark.parametrize("fake_server", [respond], indirect=True)
+def test_not_modified_responses_are_served_from_cache(fake_server: str) -> None:
+    url = f"{fake_server}/git/trees/main"
+    headers = {"Authorization": "Bearer test-response-cache"}
+    client = GitHubClient()
+    first = client.get(url=url, headers=headers, use_etag_cache=True)
+    second = client.get(url=url, headers=headers, use_etag_cache=True)
+    assert first.json() == second.json() == {"tree": [{"path": "README.md"}]}
+    assert second.status_code == 200
+    assert second.headers["X-RateLimit-Remaining"] == "4999"
+
+    async def get_async():
+        return await AsyncGitHubClient().get(
+            url=url, headers=headers, use_etag_cache=True
+        )
+
+    third = asyncio.run(get_async())
+    assert third.json() is second.json()  # Decoded once and reused
+    assert third.headers["X-RateLimit-Remaining"] == "4999"
+    key = ResponseCache.create_key(url=url, headers=headers)
+    assert response_cache.get(key=key) is not None
+
+
+def test_response_cache_evicts_least_recently_used() -> None:
+    cache = ResponseCache(max_bytes=10)
+    cache.put(key="a", content=b"12345", headers={"ETag": "a"})
+    cache.put(key="b", content=b"12345", headers={"ETag": "b"})
+    assert cache.get(key="a") is not None  # "a" becomes the most recently used
+    cache.put(key="c", content=b"12345", headers={"ETag": "c"})
+    assert cache.get(key="b") is None
+    assert cache.hit(key="a") is not None
+    cache.put(key="d", content=b"1", headers={})  # No validator, not stored
+    assert cache.get(key="d") is None
+
+    stats = cache.get_stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 4
+    assert stats["bytes_saved"] == 5
+    assert stats["size_bytes"] == 10
@@ -0,0 +1,38 @@
+# Standard imports
+import time
+
+# Local imports
+from services.github.token_cache import TokenCache, get_token_scope
+
+
+def test_token_cache_hit_and_miss() -> None:
+    """Tokens are served until the refresh margin before they expire"""
+    cache = TokenCache(refresh_margin_in_seconds=300)
+    assert cache.get(key=1) is None
+
+    cache.set(key=1, token="fresh", expires_at=time.time() + 3600)
+    cache.set(key=2, token="stale", expires_at=time.time() + 60)
+    assert cache.get(key=1) == "fresh"
+    assert cache.get(key=2) is None
+    assert cache.get_key(token="fresh") == 1
+    assert cache.get_stats() == {"hits": 1, "misses": 2, "size": 2}
+
+
+def test_token_cache_invalidate() -> None:
+    """Invalidated tokens are no longer served nor resolvable"""
+    cache = TokenCache(refresh_margin_in_seconds=0)
+    cache.set(key=1, token="old", expires_at=time.time() + 3600)
+    cache.set(key=1, token="new", expires_at=time.time() + 3600)
+    assert cache.get_key(token="old") is None
+    cache.invalidate(key=1)
+    assert cache.get(key=1) is None
+    assert cache.get_key(token="new") is None
+
+
+def test_app_jwts_share_one_scope() -> None:
+    assert get_token_scope(token="header.payload-1.signature") == "app"
+    assert get_token_scope(token="header.payload-2.signature") == "app"
+    assert get_token_scope(token="ghs_unknown") not in (
+        "app",
+        get_token_scope(token="ghs_other"),
+    )
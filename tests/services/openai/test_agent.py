@@ -0,0 +1,255 @@
+# Standard imports
+import json
+import threading
+import time
+from types import SimpleNamespace
+from typing import Any
+
+# Third-party imports
+import httpx
+import pytest
+from openai import APIConnectionError
+from openai.types.beta.threads import Message, Run, Text, TextContentBlock
+from openai.types.beta.threads.required_action_function_tool_call import (
+    RequiredActionFunctionToolCall,
+)
+
+# Local imports
+from services.openai import agent
+from utils.spans import Spans, current_spans
+
+THREAD = SimpleNamespace(id="thread_1")
+ASSISTANT = SimpleNamespace(id="asst_1")
+
+
+def _run(status: str, tool_call_paths: tuple[str, ...] = ()) -> Run:
+    tool_calls = [
+        RequiredActionFunctionToolCall.construct(
+            id=f"call_{i}",
+            type="function",
+            function=SimpleNamespace(
+                name="get_remote_file_content",
+                arguments=json.dumps({"file_path": path}),
+            ),
+        )
+        for i, path in enumerate(tool_call_paths)
+    ]
+    required_action = (
+        SimpleNamespace(submit_tool_outputs=SimpleNamespace(tool_calls=tool_calls))
+        if tool_calls
+        else None
+    )
+    return Run.construct(
+        id="run_1", status=status, required_action=required_action, last_error=None
+    )
+
+
+def _message(text: str) -> Message:
+    return Message.construct(
+        id="msg_1",
+        content=[
+            TextContentBlock.construct(
+                type="text", text=Text.construct(value=text, annotations=[])
+            )
+        ],
+    )
+
+
+class _FakeStream:
+    def __init__(self, events: list[tuple[str, Any]]) -> None:
+        self.events = [SimpleNamespace(event=e, data=d) for e, d in events]
+
+    def __enter__(self) -> "_FakeStream":
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        pass
+
+    def __iter__(self):
+        return iter(self.events)
+
+
+class _FakeRuns:
+    def __init__(self, stream_fails: bool) -> None:
+        self.stream_fails = stream_fails
+        self.calls: list[str] = []
+        self.tool_outputs: list[Any] = []
+
+    def create(self, stream: bool = False, **_kwargs: Any) -> Any:
+        self.calls.append("create stream" if stream else "create")
+        if stream and self.stream_fails:
+            raise APIConnectionError(
+                request=httpx.Request("POST", "https://api.openai.com/v1/threads")
+            )
+        if stream:
+            return _FakeStream(
+                [
+                    ("thread.run.created", _run(status="queued")),
+                    (
+                        "thread.run.requires_action",
+                        _run(status="requires_action", tool_call_paths=("a.py",)),
+                    ),
+                    # Never reached, as the stream is left once the run requires action
+                    ("thread.run.completed", _run(status="completed")),
+                ]
+            )
+        return _run(status="queued")
+
+    def submit_tool_outputs(
+        self, tool_outputs: list[Any], stream: bool = False, **_kwargs: Any
+    ) -> Any:
+        self.calls.append("submit stream" if stream else "submit")
+        self.tool_outputs += tool_outputs
+        if stream:
+            return _FakeStream(
+                [
+                    ("thread.run.in_progress", _run(status="in_progress")),
+                    ("thread.message.completed", _message(text="diff --git")),
+                    ("thread.run.completed", _run(status="completed")),
+                ]
+            )
+        return _run(status="in_progress")
+
+    def retrieve(self, **_kwargs: Any) -> Run:
+        self.calls.append("retrieve")
+        if "submit" in self.calls:
+            return _run(status="completed")
+        return _run(status="requires_action", tool_call_paths=("a.py",))
+
+
+def _client(runs: _FakeRuns) -> Any:
+    def list_messages(**kwargs: Any) -> SimpleNamespace:
+        runs.calls.append(f"list limit={kwargs['limit']}")
+        return SimpleNamespace(data=[_message(text="diff --git")])
+
+    return SimpleNamespace(
+        beta=SimpleNamespace(
+            threads=SimpleNamespace(
+                runs=runs, messages=SimpleNamespace(list=list_messages)
+            )
+        )
+    )
+
+
+def _run_and_get_text(monkeypatch, runs: _FakeRuns) -> tuple[str, str]:
+    client = _client(runs=runs)
+    monkeypatch.setattr(
+        agent,
+        "functions",
+        {"get_remote_file_content": lambda file_path, token: file_path},
+    )
+    monkeypatch.setattr(agent, "get_openai_client", lambda: client)
+    monkeypatch.setattr(agent, "OPENAI_POLL_MIN_INTERVAL_IN_SECONDS", 0)
+    return agent.run_and_get_text(
+        client=client,
+        assistant=ASSISTANT,
+        thread=THREAD,
+        token="token",
+        run_name="generate diffs",
+    )
+
+
+def test_streamed_run_calls_tools_and_reads_the_text_from_events(monkeypatch):
+    runs = _FakeRuns(stream_fails=False)
+    text, input_data = _run_and_get_text(monkeypatch=monkeypatch, runs=runs)
+    assert text == "diff --git"
+    assert runs.tool_outputs == [{"tool_call_id": "call_0", "output": '"a.py"'}]
+    assert json.loads(input_data) == runs.tool_outputs
+    # Nothing is polled nor listed
+    assert runs.calls == ["create stream", "submit stream"]
+
+
+def test_failed_stream_falls_back_to_polling(monkeypatch):
+    runs = _FakeRuns(stream_fails=True)
+    text, _ = _run_and_get_text(monkeypatch=monkeypatch, runs=runs)
+    assert text == "diff --git"
+    assert runs.tool_outputs == [{"tool_call_id": "call_0", "output": '"a.py"'}]
+    assert runs.calls == [
+        "create stream",
+        "create",
+        "retrieve",
+        "submit",
+        "retrieve",
+        "list limit=1",
+    ]
+
+
+def test_tool_calls_of_a_step_run_concurrently_in_order(monkeypatch):
+    release = threading.Event()
+
+    def get_remote_file_content(file_path: str, token: str) -> str:
+        if file_path == "missing.py":
+            raise FileNotFoundError(file_path)
+        if file_path == "slow.py":
+            release.wait(timeout=5)
+        time.sleep(0.1)
+        return f"content of {file_path}"
+
+    monkeypatch.setattr(agent, "OPENAI_TOOL_STEP_TIMEOUT_IN_SECONDS", 0.5)
+    paths = ("a.py", "missing.py", "b.py", "slow.py", "c.py", "bad.py")
+    run = _run(status="requires_action", tool_call_paths=paths)
+    # Malformed arguments fail their own call, and the progress message skips them
+    run.required_action.submit_tool_outputs.tool_calls[5].function.arguments = "{"
+    progress: Any = SimpleNamespace(percent=30, update_progress=lambda **_kwargs: None)
+    spans = Spans()
+    token = current_spans.set(spans)
+    start = time.perf_counter()
+    monkeypatch.setattr(
+        agent, "functions", {"get_remote_file_content": get_remote_file_content}
+    )
+    results = agent.get_tool_outputs(run=run, token="token", progress=progress)
+    seconds = time.perf_counter() - start
+    breakdown = spans.get_breakdown()
+    # The slow call is left running until it's joined, e.g. before the snapshot is released
+    assert agent.join_tool_calls(timeout=0) == 1
+    release.set()
+    assert agent.join_tool_calls(timeout=5) == 0
+    current_spans.reset(token)
+
+    assert [output["tool_call_id"] for output in results] == [
+        f"call_{i}" for i in range(len(paths))
+    ]
+    assert [json.loads(output["output"]) for output in results] == [
+        "content of a.py",
+        "Error: missing.py",
+        "content of b.py",
+        "Error: get_remote_file_content timed out after 0.5 seconds.",
+        "content of c.py",
+        "Error: Expecting property name enclosed in double quotes: line 1 column 2 (char 1)",
+    ]
+    # Bounded by the step timeout instead of the sum of the calls
+    assert seconds < 1
+    # The malformed call fails before its span, and the slow one is still running
+    assert breakdown["tool:get_remote_file_content"]["count"] == 4
+
+
+def test_failed_commit_is_not_checkpointed(monkeypatch):
+    monkeypatch.setattr(agent, "get_openai_client", lambda: None)
+    monkeypatch.setattr(
+        agent, "commit_multiple_changes_to_remote_branch", lambda **_kwargs: None
+    )
+    saved: dict[str, Any] = {}
+    progress: Any = SimpleNamespace(update_progress=lambda **_kwargs: None)
+    with pytest.raises(ValueError, match="Failed to commit"):
+        agent.run_assistant(
+            file_paths=[],
+            issue_title="Fix bug",
+            issue_body="",
+            issue_comments=[],
+            owner="owner",
+            pr_body="",
+            ref="main",
+            repo="repo",
+            comment_url="",
+            token="token",
+            new_branch="gitauto/issue-#1",
+            base_sha="base-commit",
+            assistant=ASSISTANT,
+            thread=THREAD,
+            assistant_input_data="",
+            progress=progress,
+            # Resumed after the review, so only the commit is left
+            checkpoint={"first_diffs": ["diff"], "reviewed_diffs": ["diff"]},
+            save_checkpoint=saved.__setitem__,
+        )
+    assert "committed" not in saved
@@ -0,0 +1,55 @@
+# Standard imports
+from types import SimpleNamespace
+from typing import Any
+
+# Local imports
+from services.openai.assistant_registry import AssistantRegistry, get_definition_hash
+
+DEFINITION: dict[str, Any] = {
+    "name": "GitAuto: Automated Issue Resolver",
+    "instructions": "Resolve the issue",
+    "tools": [{"type": "function", "function": {"name": "get_remote_file_content"}}],
+    "model": "gpt-4o",
+}
+
+
+class _FakeAssistants:
+    """In place of client.beta.assistants, newest first like the API"""
+
+    def __init__(self) -> None:
+        self.assistants: list[SimpleNamespace] = [
+            SimpleNamespace(id="asst_orphan", metadata={})
+        ]
+
+    def create(self, metadata: dict[str, str], **_kwargs: Any) -> SimpleNamespace:
+        assistant = SimpleNamespace(
+            id=f"asst_{len(self.assistants)}", metadata=metadata
+        )
+        self.assistants.insert(0, assistant)
+        return assistant
+
+    def list(self, **_kwargs: Any) -> SimpleNamespace:
+        return SimpleNamespace(data=list(self.assistants))
+
+
+def test_registry_creates_once_per_definition_and_finds_it_after_a_cold_start():
+    assistants = _FakeAssistants()
+    client: Any = SimpleNamespace(beta=SimpleNamespace(assistants=assistants))
+    registry = AssistantRegistry(key="gitauto:agent")
+
+    first = registry.get_assistant(client=client, definition=DEFINITION)
+    assert registry.get_assistant(client=client, definition=dict(DEFINITION)) is first
+    assert registry.get_stats() == {"hits": 1, "found": 0, "created": 1}
+
+    # Another container finds it instead of creating its own
+    cold = AssistantRegistry(key="gitauto:agent")
+    assert cold.get_assistant(client=client, definition=DEFINITION).id == first.id
+    assert cold.get_stats() == {"hits": 0, "found": 1, "created": 0}
+
+    # A changed definition gets its own assistant, and so does another environment
+    changed = {**DEFINITION, "instructions": "Resolve the issue in one PR"}
+    assert get_definition_hash(changed) != get_definition_hash(DEFINITION)
+    assert registry.get_assistant(client=client, definition=changed).id != first.id
+    other = AssistantRegistry(key="gitauto-dev:agent")
+    assert other.get_assistant(client=client, definition=DEFINITION).id != first.id
+    assert len(assistants.assistants) == 4
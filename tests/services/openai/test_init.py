@@ -0,0 +1,25 @@
+# Third-party imports
+import pytest
+from openai import DefaultHttpxClient, OpenAI
+
+# Local imports
+from services.openai.init import OpenAITransport, get_openai_client
+
+
+def respond(_request, _body) -> tuple:
+    return 200, {"object": "list", "data": []}
+
+
+@pytest.mark.parametrize("fake_server", [respond], indirect=True)
+def test_client_is_shared_and_reuses_connections(fake_server: str):
+    assert get_openai_client() is get_openai_client()
+
+    transport = OpenAITransport()
+    client = OpenAI(
+        api_key="sk-test",
+        base_url=f"{fake_server}/v1",
+        http_client=DefaultHttpxClient(transport=transport),
+    )
+    for _ in range(3):
+        assert not list(client.models.list())
+    assert transport.get_stats() == {"requests": 3, "connections_opened": 1}
@@ -0,0 +1,31 @@
+# Third-party imports
+import pytest
+
+# Local imports
+from services.supabase import SupabaseManager
+from services.supabase.supabase_client import count_round_trips
+from utils.spans import Spans, current_spans
+
+
+def respond(_request, _body) -> tuple:
+    return 200, []
+
+
+@pytest.mark.parametrize("fake_server", [respond], indirect=True)
+def test_manager_reuses_connections_and_counts_round_trips(fake_server: str):
+    manager = SupabaseManager(url=fake_server, key="header.payload.sig")
+    spans = Spans()
+    token = current_spans.set(spans)
+    with count_round_trips() as round_trips:
+        for _ in range(3):
+            manager.release_lock(key="delivery:1", owner="a")
+        manager.client.table(table_name="usage").select("id").execute()
+    current_spans.reset(token)
+
+    # Outside of a webhook, round trips are still counted for the process
+    manager.client.table(table_name="usage").select("id").execute()
+    assert manager.get_stats() == {"round_trips": 5, "connections_opened": 1}
+    assert {
+        name: trips["count"] for name, trips in round_trips.get_breakdown().items()
+    } == {"supabase:DELETE locks": 3, "supabase:GET usage": 1}
+    assert spans.get_breakdown().keys() == round_trips.get_breakdown().keys()
@@ -0,0 +1,51 @@
+# Standard imports
+import json
+
+# Third-party imports
+import pytest
+
+# Local imports
+from services.supabase import SupabaseManager
+
+MISSING_COLUMNS: set[str] = set()
+UPDATES: list[dict] = []
+
+
+def respond(request, body: bytes) -> tuple:
+    if request.command != "PATCH":
+        return 200, []
+    update = json.loads(body)
+    UPDATES.append(update)
+    missing = MISSING_COLUMNS.intersection(update)
+    if missing:
+        return 400, {"code": "42703", "message": f"column {missing} does not exist"}
+    return 200, []
+
+
+@pytest.fixture(name="manager")
+def fixture_manager(fake_server: str) -> SupabaseManager:
+    MISSING_COLUMNS.clear()
+    UPDATES.clear()
+    return SupabaseManager(url=fake_server, key="header.payload.sig")
+
+
+@pytest.mark.parametrize("fake_server", [respond], indirect=True)
+def test_missing_spans_column_does_not_block_completion(manager) -> None:
+    MISSING_COLUMNS.add("spans")
+    manager.complete_and_update_usage_record(
+        usage_record_id=1,
+        token_input=10,
+        token_output=20,
+        total_seconds=30,
+        spans={"stage:token": {"count": 1, "seconds": 0.1}},
+    )
+    assert UPDATES[0]["is_completed"] is True
+    assert "spans" not in UPDATES[0]
+    assert UPDATES[1] == {"spans": {"stage:token": {"count": 1, "seconds": 0.1}}}
+
+
+@pytest.mark.parametrize("fake_server", [respond], indirect=True)
+def test_save_checkpoint_reports_failures(manager) -> None:
+    assert manager.save_checkpoint(usage_record_id=1, checkpoint={"a": 1}) is True
+    MISSING_COLUMNS.add("checkpoint")
+    assert manager.save_checkpoint(usage_record_id=1, checkpoint={"a": 1}) is False
@@ -0,0 +1,118 @@
+# Benchmark: run this file locally with: python -m pytest -s tests/services/test_gitauto_handler.py
+# Standard imports
+import asyncio
+import json
+import time
+
+# Third-party imports
+import pytest
+
+# Local imports
+from config import PRODUCT_ID
+from services import gitauto_handler
+from services.github.token_cache import installation_token_cache
+from services.supabase import get_supabase_manager
+
+LATENCY_IN_SECONDS = 0.1  # Per GitHub request and Supabase query
+INSTALLATION_ID = 123
+
+
+def respond(request, _body) -> tuple:
+    """Answers the pre-agent GitHub calls of handle_gitauto after a fixed delay"""
+    time.sleep(LATENCY_IN_SECONDS)
+    if request.path == "/graphql":
+        branch = {"name": "main", "target": {"oid": "head", "tree": {"oid": "tree"}}}
+        comments = {
+            "pageInfo": {"hasNextPage": False, "endCursor": None},
+            "nodes": [],
+        }
+        return 200, {
+            "data": {
+                "repository": {
+                    "defaultBranchRef": branch,
+                    "issue": {"comments": comments},
+                }
+            }
+        }
+    if "/git/trees/" in request.path:
+        tree = [{"path": "main.py", "mode": "100644", "type": "blob", "sha": "b"}]
+        return 200, {"sha": "tree", "tree": tree, "truncated": False}
+    return 200, {"url": f"http://{request.headers['Host']}/comments/1"}
+
+
+class FirstLLMCall(Exception):
+    pass
+
+
+def _slow_query(result):
+    def query(**_kwargs):
+        time.sleep(LATENCY_IN_SECONDS)
+        return result
+
+    return query
+
+
+LLM_CALLS: list[tuple[float, str]] = []
+
+
+def _write_pr_body(input_message: str) -> str:
+    LLM_CALLS.append((time.perf_counter(), input_message))
+    raise FirstLLMCall()
+
+
+@pytest.fixture(name="fake_services")
+def fixture_fake_services(github_api_url: str, monkeypatch: pytest.MonkeyPatch):
+    assert github_api_url
+    installation_token_cache.set(
+        key=INSTALLATION_ID, token="token", expires_at=time.time() + 3600
+    )
+    manager = get_supabase_manager()
+    monkeypatch.setattr(
+        manager,
+        "get_how_many_requests_left_and_cycle",
+        _slow_query(result=(5, 0, None)),
+    )
+    monkeypatch.setattr(manager, "create_user_request", _slow_query(result=1))
+    monkeypatch.setattr(manager, "get_checkpoint", _slow_query(result=None))
+    monkeypatch.setattr(manager, "save_checkpoint", _slow_query(result=True))
+    monkeypatch.setattr(gitauto_handler, "write_pr_body", _write_pr_body)
+    monkeypatch.setattr(gitauto_handler, "STAGE_RETRY_DELAY_IN_SECONDS", 0)
+    monkeypatch.setattr(
+        gitauto_handler, "create_assistant_and_thread", _slow_query(result=None)
+    )
+    yield
+    installation_token_cache.invalidate(key=INSTALLATION_ID)
+
+
+@pytest.mark.parametrize("fake_server", [respond], indirect=True)
+def test_time_to_first_llm_call(fake_services) -> None:
+    payload = {
+        "label": {"name": PRODUCT_ID},
+        "issue": {
+            "title": "Fix bug",
+            "body": "",
+            "number": 1,
+            "user": {"login": "issuer"},
+        },
+        "installation": {"id": INSTALLATION_ID},
+        "repository": {
+            "owner": {"type": "User", "login": "owner", "id": 1},
+            "name": "repo",
+            "default_branch": "main",
+            "size": 0,
+            "clone_url": "",
+        },
+        "sender": {"id": 2, "login": "sender"},
+    }
+    start = time.perf_counter()
+    LLM_CALLS.clear()
+    with pytest.raises(FirstLLMCall):
+        asyncio.run(
+            gitauto_handler.handle_gitauto(payload=payload, trigger_type="label")
+        )
+    first_llm_call_at, input_message = LLM_CALLS[0]
+    elapsed = first_llm_call_at - start
+    print(f"\nTime to first LLM call: {elapsed:.2f}s")
+    assert json.loads(input_message)["file_paths"] == ["main.py"]
+    # 7 round trips one after another, now 3: limit check with the GraphQL context, usage record with reaction and comment, then tree
+    assert elapsed < LATENCY_IN_SECONDS * 5
@@ -0,0 +1,72 @@
+# Standard imports
+import asyncio
+from typing import Any
+
+# Local imports
+from config import PRODUCT_ID
+from services import webhook_handler
+from utils.ttl_store import MemoryTTLStore
+
+
+class _CountingStore(MemoryTTLStore):
+    def __init__(self) -> None:
+        super().__init__()
+        self.keys: list[str] = []
+
+    def acquire_lock(self, key: str, owner: str, ttl_in_seconds: float) -> bool:
+        self.keys.append(key)
+        return super().acquire_lock(key=key, owner=owner, ttl_in_seconds=ttl_in_seconds)
+
+
+def test_only_deliveries_that_trigger_work_are_deduplicated(monkeypatch):
+    store = _CountingStore()
+    handled: list[Any] = []
+
+    async def handle_gitauto_once(payload: Any, trigger_type: str) -> None:
+        handled.append(trigger_type)
+
+    monkeypatch.setattr(webhook_handler, "get_lock_store", lambda: store)
+    monkeypatch.setattr(webhook_handler, "handle_gitauto_once", handle_gitauto_once)
+    labeled = {"action": "labeled", "label": {"name": PRODUCT_ID}}
+
+    async def main() -> None:
+        # Ignored events don't reach the lock store
+        for event_name, payload in (
+            ("issues", {"action": "labeled", "label": {"name": "bug"}}),
+            ("issues", {"action": "closed"}),
+            ("push", {"action": "created"}),
+        ):
+            await webhook_handler.handle_webhook_event(
+                event_name=event_name, payload=payload, delivery_id=event_name
+            )
+        for _ in range(2):
+            await webhook_handler.handle_webhook_event(
+                event_name="issues", payload=labeled, delivery_id="1"
+            )
+
+    asyncio.run(main())
+    assert store.keys == ["delivery:1", "delivery:1"]
+    assert handled == ["label"]
+
+
+class _UnavailableStore(MemoryTTLStore):
+    def acquire_lock(self, key: str, owner: str, ttl_in_seconds: float) -> bool:
+        raise ConnectionError("Supabase is unavailable")
+
+
+def test_deliveries_are_skipped_when_they_cannot_be_deduplicated(monkeypatch):
+    handled: list[Any] = []
+
+    async def handle_gitauto_once(payload: Any, trigger_type: str) -> None:
+        handled.append(trigger_type)
+
+    monkeypatch.setattr(webhook_handler, "get_lock_store", _UnavailableStore)
+    monkeypatch.setattr(webhook_handler, "handle_gitauto_once", handle_gitauto_once)
+    asyncio.run(
+        webhook_handler.handle_webhook_event(
+            event_name="issues",
+            payload={"action": "labeled", "label": {"name": PRODUCT_ID}},
+            delivery_id="1",
+        )
+    )
+    assert not handled
@@ -0,0 +1,44 @@
+# Standard imports
+import os
+import subprocess
+import sys
+
+# Budget for "import main", which every Lambda cold start pays before handling anything
+MAIN_IMPORT_BUDGET_IN_SECONDS = 0.5
+
+
+def _import(module: str) -> tuple[float, set[str]]:
+    """Import the module in a fresh interpreter and return its cumulative import time and every module it loaded
+    https://docs.python.org/3/using/cmdline.html#cmdoption-X
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        capture_output=True,
+        check=True,
+        text=True,
+    )
+    lines = [
+        line for line in result.stderr.splitlines() if line.startswith("import time:")
+    ]
+    # import time: self [us] | cumulative | imported package
+    names = {line.split("|")[2].strip() for line in lines[1:]}
+    cumulative = next(
+        int(line.split("|")[1])
+        for line in lines
+        if line.split("|")[2].strip() == module
+    )
+    return cumulative / 1_000_000, names
+
+
+def test_main_does_not_import_sdks():
+    seconds, names = _import(module="main")
+    for sdk in ("fastapi", "mangum", "openai", "stripe", "supabase"):
+        assert sdk not in names
+    assert seconds < MAIN_IMPORT_BUDGET_IN_SECONDS
+
+
+def test_scheduler_does_not_import_the_web_app_or_llm_sdks():
+    _, names = _import(module="scheduler")
+    for sdk in ("fastapi", "mangum", "openai", "stripe"):
+        assert sdk not in names
@@ -0,0 +1,49 @@
+# Standard imports
+import time
+
+# Third-party imports
+import requests
+
+# Local imports
+from utils.handle_exceptions import handle_exceptions
+
+
+def _rate_limited_error(reset_in_seconds: int) -> requests.exceptions.HTTPError:
+    response = requests.Response()
+    response.status_code = 403
+    response.headers.update(
+        {
+            "X-RateLimit-Limit": "5000",
+            "X-RateLimit-Remaining": "0",
+            "X-RateLimit-Used": "5000",
+            "X-RateLimit-Reset": str(int(time.time()) + reset_in_seconds),
+        }
+    )
+    return requests.exceptions.HTTPError("403 Forbidden", response=response)
+
+
+def test_primary_rate_limit_is_deferred_instead_of_slept() -> None:
+    calls = []
+
+    @handle_exceptions(default_return_value="deferred")
+    def list_issues() -> str:
+        calls.append(1)
+        raise _rate_limited_error(reset_in_seconds=3600)
+
+    start = time.perf_counter()
+    assert list_issues() == "deferred"
+    assert len(calls) == 1
+    assert time.perf_counter() - start < 1
+
+
+def test_rate_limit_retries_are_bounded(monkeypatch) -> None:
+    monkeypatch.setattr(time, "sleep", lambda _seconds: None)
+    calls = []
+
+    @handle_exceptions(default_return_value="gave up")
+    def list_issues() -> str:
+        calls.append(1)
+        raise _rate_limited_error(reset_in_seconds=0)
+
+    assert list_issues() == "gave up"
+    assert len(calls) == 4  # The first call and 3 retries
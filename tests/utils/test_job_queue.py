@@ -0,0 +1,125 @@
+# Standard imports
+import asyncio
+import json
+import time
+
+# Local imports
+from config import WEBHOOK_QUEUE_EVENT_SOURCE
+from utils.job_queue import (
+    Job,
+    LambdaJobQueue,
+    SqliteJobQueue,
+    WorkerPool,
+    create_job_queue,
+    get_lambda_job,
+)
+
+
+def test_sqlite_job_queue_visibility_retries_and_dead_letters(tmp_path):
+    queue = SqliteJobQueue(
+        path=str(tmp_path / "queue.sqlite3"),
+        visibility_timeout_in_seconds=0.05,
+        max_attempts=2,
+        retry_delay_in_seconds=0,
+    )
+    job_id = queue.enqueue(body={"event_name": "issues", "payload": {"action": "x"}})
+    job = queue.receive()
+    assert job == Job(
+        id=job_id, body={"event_name": "issues", "payload": {"action": "x"}}, attempts=1
+    )
+    assert queue.receive() is None  # Hidden while in flight
+    assert queue.get_depth() == {"ready": 0, "in_flight": 1, "dead": 0}
+
+    # The worker died, so the job comes back after its visibility timeout
+    time.sleep(0.06)
+    job = queue.receive()
+    assert job is not None and job.attempts == 2
+    queue.nack(job=job, error="ValueError: boom")
+    assert queue.receive() is None
+    assert queue.get_depth() == {"ready": 0, "in_flight": 0, "dead": 1}
+
+    # Jobs survive a restart
+    queue.enqueue(body={"n": 1})
+    queue.close()
+    reopened = SqliteJobQueue(
+        path=str(tmp_path / "queue.sqlite3"),
+        visibility_timeout_in_seconds=60,
+        max_attempts=2,
+    )
+    job = reopened.receive()
+    assert job is not None and job.body == {"n": 1}
+    reopened.ack(job=job)
+    assert reopened.get_depth() == {"ready": 0, "in_flight": 0, "dead": 1}
+
+
+def test_worker_pool_bounds_concurrency_and_acks(tmp_path):
+    queue = create_job_queue(
+        backend="sqlite",
+        path=str(tmp_path / "queue.sqlite3"),
+        visibility_timeout_in_seconds=60,
+        max_attempts=1,
+    )
+    assert queue is not None
+    running: list[int] = []
+    peak: list[int] = [0]
+
+    async def handler(job: Job) -> None:
+        running.append(job.id)
+        peak[0] = max(peak[0], len(running))
+        await asyncio.sleep(0.02)
+        running.remove(job.id)
+        if job.body["n"] == 0:
+            raise ValueError("boom")
+
+    async def main() -> dict[str, int]:
+        pool = WorkerPool(
+            queue=queue, handler=handler, concurrency=2, poll_interval_in_seconds=0.01
+        )
+        pool.start()
+        for n in range(6):
+            queue.enqueue(body={"n": n})
+        pool.notify()
+        while pool.handled + pool.failed < 6:
+            await asyncio.sleep(0.01)
+        await pool.stop()
+        return pool.get_stats()
+
+    stats = asyncio.run(main())
+    assert peak[0] == 2
+    assert stats == {"handled": 5, "failed": 1, "ready": 0, "in_flight": 0, "dead": 1}
+    assert (
+        create_job_queue(
+            backend="inline", path="", visibility_timeout_in_seconds=0, max_attempts=0
+        )
+        is None
+    )
+
+
+class _FakeLambdaClient:
+    def __init__(self) -> None:
+        self.invocations: list[dict] = []
+
+    def invoke(self, **kwargs) -> dict:
+        self.invocations.append(kwargs)
+        return {"StatusCode": 202}
+
+
+def test_lambda_job_queue_invokes_the_function_asynchronously():
+    client = _FakeLambdaClient()
+    queue = LambdaJobQueue(
+        function_name="gitauto",
+        event_source=WEBHOOK_QUEUE_EVENT_SOURCE,
+        client=client,
+    )
+    body = {"event_name": "issues", "payload": {"action": "labeled"}}
+    job_id = queue.enqueue(body=body)
+    invocation = client.invocations[0]
+    assert invocation["FunctionName"] == "gitauto"
+    assert invocation["InvocationType"] == "Event"  # Returns once Lambda queued it
+
+    # What main.handler receives
+    event = json.loads(invocation["Payload"])
+    assert event["source"] == WEBHOOK_QUEUE_EVENT_SOURCE
+    assert get_lambda_job(event=event) == Job(id=job_id, body=body, attempts=1)
+    assert queue.get_depth() == {"enqueued": 1}
+    assert queue.receive() is None
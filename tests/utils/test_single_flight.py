@@ -0,0 +1,73 @@
+# Standard imports
+import asyncio
+import time
+
+# Third-party imports
+import pytest
+
+# Local imports
+from utils.single_flight import SingleFlight
+from utils.ttl_store import LayeredTTLStore, MemoryTTLStore
+
+
+def test_memory_ttl_store_expires_and_checks_owner():
+    store = MemoryTTLStore()
+    assert store.acquire_lock(key="k", owner="a", ttl_in_seconds=0.05)
+    assert not store.acquire_lock(key="k", owner="b", ttl_in_seconds=0.05)
+    store.release_lock(key="k", owner="b")  # Not the owner, so still held
+    assert not store.acquire_lock(key="k", owner="b", ttl_in_seconds=0.05)
+    time.sleep(0.06)
+    assert store.acquire_lock(key="k", owner="b", ttl_in_seconds=0.05)
+
+
+def test_layered_ttl_store_rolls_back_partial_acquire():
+    local, shared = MemoryTTLStore(), MemoryTTLStore()
+    store = LayeredTTLStore(stores=[local, shared])
+    assert shared.acquire_lock(key="k", owner="other", ttl_in_seconds=60)
+    assert not store.acquire_lock(key="k", owner="a", ttl_in_seconds=60)
+    # The local store was released again so a later attempt isn't blocked by it
+    assert local.acquire_lock(key="k", owner="b", ttl_in_seconds=60)
+
+
+class _UnavailableStore(MemoryTTLStore):
+    def acquire_lock(self, key: str, owner: str, ttl_in_seconds: float) -> bool:
+        raise ConnectionError("Supabase is unavailable")
+
+
+def test_layered_ttl_store_rolls_back_when_a_store_raises():
+    local = MemoryTTLStore()
+    store = LayeredTTLStore(stores=[local, _UnavailableStore()])
+    with pytest.raises(ConnectionError):
+        store.acquire_lock(key="k", owner="a", ttl_in_seconds=60)
+    assert local.acquire_lock(key="k", owner="b", ttl_in_seconds=60)
+
+
+def test_single_flight_attaches_in_process_and_drops_elsewhere():
+    calls: list[str] = []
+
+    async def job() -> str:
+        calls.append("job")
+        await asyncio.sleep(0.05)
+        return "pr"
+
+    async def main() -> None:
+        store = MemoryTTLStore()
+        single_flight = SingleFlight(store=store, ttl_in_seconds=60)
+        results = await asyncio.gather(
+            single_flight.run(key="issue", func=job),
+            single_flight.run(key="issue", func=job),
+        )
+        assert results == ["pr", "pr"]
+        assert (len(calls), single_flight.attached) == (1, 1)
+
+        # Another process holds the key in the shared store
+        assert store.acquire_lock(key="issue", owner="other", ttl_in_seconds=60)
+        assert await single_flight.run(key="issue", func=job) is None
+        assert (len(calls), single_flight.dropped) == (1, 1)
+
+        # Released after the call, so the next trigger runs again
+        store.release_lock(key="issue", owner="other")
+        assert await single_flight.run(key="issue", func=job) == "pr"
+        assert len(calls) == 2
+
+    asyncio.run(main())
@@ -0,0 +1,34 @@
+# Standard imports
+import asyncio
+import time
+
+# Local imports
+from utils.spans import Spans, current_spans, span
+
+
+def _call_tool() -> None:
+    with span(name="tool:get_remote_file_content"):
+        time.sleep(0.01)
+
+
+def test_spans_follow_the_request_into_tasks_and_threads():
+    async def main() -> Spans:
+        spans = Spans()
+        current_spans.set(spans)
+        await asyncio.gather(
+            asyncio.to_thread(_call_tool),
+            asyncio.create_task(asyncio.to_thread(_call_tool)),
+        )
+        with span(name="commit"):
+            pass
+        return spans
+
+    breakdown = asyncio.run(main()).get_breakdown()
+    assert list(breakdown) == ["tool:get_remote_file_content", "commit"]
+    tool = breakdown["tool:get_remote_file_content"]
+    assert tool["count"] == 2
+    assert tool["seconds"] >= 0.02 and tool["max_seconds"] >= 0.01
+
+    # Outside of a request, spans are not recorded anywhere
+    _call_tool()
+    assert current_spans.get() is None
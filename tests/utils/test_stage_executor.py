@@ -0,0 +1,173 @@
+# Standard imports
+import asyncio
+import time
+
+# Third-party imports
+import pytest
+
+# Local imports
+from utils.deadline import DeadlineExceeded, set_deadline
+from utils.stage_executor import Stage, StageExecutor, StopPipeline
+
+DELAY_IN_SECONDS = 0.1
+
+
+async def _wait(**kwargs) -> dict:
+    await asyncio.sleep(DELAY_IN_SECONDS)
+    return kwargs
+
+
+def _block(**kwargs) -> dict:
+    time.sleep(DELAY_IN_SECONDS)
+    return kwargs
+
+
+def test_independent_stages_overlap() -> None:
+    """a -> (b, c) -> d takes 3 delays, not 4"""
+    executor = StageExecutor(
+        stages=[
+            Stage(name="a", func=_wait),
+            Stage(name="b", func=_wait, inputs=("a",)),
+            Stage(name="c", func=_block, inputs=("a",)),
+            Stage(name="d", func=_wait, inputs=("b", "c")),
+        ]
+    )
+    start = time.perf_counter()
+    results = asyncio.run(executor.run())
+    assert time.perf_counter() - start < DELAY_IN_SECONDS * 3.5
+    assert results["d"] == {"b": {"a": {}}, "c": {"a": {}}}
+    timings = {row["name"]: row for row in executor.get_timings()}
+    assert timings["b"]["started_at"] == pytest.approx(
+        timings["c"]["started_at"], abs=0.05
+    )
+
+
+def test_retries_and_failures_are_recorded() -> None:
+    calls = []
+
+    def flaky() -> str:
+        calls.append(1)
+        if len(calls) == 1:
+            raise ConnectionError("reset")
+        return "ok"
+
+    def broken(flaky: str) -> None:
+        raise ValueError(f"{flaky} but broken")
+
+    executor = StageExecutor(
+        stages=[
+            Stage(name="flaky", func=flaky, retries=1),
+            Stage(name="broken", func=broken, inputs=("flaky",)),
+            Stage(name="never", func=_wait, inputs=("broken",)),
+        ],
+        retry_delay_in_seconds=0,
+    )
+    with pytest.raises(ValueError):
+        asyncio.run(executor.run())
+    assert executor.records["flaky"].attempts == 2
+    assert executor.records["broken"].error == "ValueError: ok but broken"
+    assert executor.records["never"].started_at is None
+
+
+def test_stop_pipeline_cancels_running_stages() -> None:
+    async def stop() -> None:
+        raise StopPipeline("limit reached")
+
+    async def slow() -> None:
+        await asyncio.sleep(10)
+
+    executor = StageExecutor(
+        stages=[Stage(name="stop", func=stop), Stage(name="slow", func=slow)]
+    )
+    start = time.perf_counter()
+    with pytest.raises(StopPipeline):
+        asyncio.run(executor.run())
+    assert time.perf_counter() - start < 1
+
+
+def test_cycles_are_rejected() -> None:
+    with pytest.raises(ValueError):
+        StageExecutor(
+            stages=[
+                Stage(name="a", func=_wait, inputs=("b",)),
+                Stage(name="b", func=_wait, inputs=("a",)),
+            ]
+        )
+
+
+def test_resume_from_checkpoints_and_stop_before_deadline() -> None:
+    saved: dict = {}
+    calls: list[str] = []
+
+    def make(name: str):
+        def func(**kwargs) -> str:
+            calls.append(name)
+            if name == "review" and "fail" not in saved:
+                saved["fail"] = True
+                raise TimeoutError("killed")
+            return name
+
+        return func
+
+    def create_executor(results: dict) -> StageExecutor:
+        return StageExecutor(
+            stages=[
+                Stage(name="context", func=make("context")),
+                Stage(
+                    name="tree", func=make("tree"), inputs=("context",), checkpoint=True
+                ),
+                Stage(name="client", func=make("client")),
+                Stage(
+                    name="diffs",
+                    func=make("diffs"),
+                    inputs=("tree", "client"),
+                    checkpoint=True,
+                ),
+                Stage(name="review", func=make("review"), inputs=("diffs", "client")),
+            ],
+            results=results,
+            save_checkpoint=saved.__setitem__,
+        )
+
+    with pytest.raises(TimeoutError):
+        asyncio.run(create_executor(results={}).run())
+    assert saved == {"tree": "tree", "diffs": "diffs", "fail": True}
+
+    # Only what the failed stage needs and isn't checkpointed runs again
+    calls.clear()
+    results = asyncio.run(create_executor(results={"diffs": saved["diffs"]}).run())
+    assert sorted(calls) == ["client", "review"]
+    assert results["review"] == "review"
+
+    # No stage is started with too little time left
+    async def run_near_deadline() -> None:
+        set_deadline(remaining_in_seconds=1)
+        await create_executor(results={}).run()
+
+    calls.clear()
+    with pytest.raises(DeadlineExceeded):
+        asyncio.run(run_near_deadline())
+    assert not calls
+
+
+def test_stages_finishing_with_a_failure_are_kept() -> None:
+    """A stage that finished in the same batch as a failed one is still saved"""
+    saved: dict = {}
+
+    async def fail() -> None:
+        raise ValueError("broken")
+
+    async def succeed() -> str:
+        return "ok"
+
+    executor = StageExecutor(
+        stages=[
+            Stage(name="fail", func=fail),
+            Stage(name="succeed", func=succeed, checkpoint=True),
+        ],
+        save_checkpoint=saved.__setitem__,
+    )
+    with pytest.raises(ValueError):
+        asyncio.run(executor.run())
+    assert executor.results == {"succeed": "ok"}
+    assert saved == {"succeed": "ok"}
@@ -0,0 +1,37 @@
+# Standard imports
+import time
+from contextvars import ContextVar
+
+# Local imports
+from config import LAMBDA_DEADLINE_MARGIN_IN_SECONDS
+
+
+class DeadlineExceeded(Exception):
+    """Raised to stop cleanly, with checkpoints saved, before Lambda kills the invocation. A retry resumes from the checkpoints."""
+
+
+# time.monotonic() at which the current invocation is killed. None outside of Lambda.
+current_deadline: ContextVar[float | None] = ContextVar(
+    "current_deadline", default=None
+)
+
+
+def set_deadline(remaining_in_seconds: float) -> None:
+    """remaining_in_seconds is e.g. context.get_remaining_time_in_millis() / 1000
+    https://docs.aws.amazon.com/lambda/latest/dg/python-context.html
+    """
+    current_deadline.set(time.monotonic() + remaining_in_seconds)
+
+
+def get_remaining_seconds() -> float | None:
+    deadline: float | None = current_deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+def check_deadline(
+    margin_in_seconds: float = LAMBDA_DEADLINE_MARGIN_IN_SECONDS,
+) -> None:
+    """Raise DeadlineExceeded if less than margin_in_seconds are left"""
+    remaining: float | None = get_remaining_seconds()
+    if remaining is not None and remaining < margin_in_seconds:
+        raise DeadlineExceeded(f"Only {remaining:.1f}s left before the deadline")
@@ -2,66 +2,123 @@
 
 # Standard imports
 # Third party imports
+import asyncio
+import inspect
 import logging
 import time
 from functools import wraps
 from typing import Any, Callable, Tuple, TypeVar
 
+import httpx
 import requests
 
+# Local imports
+from config import GITHUB_MAX_RATE_LIMIT_RETRIES, GITHUB_MAX_RATE_LIMIT_WAIT_IN_SECONDS
+
 F = TypeVar("F", bound=Callable[..., Any])
 
 
+def _get_rate_limit_wait_time(
+    func_name: str, err: requests.exceptions.HTTPError | httpx.HTTPStatusError
+) -> int | None:
+    """Return how many seconds to wait before retrying if a rate limit was hit, otherwise log the error and return None."""
+    if err.response.status_code in {403, 429}:
+        limit = int(err.response.headers["X-RateLimit-Limit"])
+        remaining = int(err.response.headers["X-RateLimit-Remaining"])
+        used = int(err.response.headers["X-RateLimit-Used"])
+
+        # Check if the primary rate limit has been exceeded
+        if remaining == 0:
+            reset_ts = int(err.response.headers.get("X-RateLimit-Reset", 0))
+            current_ts = int(time.time())
+            wait_time = reset_ts - current_ts
+            err_msg = f"{func_name} encountered a GitHubPrimaryRateLimitError: {err}. Retrying after {wait_time} seconds. Limit: {limit}, Remaining: {remaining}, Used: {used}"
+            logging.error(msg=err_msg)
+            return wait_time + 5  # 5 seconds is a buffer
+
+        # Check if the secondary rate limit has been exceeded
+        if "exceeded a secondary rate limit" in err.response.text.lower():
+            retry_after = int(err.response.headers.get("Retry-After", 60))
+            err_msg = f"{func_name} encountered a GitHubSecondaryRateLimitError: {err}. Retrying after {retry_after} seconds. Limit: {limit}, Remaining: {remaining}, Used: {used}"
+            logging.error(msg=err_msg)
+            return retry_after
+
+        # Otherwise, log the error and return the default return value
+        err_msg = f"{func_name} encountered an HTTPError: {err}. Limit: {limit}, Remaining: {remaining}, Used: {used}"
+        logging.error(msg=err_msg)
+    else:
+        err_msg = f"{func_name} encountered an HTTPError: {err}"
+        logging.error(msg=err_msg)
+    return None
+
+
 def handle_exceptions(
     default_return_value: Any = None, raise_on_error: bool = False
 ) -> Callable[[F], F]:
-    """https://docs.github.com/en/rest/using-the-rest-api/rate-limits-for-the-rest-api?apiVersion=2022-11-28#checking-the-status-of-your-rate-limit"""
+    """Rate-limited calls are retried only if the wait is short. https://docs.github.com/en/rest/using-the-rest-api/rate-limits-for-the-rest-api?apiVersion=2022-11-28#checking-the-status-of-your-rate-limit"""
+
+    def should_retry(func_name: str, wait_time: int | None, attempt: int) -> bool:
+        if wait_time is None:
+            return False
+        if attempt >= GITHUB_MAX_RATE_LIMIT_RETRIES:
+            logging.error(msg=f"{func_name} gave up after {attempt} retries.")
+            return False
+        if wait_time > GITHUB_MAX_RATE_LIMIT_WAIT_IN_SECONDS:
+            logging.error(
+                msg=f"{func_name} won't wait {wait_time} seconds, so deferring."
+            )
+            return False
+        return True
 
     def decorator(func: F) -> F:
+        if inspect.iscoroutinefunction(func):
+
+            @wraps(wrapped=func)
+            async def async_wrapper(*args: Tuple[Any, ...], **kwargs: Any):
+                attempt = 0
+                while True:
+                    try:
+                        return await func(*args, **kwargs)
+                    except (
+                        requests.exceptions.HTTPError,
+                        httpx.HTTPStatusError,
+                    ) as err:
+                        wait_time = _get_rate_limit_wait_time(func.__name__, err)
+                        if should_retry(func.__name__, wait_time, attempt):
+                            attempt += 1
+                            await asyncio.sleep(max(wait_time, 0))
+                            continue
+                        if raise_on_error:
+                            raise
+                    except (AttributeError, KeyError, TypeError, Exception) as err:
+                        error_msg = f"{func.__name__} encountered an {type(err).__name__}: {err}\nArgs: {args}\nKwargs: {kwargs}"
+                        logging.error(msg=error_msg)
+                        if raise_on_error:
+                            raise
+                    return default_return_value
+
+            return async_wrapper  # type: ignore
+
         @wraps(wrapped=func)
         def wrapper(*args: Tuple[Any, ...], **kwargs: Any):
-            try:
-                return func(*args, **kwargs)
-            except requests.exceptions.HTTPError as err:
-                if err.response.status_code in {403, 429}:
-                    limit = int(err.response.headers["X-RateLimit-Limit"])
-                    remaining = int(err.response.headers["X-RateLimit-Remaining"])
-                    used = int(err.response.headers["X-RateLimit-Used"])
-
-                    # Check if the primary rate limit has been exceeded
-                    if remaining == 0:
-                        reset_ts = int(err.response.headers.get("X-RateLimit-Reset", 0))
-                        current_ts = int(time.time())
-                        wait_time = reset_ts - current_ts
-                        err_msg = f"{func.__name__} encountered a GitHubPrimaryRateLimitError: {err}. Retrying after {wait_time} seconds. Limit: {limit}, Remaining: {remaining}, Used: {used}"
-                        logging.error(msg=err_msg)
-                        time.sleep(wait_time + 5)  # 5 seconds is a buffer
-                        return wrapper(*args, **kwargs)
-
-                    # Check if the secondary rate limit has been exceeded
-                    if "exceeded a secondary rate limit" in err.response.text.lower():
-                        retry_after = int(err.response.headers.get("Retry-After", 60))
-                        err_msg = f"{func.__name__} encountered a GitHubSecondaryRateLimitError: {err}. Retrying after {retry_after} seconds. Limit: {limit}, Remaining: {remaining}, Used: {used}"
-                        logging.error(msg=err_msg)
-                        time.sleep(retry_after)
-                        return wrapper(*args, **kwargs)
-
-                    # Otherwise, log the error and return the default return value
-                    err_msg = f"{func.__name__} encountered an HTTPError: {err}. Limit: {limit}, Remaining: {remaining}, Used: {used}"
-                    logging.error(msg=err_msg)
+            attempt = 0
+            while True:
+                try:
+                    return func(*args, **kwargs)
+                except (requests.exceptions.HTTPError, httpx.HTTPStatusError) as err:
+                    wait_time = _get_rate_limit_wait_time(func.__name__, err)
+                    if should_retry(func.__name__, wait_time, attempt):
+                        attempt += 1
+                        time.sleep(max(wait_time, 0))
+                        continue
+                    if raise_on_error:
+                        raise
+                except (AttributeError, KeyError, TypeError, Exception) as err:
+                    error_msg = f"{func.__name__} encountered an {type(err).__name__}: {err}\nArgs: {args}\nKwargs: {kwargs}"
+                    logging.error(msg=error_msg)
                     if raise_on_error:
                         raise
-                else:
-                    err_msg = f"{func.__name__} encountered an HTTPError: {err}"
-                    logging.error(msg=err_msg)
-                if raise_on_error:
-                    raise
-            except (AttributeError, KeyError, TypeError, Exception) as err:
-                error_msg = f"{func.__name__} encountered an {type(err).__name__}: {err}\nArgs: {args}\nKwargs: {kwargs}"
-                logging.error(msg=error_msg)
-                if raise_on_error:
-                    raise
-            return default_return_value
+                return default_return_value
 
         return wrapper  # type: ignore
 
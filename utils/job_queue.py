@@ -0,0 +1,274 @@
+# Standard imports
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Protocol
+
+# Local imports
+from config import WEBHOOK_QUEUE_EVENT_SOURCE
+
+
+@dataclass
+class Job:
+    id: int
+    body: dict[str, Any]
+    attempts: int  # Including the current one
+
+
+class JobQueue(Protocol):
+    """At-least-once queue. Unacked jobs come back after visibility_timeout_in_seconds, failing ones are dead-lettered after max_attempts."""
+
+    def ack(self, job: Job) -> None:
+        """Delete a job that was handled"""
+
+    def enqueue(self, body: dict[str, Any]) -> int:
+        """Persist a job and return its ID"""
+
+    def get_depth(self) -> dict[str, int]:
+        """Jobs by state, e.g. ready, in flight and dead"""
+
+    def nack(self, job: Job, error: str) -> None:
+        """Retry a job that failed later, or dead-letter it"""
+
+    def receive(self) -> Job | None:
+        """The oldest ready job, or None if there isn't any"""
+
+
+class SqliteJobQueue:
+    """JobQueue in a SQLite file, for local runs and single-host deployments. Survives restarts."""
+
+    def __init__(
+        self,
+        path: str,
+        visibility_timeout_in_seconds: float,
+        max_attempts: int,
+        retry_delay_in_seconds: float = 30.0,
+    ) -> None:
+        self.path: str = path
+        self.visibility_timeout_in_seconds: float = visibility_timeout_in_seconds
+        self.max_attempts: int = max_attempts
+        self.retry_delay_in_seconds: float = retry_delay_in_seconds
+        directory: str = os.path.dirname(path)
+        if directory:
+            os.makedirs(name=directory, exist_ok=True)
+        # One connection shared by the worker threads. Writes are serialized by the lock.
+        self._connection = sqlite3.connect(
+            database=path, check_same_thread=False, isolation_level=None
+        )
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(
+            """CREATE TABLE IF NOT EXISTS jobs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                body TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                visible_at REAL NOT NULL,
+                dead INTEGER NOT NULL DEFAULT 0,
+                last_error TEXT
+            )"""
+        )
+        self._lock = threading.Lock()
+
+    def ack(self, job: Job) -> None:
+        with self._lock:
+            self._connection.execute("DELETE FROM jobs WHERE id = ?", (job.id,))
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
+
+    def enqueue(self, body: dict[str, Any]) -> int:
+        with self._lock:
+            cursor = self._connection.execute(
+                "INSERT INTO jobs (body, visible_at) VALUES (?, ?)",
+                (json.dumps(obj=body), time.time()),
+            )
+            return cursor.lastrowid or 0
+
+    def get_depth(self) -> dict[str, int]:
+        now: float = time.time()
+        with self._lock:
+            ready, in_flight, dead = self._connection.execute(
+                """SELECT
+                    COALESCE(SUM(dead = 0 AND visible_at <= ?), 0),
+                    COALESCE(SUM(dead = 0 AND visible_at > ?), 0),
+                    COALESCE(SUM(dead = 1), 0)
+                FROM jobs""",
+                (now, now),
+            ).fetchone()
+        return {"ready": ready, "in_flight": in_flight, "dead": dead}
+
+    def nack(self, job: Job, error: str) -> None:
+        dead: bool = job.attempts >= self.max_attempts
+        with self._lock:
+            self._connection.execute(
+                "UPDATE jobs SET dead = ?, visible_at = ?, last_error = ? WHERE id = ?",
+                (
+                    int(dead),
+                    time.time() + self.retry_delay_in_seconds * job.attempts,
+                    error,
+                    job.id,
+                ),
+            )
+        if dead:
+            logging.error(
+                "Job %s is dead after %s attempts: %s", job.id, job.attempts, error
+            )
+
+    def receive(self) -> Job | None:
+        now: float = time.time()
+        with self._lock:
+            row = self._connection.execute(
+                """UPDATE jobs SET attempts = attempts + 1, visible_at = ?
+                WHERE id = (
+                    SELECT id FROM jobs WHERE dead = 0 AND visible_at <= ? ORDER BY id LIMIT 1
+                )
+                RETURNING id, body, attempts""",
+                (now + self.visibility_timeout_in_seconds, now),
+            ).fetchone()
+        if row is None:
+            return None
+        return Job(id=row[0], body=json.loads(row[1]), attempts=row[2])
+
+
+@dataclass
+class WorkerPool:
+    """Handles jobs from a queue with at most concurrency jobs at a time. A job is acked if the handler returns and nacked if it raises."""
+
+    queue: JobQueue
+    handler: Callable[[Job], Awaitable[None]]
+    concurrency: int
+    poll_interval_in_seconds: float = 1.0
+    handled: int = 0
+    failed: int = 0
+
+    def __post_init__(self) -> None:
+        self._tasks: list[asyncio.Task[None]] = []
+        self._wake = asyncio.Event()
+
+    async def _work(self) -> None:
+        while True:
+            job: Job | None = await asyncio.to_thread(self.queue.receive)
+            if job is None:
+                self._wake.clear()
+                try:
+                    await asyncio.wait_for(
+                        self._wake.wait(), timeout=self.poll_interval_in_seconds
+                    )
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            try:
+                await self.handler(job)
+            except Exception as err:  # pylint: disable=broad-except
+                logging.warning("Job %s failed: %s", job.id, err)
+                await asyncio.to_thread(
+                    self.queue.nack, job=job, error=f"{type(err).__name__}: {err}"
+                )
+                self.failed += 1
+                continue
+            await asyncio.to_thread(self.queue.ack, job=job)
+            self.handled += 1
+
+    def get_stats(self) -> dict[str, int]:
+        return {
+            "handled": self.handled,
+            "failed": self.failed,
+            **self.queue.get_depth(),
+        }
+
+    def notify(self) -> None:
+        """Wake idle workers up after a job was enqueued instead of waiting for the next poll"""
+        self._wake.set()
+
+    def start(self) -> None:
+        self._tasks = [
+            asyncio.create_task(self._work()) for _ in range(self.concurrency)
+        ]
+
+    async def stop(self) -> None:
+        """Cancel the workers. Jobs in flight come back after their visibility timeout."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+
+class LambdaJobQueue:
+    """Jobs as asynchronous invocations of this function, handled by main.handler. https://docs.aws.amazon.com/lambda/latest/dg/invocation-async.html"""
+
+    def __init__(
+        self, function_name: str, event_source: str, client: Any = None
+    ) -> None:
+        self.function_name: str = function_name
+        self.event_source: str = event_source
+        self.enqueued = 0
+        self._client: Any = client
+
+    def _get_client(self) -> Any:
+        if self._client is None:
+            # Provided by the Lambda runtime, and imported on first use to keep it off the cold start
+            import boto3  # pylint: disable=import-outside-toplevel
+
+            self._client = boto3.client("lambda")
+        return self._client
+
+    def ack(self, job: Job) -> None:
+        """Lambda acks the job when main.handler returns"""
+
+    def enqueue(self, body: dict[str, Any]) -> int:
+        job_id: int = time.time_ns()
+        self._get_client().invoke(
+            FunctionName=self.function_name,
+            InvocationType="Event",
+            Payload=json.dumps(
+                obj={"source": self.event_source, "job_id": job_id, "body": body}
+            ),
+        )
+        self.enqueued += 1
+        return job_id
+
+    def get_depth(self) -> dict[str, int]:
+        # Lambda keeps the queue, so only what this container enqueued is known
+        return {"enqueued": self.enqueued}
+
+    def nack(self, job: Job, error: str) -> None:
+        """Lambda retries the job when main.handler raises"""
+
+    def receive(self) -> Job | None:
+        """Jobs are pushed to main.handler instead"""
+        return None
+
+
+def get_lambda_job(event: dict[str, Any]) -> Job:
+    """The job of an invocation made by LambdaJobQueue.enqueue. Lambda doesn't tell which attempt it is."""
+    return Job(id=event["job_id"], body=event["body"], attempts=1)
+
+
+# Backends by name, created with the path, visibility timeout and max attempts of the queue
+QUEUE_BACKENDS: dict[str, Callable[..., JobQueue]] = {
+    "lambda": lambda **_kwargs: LambdaJobQueue(
+        function_name=os.environ["AWS_LAMBDA_FUNCTION_NAME"],
+        event_source=WEBHOOK_QUEUE_EVENT_SOURCE,
+    ),
+    "sqlite": SqliteJobQueue,
+}
+
+
+def create_job_queue(
+    backend: str, path: str, visibility_timeout_in_seconds: float, max_attempts: int
+) -> JobQueue | None:
+    """None for the "inline" backend, which handles each job in the request that enqueued it, e.g. on Lambda where nothing runs after the response."""
+    if backend == "inline":
+        return None
+    if backend not in QUEUE_BACKENDS:
+        raise ValueError(f"Unknown queue backend: {backend}")
+    return QUEUE_BACKENDS[backend](
+        path=path,
+        visibility_timeout_in_seconds=visibility_timeout_in_seconds,
+        max_attempts=max_attempts,
+    )
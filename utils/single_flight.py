@@ -0,0 +1,57 @@
+# Standard imports
+import asyncio
+from typing import Any, Awaitable, Callable
+from uuid import uuid4
+
+# Local imports
+from utils.ttl_store import TTLStore
+
+
+class SingleFlight:
+    """At most one call per key at a time. Duplicates in the same process get its result, others get None."""
+
+    def __init__(self, store: TTLStore, ttl_in_seconds: float) -> None:
+        self.store: TTLStore = store
+        self.ttl_in_seconds: float = ttl_in_seconds
+        self.attached = 0
+        self.dropped = 0
+        self._tasks: dict[str, asyncio.Task[Any]] = {}
+
+    async def _run(self, key: str, func: Callable[[], Awaitable[Any]]) -> Any:
+        owner: str = uuid4().hex
+        acquired: bool = await asyncio.to_thread(
+            self.store.acquire_lock,
+            key=key,
+            owner=owner,
+            ttl_in_seconds=self.ttl_in_seconds,
+        )
+        if not acquired:
+            self.dropped += 1
+            print(f"{key} is already being handled elsewhere. Dropped.")
+            return None
+        try:
+            return await func()
+        finally:
+            await asyncio.to_thread(self.store.release_lock, key=key, owner=owner)
+
+    def _forget(self, key: str, task: asyncio.Task[Any]) -> None:
+        if self._tasks.get(key) is task:
+            del self._tasks[key]
+
+    async def run(self, key: str, func: Callable[[], Awaitable[Any]]) -> Any:
+        task: asyncio.Task[Any] | None = self._tasks.get(key)
+        # A task left over from another event loop, e.g. a previous Lambda invocation, can't be awaited
+        if (
+            task is None
+            or task.done()
+            or task.get_loop() is not asyncio.get_running_loop()
+        ):
+            # Registered before the first await so that a concurrent duplicate sees it
+            task = asyncio.create_task(self._run(key=key, func=func))
+            self._tasks[key] = task
+            task.add_done_callback(lambda done: self._forget(key=key, task=done))
+            return await task
+        self.attached += 1
+        print(f"{key} is already being handled. Attached to it.")
+        # Cancelling the duplicate must not cancel the call it attached to
+        return await asyncio.shield(task)
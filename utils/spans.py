@@ -0,0 +1,50 @@
+# Standard imports
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Iterator
+
+
+class Spans:
+    """Durations of the steps of one request, added up by name"""
+
+    def __init__(self) -> None:
+        # name -> [count, seconds, max seconds]
+        self._totals: dict[str, list[float]] = {}
+        self._lock = threading.Lock()
+
+    def add(self, name: str, seconds: float) -> None:
+        with self._lock:
+            total: list[float] = self._totals.setdefault(name, [0, 0.0, 0.0])
+            total[0] += 1
+            total[1] += seconds
+            total[2] = max(total[2], seconds)
+
+    def get_breakdown(self) -> dict[str, dict[str, Any]]:
+        """Compact enough to be stored on the usage record, in the order the steps first happened"""
+        with self._lock:
+            return {
+                name: {
+                    "count": int(count),
+                    "seconds": round(seconds, 3),
+                    "max_seconds": round(max_seconds, 3),
+                }
+                for name, (count, seconds, max_seconds) in self._totals.items()
+            }
+
+
+# The spans of the request being handled. asyncio tasks and asyncio.to_thread carry it over, so nested calls don't need it passed down.
+current_spans: ContextVar[Spans | None] = ContextVar("current_spans", default=None)
+
+
+@contextmanager
+def span(name: str) -> Iterator[None]:
+    """Time the block into the current request's spans, if any"""
+    spans: Spans | None = current_spans.get()
+    start: float = time.perf_counter()
+    try:
+        yield
+    finally:
+        if spans is not None:
+            spans.add(name=name, seconds=time.perf_counter() - start)
@@ -0,0 +1,184 @@
+# Standard imports
+import asyncio
+import inspect
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable
+
+# Local imports
+from config import STAGE_RETRY_DELAY_IN_SECONDS
+from utils.deadline import check_deadline
+
+
+class StopPipeline(Exception):
+    """Raised by a stage to end the pipeline early without it being an error, e.g. when the request limit is reached."""
+
+
+@dataclass
+class Stage:
+    """One step of a pipeline. func gets the results of its inputs as keyword arguments."""
+
+    name: str
+    func: Callable[..., Any]
+    inputs: tuple[str, ...] = ()
+    retries: int = 0
+    checkpoint: bool = False
+
+
+@dataclass
+class StageRecord:
+    """When a stage ran, for how long and how it ended. Times are in seconds since the pipeline started."""
+
+    name: str
+    started_at: float | None = None
+    finished_at: float | None = None
+    attempts: int = 0
+    error: str | None = None
+
+    def get_seconds(self) -> float | None:
+        if self.started_at is None or self.finished_at is None:
+            return None
+        return self.finished_at - self.started_at
+
+
+@dataclass
+class StageExecutor:
+    """Runs each stage once its inputs are ready and raises the first failure. Stages already in results are skipped."""
+
+    stages: list[Stage]
+    retry_delay_in_seconds: float = STAGE_RETRY_DELAY_IN_SECONDS
+    results: dict[str, Any] = field(default_factory=dict)
+    records: dict[str, StageRecord] = field(default_factory=dict)
+    save_checkpoint: Callable[[str, Any], None] | None = None
+
+    def __post_init__(self) -> None:
+        names: list[str] = [stage.name for stage in self.stages]
+        if len(names) != len(set(names)):
+            raise ValueError(f"Duplicate stage names: {names}")
+        for stage in self.stages:
+            unknown: set[str] = set(stage.inputs) - set(names)
+            if unknown:
+                raise ValueError(f"Stage {stage.name} has unknown inputs: {unknown}")
+        self._order: list[Stage] = self._sort()
+        self.records = {
+            stage.name: StageRecord(name=stage.name) for stage in self.stages
+        }
+        self._start: float = 0.0
+
+    def _sort(self) -> list[Stage]:
+        """Stages in an order where inputs come first"""
+        order: list[Stage] = []
+        done: set[str] = set()
+        remaining: list[Stage] = list(self.stages)
+        while remaining:
+            ready: list[Stage] = [s for s in remaining if set(s.inputs) <= done]
+            if not ready:
+                raise ValueError(f"Stages form a cycle: {[s.name for s in remaining]}")
+            order.extend(ready)
+            done.update(stage.name for stage in ready)
+            remaining = [stage for stage in remaining if stage.name not in done]
+        return order
+
+    def _get_needed(self) -> list[Stage]:
+        """Stages without a result that are the last of a branch or that a needed stage takes as input"""
+        needed: set[str] = set()
+        for stage in reversed(self._order):
+            if stage.name in self.results:
+                continue
+            dependents: list[str] = [
+                s.name for s in self.stages if stage.name in s.inputs
+            ]
+            if not dependents or needed.intersection(dependents):
+                needed.add(stage.name)
+        return [stage for stage in self.stages if stage.name in needed]
+
+    async def _run_stage(self, stage: Stage) -> Any:
+        record: StageRecord = self.records[stage.name]
+        record.started_at = time.perf_counter() - self._start
+        kwargs: dict[str, Any] = {name: self.results[name] for name in stage.inputs}
+        try:
+            while True:
+                record.attempts += 1
+                try:
+                    if inspect.iscoroutinefunction(stage.func):
+                        result: Any = await stage.func(**kwargs)
+                    else:
+                        result = await asyncio.to_thread(stage.func, **kwargs)
+                    break
+                except StopPipeline:
+                    raise
+                except Exception as err:  # pylint: disable=broad-except
+                    if record.attempts > stage.retries:
+                        record.error = f"{type(err).__name__}: {err}"
+                        raise
+                    logging.warning("Stage %s failed, retrying: %s", stage.name, err)
+                    await asyncio.sleep(self.retry_delay_in_seconds * record.attempts)
+        finally:
+            record.finished_at = time.perf_counter() - self._start
+        return result
+
+    async def run(self) -> dict[str, Any]:
+        """Run every stage and return their results by name."""
+        self._start = time.perf_counter()
+        pending: list[Stage] = self._get_needed()
+        stages: dict[str, Stage] = {stage.name: stage for stage in self.stages}
+        running: dict[asyncio.Task[Any], str] = {}
+        # Checkpoints are saved in the background so that the next stages don't wait for them
+        saves: list[asyncio.Task[None]] = []
+        try:
+            while pending or running:
+                for stage in [
+                    s for s in pending if set(s.inputs) <= self.results.keys()
+                ]:
+                    check_deadline()
+                    pending.remove(stage)
+                    running[asyncio.create_task(self._run_stage(stage=stage))] = (
+                        stage.name
+                    )
+                done, _ = await asyncio.wait(
+                    running, return_when=asyncio.FIRST_COMPLETED
+                )
+                # Stages that finished along with a failed one are still kept and saved
+                errors: list[BaseException] = []
+                for task in done:
+                    name: str = running.pop(task)
+                    if task.exception() is not None:
+                        errors.append(task.exception())
+                        continue
+                    self.results[name] = task.result()
+                    if stages[name].checkpoint and self.save_checkpoint is not None:
+                        saves.append(
+                            asyncio.create_task(
+                                asyncio.to_thread(
+                                    self.save_checkpoint, name, self.results[name]
+                                )
+                            )
+                        )
+                if errors:
+                    raise errors[0]
+        finally:
+            for task in running:
+                task.cancel()
+            if running:
+                await asyncio.wait(running)
+            # Even after a failure, the stages that finished are kept for a retry
+            await asyncio.gather(*saves, return_exceptions=True)
+        return self.results
+
+    def get_timings(self) -> list[dict[str, Any]]:
+        """One row per stage that started, in start order"""
+        records: list[StageRecord] = sorted(
+            (r for r in self.records.values() if r.started_at is not None),
+            key=lambda r: r.started_at or 0.0,
+        )
+        return [
+            {
+                "name": r.name,
+                "started_at": round(r.started_at or 0.0, 3),
+                "seconds": round(r.get_seconds() or 0.0, 3),
+                "attempts": r.attempts,
+                "error": r.error,
+            }
+            for r in records
+        ]
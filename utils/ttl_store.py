@@ -0,0 +1,67 @@
+# Standard imports
+import threading
+import time
+from typing import Protocol
+
+
+class TTLStore(Protocol):
+    """Keys held by one owner until released or expired, e.g. webhook delivery IDs"""
+
+    def acquire_lock(self, key: str, owner: str, ttl_in_seconds: float) -> bool:
+        """Hold key for ttl_in_seconds. False if it's already held by someone else and hasn't expired. Raises if the store can't be reached."""
+
+    def release_lock(self, key: str, owner: str) -> None:
+        """Release key if owner still holds it."""
+
+
+class MemoryTTLStore:
+    """TTLStore of this process. Warm Lambda containers and a local server keep it across requests."""
+
+    def __init__(self) -> None:
+        self._locks: dict[str, tuple[str, float]] = {}  # key -> (owner, expires_at)
+        self._lock = threading.Lock()
+
+    def acquire_lock(self, key: str, owner: str, ttl_in_seconds: float) -> bool:
+        now: float = time.monotonic()
+        with self._lock:
+            # Drop expired keys so the dict doesn't grow with every delivery
+            for expired in [k for k, (_, exp) in self._locks.items() if exp <= now]:
+                del self._locks[expired]
+            held: tuple[str, float] | None = self._locks.get(key)
+            if held is not None and held[0] != owner:
+                return False
+            self._locks[key] = (owner, now + ttl_in_seconds)
+            return True
+
+    def release_lock(self, key: str, owner: str) -> None:
+        with self._lock:
+            held: tuple[str, float] | None = self._locks.get(key)
+            if held is not None and held[0] == owner:
+                del self._locks[key]
+
+
+class LayeredTTLStore:
+    """Acquires a key in every store in order, so a cheap in-process store turns duplicates away before the shared one is queried."""
+
+    def __init__(self, stores: list[TTLStore]) -> None:
+        self.stores: list[TTLStore] = stores
+
+    def acquire_lock(self, key: str, owner: str, ttl_in_seconds: float) -> bool:
+        acquired: list[TTLStore] = []
+        try:
+            for store in self.stores:
+                if not store.acquire_lock(
+                    key=key, owner=owner, ttl_in_seconds=ttl_in_seconds
+                ):
+                    break
+                acquired.append(store)
+        finally:
+            # Roll back a partial acquire, whether a store said no or raised
+            if len(acquired) < len(self.stores):
+                for held in acquired:
+                    held.release_lock(key=key, owner=owner)
+        return len(acquired) == len(self.stores)
+
+    def release_lock(self, key: str, owner: str) -> None:
+        for store in reversed(self.stores):
+            store.release_lock(key=key, owner=owner)